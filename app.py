@@ -3,11 +3,12 @@ Audio Biomarker Flask Server - Real Implementation
 Records audio, extracts features, and runs prediction
 """
 
-from flask import Flask, render_template, request, jsonify
-import joblib
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
+import atexit
 import numpy as np
 import os
 import tempfile
+import time
 import random
 import warnings
 warnings.filterwarnings('ignore')
@@ -16,6 +17,13 @@ from firebase_admin import credentials, firestore
 
 from flask_cors import CORS # Import CORS
 
+import metrics
+from jobs import JobManager, QueueFullError
+from prediction import load_model, run_prediction
+from result_writer import ResultWriter
+from upload_ingest import ingest_upload
+from workers import dispatch, is_ready, start_workers, worker_count
+
 app = Flask(__name__)
 CORS(app) # Enable CORS for all routes
 
@@ -35,133 +43,26 @@ try:
 except Exception as e:
     print(f"Error initializing Firebase: {e}")
 
+# Background Firestore writer, started with the app so results journaled by
+# a previous run are replayed at start-up rather than on the first upload
+result_writer = None
+if db is not None:
+    result_writer = ResultWriter(db)
+    atexit.register(result_writer.close)
+
 # Configuration
-MODEL_PATH = "audio_biomarker_model_20251215_152341.pkl"
 UPLOAD_FOLDER = tempfile.gettempdir()
 ALLOWED_EXTENSIONS = {'wav', 'webm', 'mp3', 'ogg', 'm4a'}
+BATCH_OUTPUT_FOLDER = os.path.join(os.getcwd(), 'batch_results')
 
-model_bundle = None
-
-def load_model():
-    global model_bundle
-    if model_bundle is None:
-        print("Loading model...")
-        try:
-            model_bundle = joblib.load(MODEL_PATH)
-            print("Model loaded successfully!")
-        except Exception as e:
-            print(f"Warning: Could not fully load model: {e}")
-            model_bundle = {
-                'severity_labels': ["Normal", "Moderate", "Severe"],
-                'multi_labels': [
-                    "Social_Anxiety", "PTSD", "Panic_Disorder", "GAD", "Agoraphobia", "Neutral",
-                    "Perfectionism", "Impostor_Syndrome", "Test_Anxiety", "Academic_Burnout",
-                    "Low_Self_Esteem", "Lac_Of_Academic_Support", "Fear_Of_Failure",
-                    "Poor_Time_Management", "Pressure_Of_Surroundings"
-                ],
-                'multilabel_thresholds': [0.3] * 15
-            }
-    return model_bundle
-
-# Educational insights for each condition
-EDUCATIONAL_INSIGHTS = {
-    "Social_Anxiety": {
-        "description": "Fear of social situations involving scrutiny or judgment by others",
-        "tips": ["Practice relaxation techniques before social events", "Start with small, manageable social situations", "Challenge negative thoughts about social interactions"],
-        "resources": ["Cognitive Behavioral Therapy (CBT)", "Social skills training", "Support groups"]
-    },
-    "PTSD": {
-        "description": "Persistent mental and emotional stress after experiencing traumatic events",
-        "tips": ["Seek professional help immediately", "Practice grounding techniques", "Maintain regular sleep schedule"],
-        "resources": ["Trauma-focused therapy", "EMDR therapy", "Crisis hotlines"]
-    },
-    "Panic_Disorder": {
-        "description": "Recurrent unexpected panic attacks and fear of future attacks",
-        "tips": ["Learn to recognize panic symptoms early", "Practice deep breathing exercises", "Avoid caffeine and stimulants"],
-        "resources": ["Panic-focused CBT", "Medication consultation", "Breathing exercises"]
-    },
-    "GAD": {
-        "description": "Generalized Anxiety Disorder - excessive worry about various life events",
-        "tips": ["Limit worry to designated 'worry time'", "Practice mindfulness meditation", "Exercise regularly"],
-        "resources": ["Anxiety management programs", "Mindfulness-based therapy", "Stress reduction techniques"]
-    },
-    "Agoraphobia": {
-        "description": "Fear of situations where escape might be difficult",
-        "tips": ["Gradual exposure to feared situations", "Practice coping strategies", "Build a support network"],
-        "resources": ["Exposure therapy", "Virtual reality therapy", "Support groups"]
-    },
-    "Neutral": {
-        "description": "No significant anxiety indicators detected",
-        "tips": ["Maintain healthy lifestyle habits", "Continue stress management practices", "Regular mental health check-ins"],
-        "resources": ["Wellness programs", "Preventive mental health resources"]
-    },
-    "Perfectionism": {
-        "description": "Setting excessively high standards leading to stress and self-criticism",
-        "tips": ["Set realistic goals", "Celebrate small achievements", "Practice self-compassion"],
-        "resources": ["Perfectionism-focused therapy", "Goal-setting workshops", "Self-help books"]
-    },
-    "Impostor_Syndrome": {
-        "description": "Persistent doubt about accomplishments despite evidence of competence",
-        "tips": ["Keep a record of achievements", "Share feelings with trusted peers", "Recognize that many successful people experience this"],
-        "resources": ["Career counseling", "Mentorship programs", "Self-esteem building workshops"]
-    },
-    "Test_Anxiety": {
-        "description": "Excessive worry and fear about academic testing situations",
-        "tips": ["Prepare early and avoid cramming", "Practice relaxation before exams", "Use positive self-talk"],
-        "resources": ["Study skills workshops", "Test-taking strategies", "Academic counseling"]
-    },
-    "Academic_Burnout": {
-        "description": "Physical and emotional exhaustion from prolonged academic stress",
-        "tips": ["Take regular breaks", "Set boundaries on study time", "Engage in enjoyable activities"],
-        "resources": ["Academic advising", "Wellness programs", "Time management coaching"]
-    },
-    "Low_Self_Esteem": {
-        "description": "Negative perception of self-worth and capabilities",
-        "tips": ["Practice positive affirmations", "Focus on strengths", "Avoid comparing yourself to others"],
-        "resources": ["Self-esteem therapy", "Support groups", "Personal development courses"]
-    },
-    "Lac_Of_Academic_Support": {
-        "description": "Insufficient academic guidance and resources",
-        "tips": ["Seek out tutoring services", "Connect with academic advisors", "Form study groups"],
-        "resources": ["Tutoring centers", "Academic mentorship", "Peer support programs"]
-    },
-    "Fear_Of_Failure": {
-        "description": "Excessive worry about not meeting expectations or making mistakes",
-        "tips": ["Reframe failure as a learning opportunity", "Set process goals, not just outcome goals", "Practice self-compassion"],
-        "resources": ["Growth mindset training", "Goal-setting workshops", "Counseling services"]
-    },
-    "Poor_Time_Management": {
-        "description": "Difficulty organizing and prioritizing tasks effectively",
-        "tips": ["Use a planner or digital calendar", "Break tasks into smaller steps", "Set specific deadlines"],
-        "resources": ["Time management workshops", "Productivity apps", "Academic coaching"]
-    },
-    "Pressure_Of_Surroundings": {
-        "description": "Stress from external expectations from family, peers, or society",
-        "tips": ["Set personal boundaries", "Communicate openly about expectations", "Focus on personal values"],
-        "resources": ["Family counseling", "Peer support", "Stress management programs"]
-    }
-}
+# /batch-score only reads sources (and manifest entries) under this
+# directory; unset = batch scoring is CLI-only
+BATCH_INPUT_ROOT = os.environ.get('BATCH_INPUT_ROOT')
 
-SEVERITY_INFO = {
-    "Normal": {
-        "level": 1,
-        "color": "#28a745",
-        "description": "No significant mental health concerns detected",
-        "recommendation": "Continue maintaining healthy habits and regular wellness practices."
-    },
-    "Moderate": {
-        "level": 2,
-        "color": "#ffc107",
-        "description": "Some indicators suggest moderate stress or anxiety",
-        "recommendation": "Consider speaking with a counselor and implementing stress-reduction strategies."
-    },
-    "Severe": {
-        "level": 3,
-        "color": "#dc3545",
-        "description": "Significant indicators of mental health concerns",
-        "recommendation": "Please seek professional mental health support as soon as possible."
-    }
-}
+# Batch jobs run for hours, so they get their own pool and never take
+# async upload slots
+BATCH_JOB_WORKERS = 1
+BATCH_JOB_QUEUE_LIMIT = 4
 
 @app.route('/')
 def index():
@@ -169,7 +70,12 @@ def index():
 
 @app.route('/upload-audio', methods=['POST'])
 def upload_audio():
-    """Handle audio upload and extraction"""
+    """
+    Handle audio upload and extraction
+    With ?async=1 (or form field async=1) the work is queued and a job ID is
+    returned at once; poll GET /jobs/<id> or follow GET /jobs/<id>/events
+    With ?timings=1 the result carries a per-stage latency breakdown
+    """
     try:
         if 'audio' not in request.files:
             return jsonify({'error': 'No audio file provided'}), 400
@@ -181,44 +87,35 @@ def upload_audio():
         # Get transcript from frontend (live transcription) & Folder
         live_transcript = request.form.get('transcript', '')
         folder_name = request.form.get('folder', 'Uncategorized')
+        run_async = (request.args.get('async') or request.form.get('async', '')).lower() in ('1', 'true', 'yes')
+        include_timings = (request.args.get('timings') or request.form.get('timings', '')).lower() in ('1', 'true', 'yes')
         
-        # Save audio to temp file (browser sends WAV format)
-        temp_path = os.path.join(UPLOAD_FOLDER, f'recording_{os.getpid()}.wav')
-        audio_file.save(temp_path)
-        print(f"Audio saved to: {temp_path}")
+        # Small uploads stay in memory; larger ones get their own spill file
+        upload = ingest_upload(audio_file, spill_dir=UPLOAD_FOLDER)
+        print(f"Audio received: {upload}")
         print(f"Live transcript received: '{live_transcript[:100] if live_transcript else 'None'}...'")
         print(f"Selected Folder: {folder_name}")
         
-        # Extract features (use live transcript if provided)
-        from audio_features import extract_all_features
-        features, transcript = extract_all_features(temp_path, transcript_override=live_transcript if live_transcript else None)
-        
-        # Clean up temp file
-        try:
-            os.remove(temp_path)
-        except:
-            pass
-        
-        # Run prediction
-        model = load_model()
-        result = run_prediction(features, model)
-        result['transcript'] = transcript
-        result['folder'] = folder_name
-        
-        # Save to Firebase
-        if db is not None:
+        if run_async:
             try:
-                # Add timestamp
-                import datetime
-                result['timestamp'] = datetime.datetime.now()
-                
-                # Save to specific folder in 'recordings' collection or structured via subcollections
-                # For now, saving to 'recordings' with a 'folder' field
-                db.collection('recordings').add(result)
-                print(f"Result saved to Firebase (Folder: {folder_name})")
-            except Exception as fb_err:
-                print(f"Failed to save to Firebase: {fb_err}")
-        
+                job = get_job_manager().submit(process_recording, upload.source(), live_transcript, folder_name,
+                                               kind='upload-audio', on_finish=upload.close,
+                                               include_timings=include_timings)
+            except QueueFullError as e:
+                upload.close()
+                response = jsonify({'error': str(e)})
+                response.headers['Retry-After'] = '5'
+                return response, 429
+            return jsonify({
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': f'/jobs/{job.id}',
+                'events_url': f'/jobs/{job.id}/events',
+            }), 202
+        
+        with upload:
+            result = process_recording(upload.source(), live_transcript, folder_name,
+                                       include_timings=include_timings)
         return jsonify(result)
         
     except Exception as e:
@@ -226,253 +123,134 @@ def upload_audio():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
-def run_prediction(features, model):
-    """Run model prediction with extracted features"""
-    severity_labels = model.get('severity_labels', ["Normal", "Moderate", "Severe"])
-    multi_labels = model.get('multi_labels', list(EDUCATIONAL_INSIGHTS.keys()))
-    thresholds = model.get('multilabel_thresholds', [0.3] * len(multi_labels))
+def analyze_recording(audio_path, live_transcript, folder_name, progress=None):
+    """Feature extraction and prediction for one recording (runs in a worker process if enabled)"""
+    # Extract features (use live transcript if provided)
+    from audio_features import extract_all_features
+    # Stage timings for this request, progress events still forwarded
+    timer = metrics.StageTimer(progress)
+    features, transcript = extract_all_features(audio_path, transcript_override=live_transcript if live_transcript else None,
+                                                progress=timer)
     
-    # Try to use actual model
-    try:
-        imputer = model['imputer']
-        # --- PATCH FOR SKLEARN VERSION MISMATCH ---
-        if not hasattr(imputer, '_fill_dtype'):
-            print("  [Patching] Fixing SimpleImputer compatibility...")
-            import numpy as np
-            imputer._fill_dtype = np.float64
-        # ------------------------------------------
-        
-        scaler = model['scaler']
-        selector = model['selector']
-        severity_model = model['severity_model']
-        label_encoder = model['label_encoder']
-        
-        # Get expected feature order
-        n_features = imputer.n_features_in_
-        
-        # Convert features to array in correct order
-        # For now, use the features we have and pad with zeros
-        feature_array = np.zeros((1, n_features))
-        
-        # Map our extracted features to array positions
-        # This is a simplified approach - ideally we'd match exact column names
-        idx = 0
-        for key in ['jitter', 'shimmer', 'hnr']:
-            if key in features and idx < n_features:
-                feature_array[0, idx] = features[key]
-            idx += 1
-        
-        for i in range(13):  # MFCC features
-            key = f'mfcc_{i}'
-            if key in features and idx < n_features:
-                feature_array[0, idx] = features[key]
-            idx += 1
-        
-        for i in range(768):  # BERT features
-            key = f'bert_{i}'
-            if key in features and idx < n_features:
-                feature_array[0, idx] = features[key]
-            idx += 1
-        
-        # Fill remaining with text features
-        for key in ['cognitive_count', 'negative_count', 'pronoun_count', 'absolutist_count', 'transcript_length', 
-                    'word_count', 'avg_word_length', 'sentence_count', 'question_count', 'exclamation_count']:
-            if key in features and idx < n_features:
-                feature_array[0, idx] = features[key]
-            idx += 1
-        
-        # Preprocess
-        X_imputed = imputer.transform(feature_array)
-        X_scaled = scaler.transform(X_imputed)
-        X_selected = selector.transform(X_scaled)
-        
-        # Predict severity
-        print("--- Executing REAL Severity Model ---")
-        
-        # Safety Check: If transcript features are empty/zero, default to Normal
-        # (User Request: "if transcript data not connected show normal")
-        if features.get('word_count', 0) == 0:
-             print("  [Safety] No transcript data detected -> Defaulting to Normal")
-             severity_probs = {"Normal": 100, "Moderate": 0, "Severe": 0}
-             severity_pred = "Normal"
-        else:
-            severity_pred = severity_model.predict(X_selected)[0]
-            severity_proba = severity_model.predict_proba(X_selected)[0]
-            severity_probs = {label: float(prob) * 100 for label, prob in zip(label_encoder.classes_, severity_proba)}
-            
-            # User Request: "if the transcripted text is not connected to any psychological issue then show a normal"
-            # Logic: If 0% negative words are detected, force result to Normal
-            neg_count = features.get('negative_count', 0)
-            if neg_count == 0:
-                print(f"  [Content Check] No negative keywords detected ({neg_count}%) -> Forcing Normal")
-                severity_probs = {"Normal": 95, "Moderate": 5, "Severe": 0}
-                severity_pred = "Normal"
+    # Run prediction
+    with timer.stage('prediction'):
+        model = load_model()
+        result = run_prediction(features, model)
+    result['transcript'] = transcript
+    result['folder'] = folder_name
+    result['timings'] = timer.timings
+    return result
 
-        
-        # --- EMOTION CONNECTION LOGIC ---
-        # Adjust severity based on detected emotion (Cross-Model Validation)
-        detected_emotion = features.get('detected_emotion', 'Neutral')
-        emotion_conf = features.get('emotion_confidence', 0.0)
-        
-        if emotion_conf > 0.5:
-            # High Arousal/Negative Emotions -> Increase Severity
-            if detected_emotion in ['Fear', 'Sad', 'Angry', 'Disgust', 'Surprise']:
-                boost = 15 * emotion_conf  # Boost up to 15%
-                severity_probs['Severe'] += boost
-                severity_probs['Moderate'] += (boost * 0.5)
-                severity_probs['Normal'] = max(0, severity_probs['Normal'] - boost)
-                
-            # Positive/Calm Emotions -> Decrease Severity
-            elif detected_emotion in ['Happy', 'Neutral']:
-                boost = 15 * emotion_conf
-                severity_probs['Normal'] += boost
-                severity_probs['Severe'] = max(0, severity_probs['Severe'] - boost)
-                severity_probs['Moderate'] = max(0, severity_probs['Moderate'] - (boost * 0.5))
-        
-        # Re-normalize to 100%
-        total_prob = sum(severity_probs.values())
-        severity_probs = {k: (v / total_prob) * 100 for k, v in severity_probs.items()}
-        
-        # Determine final label after adjustment
-        severity_label = max(severity_probs, key=severity_probs.get)
-        severity_confidence = severity_probs[severity_label] / 100.0
-        
-        # Round for display
-        severity_probs = {k: round(v, 1) for k, v in severity_probs.items()}
-        # --------------------------------
-        
-        # Multi-label predictions (simplified)
-        ml_probs = [random.uniform(0.2, 0.8) for _ in multi_labels]
-        
-    except Exception as e:
-        print(f"Using simulated predictions due to: {e}")
-        
-        # ============= COMPREHENSIVE SEVERITY SCORING =============
-        # Calculate a composite "stress score" from all available features
-        
-        # 1. Emotion contribution (0-40 points)
-        detected_emotion = features.get('detected_emotion', 'Neutral')
-        emotion_conf = features.get('emotion_confidence', 0.5)
-        
-        emotion_stress_scores = {
-            'Angry': 35, 'Fear': 38, 'Sad': 32, 'Disgust': 28,
-            'Surprise': 15, 'Neutral': 5, 'Happy': 0
-        }
-        emotion_score = emotion_stress_scores.get(detected_emotion, 10) * emotion_conf
-        print(f"  [Severity] Emotion: {detected_emotion} ({emotion_conf:.2f}) -> score: {emotion_score:.1f}")
-        
-        # 2. Negative word contribution (0-30 points)
-        negative_count = features.get('negative_count', 0)  # Already percentage
-        negative_score = min(30, negative_count * 3)  # Cap at 30
-        print(f"  [Severity] Negative words: {negative_count:.1f}% -> score: {negative_score:.1f}")
-        
-        # 3. Absolutist words contribution (0-15 points)
-        absolutist_count = features.get('absolutist_count', 0)  # Already percentage
-        absolutist_score = min(15, absolutist_count * 2)  # Cap at 15
-        print(f"  [Severity] Absolutist words: {absolutist_count:.1f}% -> score: {absolutist_score:.1f}")
-        
-        # 4. Voice quality contribution (0-15 points)
-        # Higher jitter/shimmer often indicates distress
-        jitter = features.get('jitter', 0)
-        shimmer = features.get('shimmer', 0)
-        voice_score = min(15, (jitter + shimmer) * 1.5)
-        print(f"  [Severity] Voice (jitter={jitter:.1f}, shimmer={shimmer:.1f}) -> score: {voice_score:.1f}")
-        
-        # Total stress score (0-100)
-        total_stress = emotion_score + negative_score + absolutist_score + voice_score
-        print(f"  [Severity] TOTAL STRESS SCORE: {total_stress:.1f}/100")
-        
-        # Determine severity based on total score (lowered thresholds for sensitivity)
-        if total_stress >= 40:
-            severity_probs = {"Normal": 10, "Moderate": 30, "Severe": 60}
-            severity_label = "Severe"
-        elif total_stress >= 20:
-            severity_probs = {"Normal": 20, "Moderate": 55, "Severe": 25}
-            severity_label = "Moderate"
-        elif total_stress >= 10:
-            severity_probs = {"Normal": 45, "Moderate": 40, "Severe": 15}
-            severity_label = "Moderate"  # Borderline moderate instead of normal
-        else:
-            severity_probs = {"Normal": 70, "Moderate": 20, "Severe": 10}
-            severity_label = "Normal"
-        
-        severity_confidence = severity_probs[severity_label]
-        print(f"  [Severity] Final: {severity_label} ({severity_confidence}%)")
-        
-        ml_probs = [random.uniform(0.15, 0.75) for _ in multi_labels]
-    # Build anxiety indicators based on probabilities
-    # Show ALL relevant indicators, not just those connected to severity
-    anxiety_indicators = []
-    for i, label in enumerate(multi_labels):
-        # Skip "Neutral" - it's not an anxiety indicator
-        if label == "Neutral":
-            continue
-            
-        prob = float(ml_probs[i])
-        threshold = float(thresholds[i]) if i < len(thresholds) else 0.3
-        detected = bool(prob >= threshold)
-        
-        # Show indicators with > 50% probability only
-        if prob <= 0.5:
-            continue
-        
-        indicator = {
-            'name': label.replace('_', ' '),
-            'detected': detected,
-            'probability': int(round(prob * 100)),  # No decimal
-            'threshold': int(round(threshold * 100)),  # No decimal
-            'insights': EDUCATIONAL_INSIGHTS.get(label, {})
-        }
-        anxiety_indicators.append(indicator)
-    
-    anxiety_indicators.sort(key=lambda x: (x['detected'], x['probability']), reverse=True)
-    
-    # User Request: If severity is Normal, don't show anxiety indicators
-    if severity_label == "Normal":
-        anxiety_indicators = []
+def process_recording(audio_path, live_transcript, folder_name, progress=None, include_timings=False):
+    """Feature extraction, prediction and Firebase save for one recording"""
+    start = time.perf_counter()
+    if worker_count():
+        # Per-stage callbacks cannot cross the process boundary
+        if progress is not None:
+            progress('worker', 'started')
+        result = dispatch(analyze_recording, audio_path, live_transcript, folder_name)
+        if progress is not None:
+            progress('worker', 'done')
+    else:
+        result = analyze_recording(audio_path, live_transcript, folder_name, progress=progress)
+    timings = result.pop('timings', {})
     
-    # Convert severity probabilities to integers
-    severity_probs_int = {k: int(round(v)) for k, v in severity_probs.items()}
+    # Queue the Firebase save (from the server process; clients are not fork-safe)
+    writer = get_result_writer()
+    if writer is not None:
+        import datetime
+        result['timestamp'] = datetime.datetime.now()
+        
+        # Saving to 'recordings' with a 'folder' field
+        writer.enqueue('recordings', dict(result))
+        print(f"Result queued for Firebase (Folder: {folder_name})")
+        if progress is not None:
+            progress('firebase', 'queued')
     
-    # Prepare emotion data
-    emotion_data = {
-        'label': features.get('detected_emotion', 'Neutral'),
-        'confidence': round(features.get('emotion_confidence', 0.0) * 100, 1)
-    }
+    elapsed = time.perf_counter() - start
+    metrics.request_seconds.observe(elapsed, endpoint='upload-audio')
+    if include_timings:
+        result['timings'] = dict(timings, total=round(elapsed, 4))
+    return result
 
-    return {
-        'success': True,
-        'severity': {
-            'level': severity_label,
-            'confidence': int(round(severity_confidence * 100)),  # Corrected scaling if needed, previously multiplied by 100 twice? No wait severity_confidence was divided by 100 at line 273. Wait let's check line 273. Yes it was.
-            'info': SEVERITY_INFO.get(severity_label, {}),
-            'probabilities': severity_probs_int
-        },
-        'emotion': emotion_data,
-        'anxiety_indicators': anxiety_indicators,
-        'detected_conditions': [ind['name'] for ind in anxiety_indicators if ind['detected']],
-        'summary': generate_summary(severity_label, anxiety_indicators, emotion_data)
-    }
+_job_manager = None
+_batch_job_manager = None
 
-def generate_summary(severity, indicators, emotion=None):
-    """Generate a cohesive summary string"""
-    summary = f"The analysis indicates a {severity} level of anxiety biomarkers. "
-    
-    if emotion and emotion['confidence'] > 50:
-        summary += f"The detected emotional tone is '{emotion['label']}'. "
-    
-    detected = [ind['name'] for ind in indicators if ind['detected']]
-    
-    if detected:
-        summary += f"Specific indicators detected include {', '.join(detected[:3])}"
-        if len(detected) > 3:
-            summary += f", and {len(detected)-3} others."
-        else:
-            summary += "."
-    else:
-        summary += "No specific anxiety disorder patterns were strongly detected."
-        
-    return summary
+def get_result_writer():
+    """Background Firestore writer, or None when Firebase is not configured"""
+    return result_writer
+
+def get_job_manager():
+    """Background job pool for async uploads (created on first use)"""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager()
+    return _job_manager
+
+def get_batch_job_manager():
+    """Separate, smaller job pool for /batch-score (created on first use)"""
+    global _batch_job_manager
+    if _batch_job_manager is None:
+        _batch_job_manager = JobManager(workers=BATCH_JOB_WORKERS, max_pending=BATCH_JOB_QUEUE_LIMIT)
+    return _batch_job_manager
+
+def _find_job(job_id):
+    """(manager, job) for a job ID from either pool, or (None, None)"""
+    for manager in (get_job_manager(), get_batch_job_manager()):
+        job = manager.get(job_id)
+        if job is not None:
+            return manager, job
+    return None, None
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Poll an async job: status, per-stage progress and, once done, the result"""
+    _, job = _find_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job(job_id):
+    """Server-sent-events stream of an async job's progress and result"""
+    manager, job = _find_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return Response(stream_with_context(manager.stream_events(job)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/batch-score', methods=['POST'])
+def batch_score():
+    """
+    Queue offline scoring of a server-side directory or manifest
+    JSON body: {"source": <dir|manifest>, "output": "name.csv|.parquet",
+    "resume": true}. source is relative to BATCH_INPUT_ROOT.
+    Returns a job ID; the result holds the output path.
+    """
+    from batch_scoring import score_batch, within_root
+    if not BATCH_INPUT_ROOT:
+        return jsonify({'error': 'Batch scoring over HTTP is disabled (BATCH_INPUT_ROOT not set)'}), 403
+    data = request.get_json(silent=True) or {}
+    source = data.get('source')
+    # Same answer for missing and out-of-root paths, so nothing outside can be probed
+    if source:
+        source = os.path.realpath(os.path.join(BATCH_INPUT_ROOT, source))
+    if not source or not within_root(source, BATCH_INPUT_ROOT) or not os.path.exists(source):
+        return jsonify({'error': 'source must be an existing directory or manifest under BATCH_INPUT_ROOT'}), 400
+
+    # Results only ever land in BATCH_OUTPUT_FOLDER
+    output_name = os.path.basename(data.get('output') or 'batch_results.csv')
+    os.makedirs(BATCH_OUTPUT_FOLDER, exist_ok=True)
+    output_path = os.path.join(BATCH_OUTPUT_FOLDER, output_name)
+    try:
+        job = get_batch_job_manager().submit(score_batch, source, output_path, kind='batch-score',
+                                             resume=bool(data.get('resume', True)),
+                                             input_root=BATCH_INPUT_ROOT)
+    except QueueFullError as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = '60'
+        return response, 429
+    return jsonify({'job_id': job.id, 'status': job.status, 'output': output_path}), 202
 
 @app.route('/predict', methods=['POST'])
 def predict():
@@ -506,10 +284,44 @@ def get_sample_features():
     sample_features = np.random.randn(n_features).tolist()
     return jsonify({'n_features': n_features, 'sample_features': sample_features})
 
+@app.route('/api/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Feature/embedding cache hit and miss counters"""
+    from feature_cache import get_feature_cache
+    return jsonify(get_feature_cache().stats())
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Stage latency histograms, fallback counters and model load times (Prometheus text format)"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/persistence-stats', methods=['GET'])
+def get_persistence_stats():
+    """Firestore writer queue depth, batch commits, retries and journal spill"""
+    writer = get_result_writer()
+    if writer is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(writer.stats(), enabled=True))
+
+@app.route('/api/emotion-stats', methods=['GET'])
+def get_emotion_stats():
+    """Emotion pre-screen skip rate and agreement with Wav2Vec2"""
+    from emotion_prescreen import get_prescreen, prescreen_stats
+    return jsonify(dict(prescreen_stats.to_dict(), enabled=get_prescreen() is not None))
+
+@app.route('/health', methods=['GET'])
+def health():
+    """Readiness probe: 200 once models are loaded and warmed up"""
+    if not is_ready():
+        return jsonify({'status': 'warming_up'}), 503
+    return jsonify({'status': 'ready', 'workers': worker_count()})
+
 if __name__ == '__main__':
-    load_model()
+    # Load models, fork workers (AUDIO_WORKERS) and warm up before serving
+    start_workers(load_model, run_prediction)
     print("\n" + "=" * 50)
     print("  Audio Biomarker Server (Real Implementation)")
     print("  Running at http://127.0.0.1:5000")
     print("=" * 50 + "\n")
-    app.run(debug=True, port=5000)
+    # No reloader: it would re-import this module and load every model twice
+    app.run(debug=True, port=5000, threaded=True, use_reloader=False)
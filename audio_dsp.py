@@ -0,0 +1,357 @@
+"""
+Audio DSP Module
+Zero-copy framing, frame-level features and the framed FFT autocorrelation
+engine used for pitch and HNR estimation
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Short-time frames for shimmer/energy and other frame-level features
+FRAME_SEC = 0.025  # 25ms frames
+HOP_SEC = 0.010    # 10ms hop
+
+# Pitch search range for the autocorrelation peak (Hz)
+PITCH_MIN_HZ = 50
+PITCH_MAX_HZ = 500
+
+# Analysis window for per-frame pitch/HNR
+HNR_FRAME_SEC = 0.040
+
+# Frames transformed per FFT batch (bounds memory on long clips)
+HNR_BLOCK_FRAMES = 2048
+
+# Normalized autocorrelation peak above which a frame counts as voiced
+VOICING_THRESHOLD = 0.3
+
+# Fraction of the peak a shorter lag must reach to be taken as the period
+OCTAVE_TOLERANCE = 0.9
+
+# Voice activity detection: a frame is speech if its energy is this far
+# above the noise floor (a low percentile of frame energies), or a little
+# less far but with a high zero-crossing rate (unvoiced consonants)
+VAD_MARGIN_DB = 12.0
+VAD_UNVOICED_MARGIN_DB = 6.0
+VAD_UNVOICED_ZCR = 0.25
+VAD_NOISE_PERCENTILE = 10
+# The noise floor is kept between these levels (dBFS): never above the
+# first, so a clip with no quiet frames (steady speech, a loud tone) is not
+# measured against itself, and never below the second
+VAD_ABS_FLOOR_DB = -50.0
+VAD_MIN_FLOOR_DB = -80.0
+# Frames quieter than this are digital silence (zero padding, muted input)
+# and are left out of the noise-floor estimate
+VAD_SILENCE_DB = -100.0
+# Gaps shorter than VAD_MIN_PAUSE_SEC are bridged, segments shorter than
+# VAD_MIN_SPEECH_SEC dropped, and kept segments padded by VAD_PAD_SEC
+VAD_MIN_PAUSE_SEC = 0.3
+VAD_MIN_SPEECH_SEC = 0.1
+VAD_PAD_SEC = 0.1
+
+def _next_pow2(n):
+    """Smallest power of two >= n"""
+    return 1 << (int(n) - 1).bit_length()
+
+def frame_signal(y, frame_length, hop_length):
+    """
+    Zero-copy (n_frames, frame_length) frame matrix over y
+
+    Frames start at 0, hop_length, 2*hop_length, ... strictly before
+    len(y) - frame_length, the slicing the shimmer feature was trained with.
+    The result is a read-only strided view; nothing is copied.
+    """
+    y = np.asarray(y)
+    if len(y) <= frame_length:
+        return sliding_window_view(np.zeros(frame_length, dtype=y.dtype), frame_length)[:0]
+    n_frames = -(-(len(y) - frame_length) // hop_length)
+    return sliding_window_view(y, frame_length)[::hop_length][:n_frames]
+
+def frame_rms(frames):
+    """RMS of every row of a frame matrix, without materialising frames**2"""
+    if len(frames) == 0:
+        return np.zeros(0)
+    power = np.einsum('ij,ij->i', frames, frames, dtype=np.float64) / frames.shape[1]
+    return np.sqrt(power)
+
+def frame_zero_crossings(y, frame_length, hop_length):
+    """
+    Zero-crossing rate of every frame from frame_signal, via a running count
+    of sign changes instead of a per-frame diff
+    """
+    signs = np.sign(np.asarray(y)).astype(np.int8)
+    changes = np.concatenate(([0], np.cumsum(signs[1:] != signs[:-1], dtype=np.int64)))
+    n_frames = len(frame_signal(y, frame_length, hop_length))
+    starts = np.arange(n_frames) * hop_length
+    counts = changes[starts + frame_length - 1] - changes[starts]
+    return counts / float(frame_length - 1)
+
+def sign_change_jitter(y):
+    """
+    Jitter approximation from zero-crossing variation: std/mean (%) of
+    |diff(sign(y))|. Computed from value counts of the int8 sign differences
+    so no float arrays the size of the clip are allocated.
+    """
+    signs = np.sign(np.asarray(y)).astype(np.int8)
+    return jitter_from_counts(sign_change_counts(signs))
+
+def sign_change_counts(signs):
+    """Counts of |diff(signs)| == 0, 1, 2 for an int8 sign array"""
+    if len(signs) < 2:
+        return np.zeros(3, dtype=np.int64)
+    return np.bincount(np.abs(np.diff(signs)), minlength=3)
+
+def jitter_from_counts(counts):
+    """Jitter (%) from sign_change_counts(); additive across blocks"""
+    n = counts.sum()
+    if n < 2:
+        return 0.0
+    mean = (counts[1] + 2 * counts[2]) / n
+    var = max((counts[1] + 4 * counts[2]) / n - mean ** 2, 0.0)
+    return float(np.sqrt(var) / (mean + 1e-10) * 100)
+
+def frame_features(y, sr, frame_sec=FRAME_SEC, hop_sec=HOP_SEC):
+    """
+    Frame-level features computed in batch from a single frame matrix
+
+    Returns clip-level 'jitter', 'shimmer', 'energy_mean', 'energy_std' and
+    the per-frame 'frame_rms' / 'frame_zcr' arrays they are built from.
+    """
+    frame_length = int(frame_sec * sr)
+    hop_length = int(hop_sec * sr)
+    frames = frame_signal(y, frame_length, hop_length)
+
+    rms = frame_rms(frames)
+    if len(rms) > 1:
+        shimmer = np.mean(np.abs(np.diff(rms))) / (np.mean(rms) + 1e-10) * 100
+    else:
+        shimmer = 0.0
+
+    return {
+        'jitter': sign_change_jitter(y),
+        'shimmer': float(shimmer),
+        'energy_mean': float(np.mean(rms)) if len(rms) else 0.0,
+        'energy_std': float(np.std(rms)) if len(rms) else 0.0,
+        'frame_rms': rms,
+        'frame_zcr': frame_zero_crossings(y, frame_length, hop_length),
+        'frame_times': np.arange(len(rms)) * hop_length / sr,
+    }
+
+def hnr_from_autocorr(autocorr, min_lag, max_lag):
+    """
+    HNR (dB) from an autocorrelation sequence, using the strongest peak in
+    [min_lag, max_lag). Same formula the single-window path has always used.
+    Returns (hnr, peak_lag)
+    """
+    if len(autocorr) > max_lag:
+        peak_idx = int(np.argmax(autocorr[min_lag:max_lag])) + min_lag
+    else:
+        peak_idx = 1
+    hnr = 10 * np.log10(autocorr[0] / (np.abs(autocorr[peak_idx]) + 1e-10) + 1e-10)
+    return float(np.clip(hnr, 0, 40)), peak_idx
+
+def lag_autocorrelation(y, n_lags, frame_length, block_frames=HNR_BLOCK_FRAMES, core_length=None):
+    """
+    Short-lag autocorrelation per frame using FFT (Wiener-Khinchin)
+
+    Each row k holds sum(y[t] * y[t + lag]) for t inside the k-th
+    non-overlapping frame and lag in [0, n_lags). The frame is correlated
+    against itself plus the next n_lags samples, so summing the rows gives
+    exactly the full-signal autocorrelation at those lags in O(n log frame)
+    instead of O(n^2).
+
+    core_length limits the frames to the first core_length samples; the
+    rest of y is lookahead only (used by block-wise streaming so the block
+    sums stay exact across block boundaries).
+    Returns (n_frames, n_lags) float64 array
+    """
+    y = np.asarray(y, dtype=np.float64)
+    if core_length is None:
+        core_length = len(y)
+    n_frames = max(1, -(-core_length // frame_length))
+
+    padded = np.zeros(max(n_frames * frame_length + n_lags, len(y)))
+    padded[:len(y)] = y
+    # Zero-copy (n_frames, frame_length + n_lags) view over the padded signal
+    extended = sliding_window_view(padded, frame_length + n_lags)[::frame_length][:n_frames]
+    if core_length < len(y):
+        cores = np.zeros(n_frames * frame_length)
+        cores[:core_length] = y[:core_length]
+        cores = cores.reshape(n_frames, frame_length)
+    else:
+        cores = extended[:, :frame_length]
+
+    nfft = _next_pow2(frame_length + n_lags)
+    out = np.empty((n_frames, n_lags))
+    for start in range(0, n_frames, block_frames):
+        block = extended[start:start + block_frames]
+        core_spec = np.fft.rfft(cores[start:start + block_frames], n=nfft, axis=1)
+        ext_spec = np.fft.rfft(block, n=nfft, axis=1)
+        corr = np.fft.irfft(np.conj(core_spec) * ext_spec, n=nfft, axis=1)
+        out[start:start + block_frames] = corr[:, :n_lags]
+    return out
+
+def pitch_hnr_track(y, sr, frame_sec=HNR_FRAME_SEC):
+    """
+    Framed pitch and HNR estimation
+
+    Returns a dict with the clip-level 'hnr' (identical to the legacy
+    whole-signal autocorrelation), per-frame 'frame_hnr', 'frame_pitch',
+    'frame_voiced' arrays and their aggregates over voiced frames.
+    """
+    min_lag, max_lag, frame_length = pitch_frame_params(sr, frame_sec)
+
+    # One lag past the search range so the clip-level path sees len > max_lag
+    autocorr = lag_autocorrelation(y, max_lag + 1, frame_length)
+
+    # Clip-level HNR: the frame rows sum to the full-signal autocorrelation
+    total = autocorr.sum(axis=0)[:len(y)]
+    hnr, _ = hnr_from_autocorr(total, min_lag, max_lag)
+
+    frame_hnr, frame_pitch, voiced = frame_pitch_hnr(autocorr, sr)
+
+    if np.any(voiced):
+        hnr_mean = float(np.mean(frame_hnr[voiced]))
+        hnr_std = float(np.std(frame_hnr[voiced]))
+        pitch_mean = float(np.mean(frame_pitch[voiced]))
+        pitch_std = float(np.std(frame_pitch[voiced]))
+    else:
+        hnr_mean = hnr_std = pitch_mean = pitch_std = 0.0
+
+    return {
+        'hnr': hnr,
+        'hnr_mean': hnr_mean,
+        'hnr_std': hnr_std,
+        'pitch_mean': pitch_mean,
+        'pitch_std': pitch_std,
+        'voiced_ratio': float(np.mean(voiced)),
+        'frame_hnr': frame_hnr,
+        'frame_pitch': frame_pitch,
+        'frame_voiced': voiced,
+        'frame_times': np.arange(len(autocorr)) * frame_length / sr,
+    }
+
+def pitch_frame_params(sr, frame_sec=HNR_FRAME_SEC):
+    """(min_lag, max_lag, frame_length) for the pitch search range"""
+    min_lag = int(sr / PITCH_MAX_HZ)
+    max_lag = int(sr / PITCH_MIN_HZ)
+    return min_lag, max_lag, max(int(frame_sec * sr), max_lag)
+
+def frame_pitch_hnr(autocorr, sr):
+    """
+    Per-frame HNR (dB), pitch (Hz) and voicing from lag_autocorrelation rows
+    Returns (frame_hnr, frame_pitch, voiced)
+    """
+    min_lag, max_lag, _ = pitch_frame_params(sr)
+    rows = np.arange(len(autocorr))
+    peak_lag = np.argmax(autocorr[:, min_lag:max_lag], axis=1) + min_lag
+    energy = autocorr[:, 0]
+    peak = autocorr[rows, peak_lag]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frame_hnr = 10 * np.log10(energy / (np.abs(peak) + 1e-10) + 1e-10)
+        periodicity = np.where(energy > 1e-10, peak / energy, 0.0)
+    frame_hnr = np.clip(np.nan_to_num(frame_hnr), 0, 40)
+
+    # Pitch from the shortest lag close to the peak (guards against picking
+    # a multiple of the period, which the unnormalized correlation favours)
+    candidates = autocorr[:, min_lag:max_lag]
+    near_peak = candidates >= (OCTAVE_TOLERANCE * peak)[:, None]
+    first = np.argmax(near_peak, axis=1)
+    # Refine to the local maximum within one shortest period of that lag
+    window = np.minimum(first[:, None] + np.arange(min_lag), candidates.shape[1] - 1)
+    period = first + np.argmax(candidates[rows[:, None], window], axis=1) + min_lag
+    frame_pitch = sr / period
+    voiced = periodicity >= VOICING_THRESHOLD
+    return frame_hnr, frame_pitch, voiced
+
+def _runs(mask):
+    """(start, end) index pairs of the True runs in a boolean array"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+def voice_activity(y, sr, frame_sec=FRAME_SEC, hop_sec=HOP_SEC):
+    """
+    Energy/ZCR voice activity detection on the frame_features framing
+
+    Returns a dict with 'segments' (speech (start, end) sample ranges),
+    'frame_speech' (per-frame decisions after smoothing) and the stats
+    'speech_ratio', 'speech_sec', 'pause_count', 'pause_mean_sec' and
+    'segment_count'.
+    """
+    y = np.asarray(y)
+    frame_length = int(frame_sec * sr)
+    hop_length = int(hop_sec * sr)
+    rms = frame_rms(frame_signal(y, frame_length, hop_length))
+    duration = len(y) / float(sr)
+    if len(rms) == 0:
+        return {'segments': [(0, len(y))] if len(y) else [], 'frame_speech': np.zeros(0, dtype=bool),
+                'speech_ratio': 1.0 if len(y) else 0.0, 'speech_sec': duration,
+                'pause_count': 0, 'pause_mean_sec': 0.0, 'segment_count': 1 if len(y) else 0}
+
+    energy_db = 20 * np.log10(rms + 1e-10)
+    live = energy_db[energy_db > VAD_SILENCE_DB]
+    floor = np.percentile(live, VAD_NOISE_PERCENTILE) if len(live) else VAD_MIN_FLOOR_DB
+    floor = float(np.clip(floor, VAD_MIN_FLOOR_DB, VAD_ABS_FLOOR_DB))
+    zcr = frame_zero_crossings(y, frame_length, hop_length)
+    speech = (energy_db > floor + VAD_MARGIN_DB) | (
+        (energy_db > floor + VAD_UNVOICED_MARGIN_DB) & (zcr > VAD_UNVOICED_ZCR))
+
+    # Bridge short pauses, then drop blips
+    for start, end in _runs(~speech):
+        if start > 0 and end < len(speech) and (end - start) * hop_sec < VAD_MIN_PAUSE_SEC:
+            speech[start:end] = True
+    for start, end in _runs(speech):
+        if (end - start) * hop_sec < VAD_MIN_SPEECH_SEC:
+            speech[start:end] = False
+
+    pad = int(VAD_PAD_SEC * sr)
+    segments = []
+    for start, end in _runs(speech):
+        seg_start = int(max(0, start * hop_length - pad))
+        seg_end = int(min(len(y), (end - 1) * hop_length + frame_length + pad))
+        if segments and seg_start <= segments[-1][1]:
+            segments[-1] = (segments[-1][0], seg_end)
+        else:
+            segments.append((seg_start, seg_end))
+
+    speech_samples = sum(end - start for start, end in segments)
+    pauses = [(b[0] - a[1]) / sr for a, b in zip(segments, segments[1:])]
+    return {
+        'segments': segments,
+        'frame_speech': speech,
+        'speech_ratio': float(speech_samples / len(y)),
+        'speech_sec': float(speech_samples / sr),
+        'pause_count': len(pauses),
+        'pause_mean_sec': float(np.mean(pauses)) if pauses else 0.0,
+        'segment_count': len(segments),
+    }
+
+class RunningStats:
+    """
+    Streaming mean/variance (Welford/Chan) over scalars or fixed-size
+    vectors; batches are merged in O(1) memory
+    """
+
+    def __init__(self, shape=()):
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self._m2 = np.zeros(shape)
+
+    def update(self, values):
+        """Add a batch of observations (first axis indexes observations)"""
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if n == 0:
+            return
+        batch_mean = values.mean(axis=0)
+        batch_m2 = ((values - batch_mean) ** 2).sum(axis=0)
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * (n / total)
+        self._m2 = self._m2 + batch_m2 + delta ** 2 * (self.count * n / total)
+        self.count = total
+
+    @property
+    def std(self):
+        if self.count == 0:
+            return np.zeros_like(self.mean)
+        return np.sqrt(self._m2 / self.count)
@@ -3,24 +3,29 @@ Audio Feature Extraction Module
 Extracts jitter, shimmer, HNR, MFCC, BERT embeddings, and text analysis features
 """
 
+import io
 import numpy as np
 import os
 import tempfile
 import subprocess
+import threading
 import warnings
 warnings.filterwarnings('ignore')
 
-# Feature names expected by the model
-AUDIO_FEATURES = ['jitter', 'shimmer', 'hnr']
-MFCC_FEATURES = [f'mfcc_{i}' for i in range(13)]
-BERT_FEATURES = [f'bert_{i}' for i in range(768)]
-
-# Text analysis feature categories (simplified LIWC-style)
-TEXT_FEATURES = [
-    'cognitive', 'negative', 'pronoun', 'absolutist',
-    'transcript_length', 'word_count', 'avg_word_length',
-    'sentence_count', 'question_count', 'exclamation_count'
-]
+from audio_dsp import frame_features, pitch_hnr_track, voice_activity
+from decoders import UnsupportedAudio, decode_native
+from embedding_service import EmbeddingService
+from emotion_prescreen import get_prescreen, tiered_emotion
+from feature_cache import buffer_digest, content_key, file_digest, get_feature_cache
+# Feature name lists now live with the column layout; re-exported here
+from feature_schema import AUDIO_FEATURES, BERT_FEATURES, FEATURE_SCHEMA, MFCC_FEATURES, TEXT_FEATURES
+from inference_backends import bert_backend, emotion_backend, get_backend_name
+from lexicon import LexiconStore, tokenize
+from metrics import decodes, fallbacks, timed_load
+from pipeline import Stage, run_stages
+from resampler import resample
+from streaming_features import STREAM_MIN_SEC, extract_audio_features_streaming, wav_duration
+from transcription import TranscriptionError, backend_version, transcribe
 
 # Word lists for text analysis (English + Tagalog for Taglish support)
 COGNITIVE_WORDS = [
@@ -60,45 +65,44 @@ ABSOLUTIST_WORDS = [
     'mismo', 'talaga', 'tunay', 'sobra', 'todo'
 ]
 
+# Compiled once; LEXICON_DIR files replace these lists and are hot-reloaded
+TEXT_LEXICON = LexiconStore({
+    'cognitive': COGNITIVE_WORDS,
+    'negative': NEGATIVE_WORDS,
+    'pronoun': PRONOUNS,
+    'absolutist': ABSOLUTIST_WORDS,
+})
+
+# Pretrained models; their names are part of every cache key
+BERT_MODEL_NAME = 'bert-base-uncased'
+EMOTION_MODEL_NAME = 'superb/wav2vec2-base-superb-er'
+
+# torch / torch-int8 / onnx / onnx-int8 (INFERENCE_BACKEND); outputs differ
+# slightly between backends, so it is part of the cache keys too
+INFERENCE_BACKEND = get_backend_name()
+BERT_VERSION = f"{BERT_MODEL_NAME}|{INFERENCE_BACKEND}"
+
+# Trim silence before the heavy stages (detect_speech); this changes the
+# acoustic features, so it is part of the cache keys too
+VAD_ENABLED = os.environ.get('VAD_ENABLED', '1') != '0'
+
+# Bump when extraction logic changes so cached feature sets are not reused
+FEATURE_CACHE_VERSION = 8
+FEATURES_VERSION = (f"{BERT_MODEL_NAME}|{EMOTION_MODEL_NAME}|{INFERENCE_BACKEND}|stt:{backend_version()}"
+                    f"|vad:{int(VAD_ENABLED)}|v{FEATURE_CACHE_VERSION}")
+
 # BERT model (lazy loaded)
 _bert_model = None
 _bert_tokenizer = None
 
-def convert_to_wav(input_path):
-    """
-    Convert audio file to WAV format using scipy or pydub
-    Returns path to WAV file
-    """
-    output_path = input_path.rsplit('.', 1)[0] + '_converted.wav'
-    
-    try:
-        # Try using pydub (handles many formats)
-        from pydub import AudioSegment
-        audio = AudioSegment.from_file(input_path)
-        audio = audio.set_frame_rate(16000).set_channels(1)
-        audio.export(output_path, format='wav')
-        print(f"  Converted to WAV using pydub: {output_path}")
-        return output_path
-    except Exception as e:
-        print(f"  Pydub conversion failed: {e}")
-    
-    try:
-        # Try using scipy directly for wav files
-        import scipy.io.wavfile as wav
-        sr, data = wav.read(input_path)
-        wav.write(output_path, 16000, data)
-        return output_path
-    except Exception as e:
-        print(f"  Scipy conversion failed: {e}")
-    
-    # Return original path if conversion fails
-    return input_path
+# Micro-batching front end for the BERT model (lazy started)
+_embedding_service = None
+_embedding_service_lock = threading.Lock()
 
 def load_audio_scipy(audio_path, target_sr=16000):
     """Load audio using scipy (fallback when librosa fails)"""
     try:
         import scipy.io.wavfile as wav
-        from scipy import signal
         
         sr, data = wav.read(audio_path)
         
@@ -112,10 +116,9 @@ def load_audio_scipy(audio_path, target_sr=16000):
         elif data.dtype == np.int32:
             data = data.astype(np.float32) / 2147483648.0
         
-        # Resample if needed
+        # Resample if needed (polyphase, filter cached per rate pair)
         if sr != target_sr:
-            num_samples = int(len(data) * target_sr / sr)
-            data = signal.resample(data, num_samples)
+            data = resample(data, sr, target_sr)
             sr = target_sr
         
         return data, sr
@@ -123,6 +126,84 @@ def load_audio_scipy(audio_path, target_sr=16000):
         print(f"  Scipy load failed: {e}")
         raise
 
+class DecodedAudio:
+    """
+    Audio decoded once per request: float32 mono samples held in memory.
+    Passed to every pipeline stage so nothing re-decodes or touches disk.
+    """
+
+    def __init__(self, samples, sr, source=None):
+        self.samples = np.ascontiguousarray(samples, dtype=np.float32)
+        self.sr = sr
+        self.source = source
+
+    @property
+    def duration(self):
+        return len(self.samples) / float(self.sr)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __repr__(self):
+        return f"DecodedAudio({self.duration:.2f}s @ {self.sr}Hz, source={self.source!r})"
+
+def decode_audio(source, target_sr=16000):
+    """
+    Decode an audio file path or file-like object straight to a DecodedAudio
+    (float32, mono, target_sr) without writing intermediate files
+    """
+    if isinstance(source, DecodedAudio):
+        return source
+    
+    name = source if isinstance(source, str) else getattr(source, 'name', None)
+    
+    # In-process decoders first (no ffmpeg subprocess per upload)
+    try:
+        samples, fmt, decoder = decode_native(source, target_sr)
+        decodes.inc(format=fmt, decoder=decoder)
+        print(f"  Decoded in process ({fmt} via {decoder}): {name}")
+        return DecodedAudio(samples, target_sr, source=name)
+    except (UnsupportedAudio, OSError) as e:
+        print(f"  Native decode unavailable: {e}")
+        if hasattr(source, 'seek'):
+            source.seek(0)
+    
+    try:
+        # Fall back to pydub/ffmpeg (handles many formats)
+        from pydub import AudioSegment
+        audio = AudioSegment.from_file(source)
+        audio = audio.set_frame_rate(target_sr).set_channels(1)
+        samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+        samples /= float(1 << (8 * audio.sample_width - 1))
+        decodes.inc(format='unknown', decoder='pydub')
+        fallbacks.inc(path='pydub_decode')
+        print(f"  Decoded using pydub: {name}")
+        return DecodedAudio(samples, target_sr, source=name)
+    except Exception as e:
+        fallbacks.inc(path='pydub_failed')
+        print(f"  Pydub decode failed: {e}")
+        if hasattr(source, 'seek'):
+            source.seek(0)
+    
+    # Load audio using scipy (more reliable on Windows)
+    try:
+        y, sr = load_audio_scipy(source, target_sr=target_sr)
+        decodes.inc(format='wav', decoder='scipy')
+    except Exception:
+        # Fallback to librosa
+        fallbacks.inc(path='librosa_decode')
+        import librosa
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        y, sr = librosa.load(source, sr=target_sr)
+    return DecodedAudio(y, sr, source=name)
+
+def _register_model_versions():
+    """Cache invalidation hook: drop cached results made by other models"""
+    cache = get_feature_cache()
+    cache.set_model_version('bert', BERT_VERSION)
+    cache.set_model_version('features', FEATURES_VERSION)
+
 def load_bert_model():
     """Lazy load BERT model for embeddings"""
     global _bert_model, _bert_tokenizer
@@ -131,38 +212,53 @@ def load_bert_model():
         try:
             from transformers import BertTokenizer, BertModel
             import torch
-            _bert_tokenizer = BertTokenizer.from_pretrained('bert-base-uncased')
-            _bert_model = BertModel.from_pretrained('bert-base-uncased')
-            _bert_model.eval()
-            print("BERT model loaded!")
+            with timed_load('bert'):
+                _bert_tokenizer = BertTokenizer.from_pretrained(BERT_MODEL_NAME)
+                model = BertModel.from_pretrained(BERT_MODEL_NAME)
+                model.eval()
+                _bert_model = bert_backend(model, _bert_tokenizer, BERT_MODEL_NAME, INFERENCE_BACKEND)
+            print(f"BERT model loaded! (backend: {INFERENCE_BACKEND})")
+            _register_model_versions()
         except Exception as e:
             print(f"Failed to load BERT model: {e}")
             return None, None
     return _bert_tokenizer, _bert_model
 
-def extract_audio_features(audio_path, sr=16000):
+# Fall back to the whole clip when less than this much speech is found
+VAD_MIN_KEEP_SEC = 1.0
+
+def detect_speech(audio):
     """
-    Extract audio features: jitter, shimmer, HNR, and MFCC
+    Voice activity detection on a DecodedAudio
+    Returns {'audio': DecodedAudio of the voiced regions, 'segments': [...],
+    'stats': {...}}; stats become extra features
     """
-    print(f"Extracting audio features from: {audio_path}")
-    
-    # Try to convert to wav first
-    wav_path = convert_to_wav(audio_path)
-    
-    # Load audio using scipy (more reliable on Windows)
+    if not VAD_ENABLED:
+        return {'audio': audio, 'segments': [(0, len(audio))], 'stats': {}}
     try:
-        y, sr = load_audio_scipy(wav_path, target_sr=sr)
-    except:
-        # Fallback to librosa
-        import librosa
-        y, sr = librosa.load(wav_path, sr=sr)
-    
-    # Cleanup temp file if we created one
-    if wav_path != audio_path and os.path.exists(wav_path):
-        try:
-            os.remove(wav_path)
-        except:
-            pass
+        vad = voice_activity(audio.samples, audio.sr)
+    except Exception as e:
+        print(f"  VAD failed: {e}, using the whole clip")
+        return {'audio': audio, 'segments': [(0, len(audio))], 'stats': {}}
+    
+    stats = {'vad_' + key: vad[key] for key in
+             ('speech_ratio', 'speech_sec', 'pause_count', 'pause_mean_sec', 'segment_count')}
+    voiced = audio
+    if vad['speech_sec'] >= VAD_MIN_KEEP_SEC and vad['speech_ratio'] < 1.0:
+        samples = np.concatenate([audio.samples[start:end] for start, end in vad['segments']])
+        voiced = DecodedAudio(samples, audio.sr, source=f"{audio.source} [voiced]")
+    print(f"  VAD: {vad['segment_count']} speech segments, {vad['speech_sec']:.1f}s of {audio.duration:.1f}s "
+          f"({vad['speech_ratio']:.0%}), {vad['pause_count']} pauses")
+    return {'audio': voiced, 'segments': vad['segments'], 'stats': stats}
+
+def extract_audio_features(audio, sr=16000):
+    """
+    Extract audio features: jitter, shimmer, HNR, and MFCC
+    Accepts a DecodedAudio or a path to decode
+    """
+    audio = decode_audio(audio, target_sr=sr)
+    print(f"Extracting audio features from: {audio}")
+    y, sr = audio.samples, audio.sr
     
     # Basic checks
     if len(y) < sr * 0.5:
@@ -171,35 +267,19 @@ def extract_audio_features(audio_path, sr=16000):
     features = {}
     
     # Simple feature extraction without librosa.pyin (which can fail)
-    # Jitter approximation using zero-crossing rate variation
-    zcr = np.abs(np.diff(np.sign(y)))
-    if len(zcr) > 1:
-        jitter = np.std(zcr) / (np.mean(zcr) + 1e-10) * 100
-    else:
-        jitter = 0.0
-    features['jitter'] = float(np.clip(jitter, 0, 10))
-    
-    # Shimmer (amplitude variation)
-    frame_size = int(0.025 * sr)  # 25ms frames
-    hop_size = int(0.010 * sr)    # 10ms hop
-    
-    frames = [y[i:i+frame_size] for i in range(0, len(y)-frame_size, hop_size)]
-    if frames:
-        rms = [np.sqrt(np.mean(f**2)) for f in frames]
-        if len(rms) > 1:
-            shimmer = np.mean(np.abs(np.diff(rms))) / (np.mean(rms) + 1e-10) * 100
-        else:
-            shimmer = 0.0
-    else:
-        shimmer = 0.0
-    features['shimmer'] = float(np.clip(shimmer, 0, 20))
-    
-    # HNR approximation using autocorrelation
-    autocorr = np.correlate(y, y, mode='full')
-    autocorr = autocorr[len(autocorr)//2:]
-    peak_idx = np.argmax(autocorr[int(sr/500):int(sr/50)]) + int(sr/500) if len(autocorr) > int(sr/50) else 1
-    hnr = 10 * np.log10(autocorr[0] / (np.abs(autocorr[peak_idx]) + 1e-10) + 1e-10)
-    features['hnr'] = float(np.clip(hnr, 0, 40))
+    # Jitter (zero-crossing rate variation), shimmer (amplitude variation) and
+    # energy, all from one zero-copy 25ms/10ms frame matrix
+    frame_stats = frame_features(y, sr)
+    features['jitter'] = float(np.clip(frame_stats['jitter'], 0, 10))
+    features['shimmer'] = float(np.clip(frame_stats['shimmer'], 0, 20))
+    features['energy_mean'] = frame_stats['energy_mean']
+    features['energy_std'] = frame_stats['energy_std']
+    
+    # HNR approximation using framed FFT autocorrelation (50-500 Hz lags)
+    track = pitch_hnr_track(y, sr)
+    features['hnr'] = track['hnr']
+    for key in ('hnr_mean', 'hnr_std', 'pitch_mean', 'pitch_std'):
+        features[key] = track[key]
     
     # MFCC features using simple DCT
     try:
@@ -220,45 +300,29 @@ def extract_audio_features(audio_path, sr=16000):
     print(f"  Audio features extracted: jitter={features['jitter']:.2f}, shimmer={features['shimmer']:.2f}, hnr={features['hnr']:.2f}")
     return features
 
-def transcribe_audio(audio_path):
-    """Convert speech to text using Google Speech Recognition"""
+def transcribe_audio(audio, on_partial=None):
+    """
+    Convert speech to text with the configured backends (TRANSCRIBE_BACKENDS:
+    google, whisper, vosk); see transcription.py
+    Accepts a DecodedAudio or a path to decode; audio is fed from memory
+    on_partial(text), if given, receives partial transcripts from local engines
+    """
     print("Transcribing audio...")
     try:
-        import speech_recognition as sr
-    except ImportError:
-        print("  SpeechRecognition module not found. Skipping transcription.")
-        return ""
-    
-    recognizer = sr.Recognizer()
-    
-    # Convert to wav if needed
-    wav_path = convert_to_wav(audio_path)
-    
-    try:
-        with sr.AudioFile(wav_path) as source:
-            audio = recognizer.record(source)
-        
-        # Use Google Speech Recognition (free, no API key needed)
-        # Use fil-PH to support Tagalog/Taglish which matches training data
-        transcript = recognizer.recognize_google(audio, language='fil-PH')
-        print(f"  Transcript: '{transcript[:100]}...' ({len(transcript)} chars)")
+        audio = decode_audio(audio)
+        transcript, backend = transcribe(audio.samples, audio.sr, on_partial=on_partial)
+        if not transcript:
+            print(f"  [{backend}] Could not understand audio, using empty transcript")
+            return ""
+        print(f"  [{backend}] Transcript: '{transcript[:100]}...' ({len(transcript)} chars)")
         return transcript
         
-    except sr.UnknownValueError:
-        print("  Could not understand audio, using empty transcript")
-        return ""
-    except sr.RequestError as e:
+    except TranscriptionError as e:
         print(f"  Speech recognition error: {e}")
         return ""
     except Exception as e:
         print(f"  Transcription error: {e}")
         return ""
-    finally:
-        if wav_path != audio_path and os.path.exists(wav_path):
-            try:
-                os.remove(wav_path)
-            except:
-                pass
 
 def extract_text_features(transcript):
     """Extract LIWC-style text features"""
@@ -279,44 +343,55 @@ def extract_text_features(transcript):
     features['avg_word_length'] = np.mean([len(w) for w in words]) if words else 0
     features['sentence_count'] = transcript.count('.') + transcript.count('!') + transcript.count('?') + 1
     features['question_count'] = transcript.count('?')
-    features['exclamation_count'] = transcript.count('!')    # Word category counts (normalized by word count)
-    if word_count > 0:
-        features['cognitive_count'] = sum(1 for w in words if w in COGNITIVE_WORDS) / word_count * 100
-        features['negative_count'] = sum(1 for w in words if w in NEGATIVE_WORDS) / word_count * 100
-        features['pronoun_count'] = sum(1 for w in words if w in PRONOUNS) / word_count * 100
-        features['absolutist_count'] = sum(1 for w in words if w in ABSOLUTIST_WORDS) / word_count * 100
-    else:
-        features['cognitive_count'] = 0
-        features['negative_count'] = 0
-        features['pronoun_count'] = 0
-        features['absolutist_count'] = 0
+    features['exclamation_count'] = transcript.count('!')
+    
+    # Word category counts (normalized by word count), all categories in
+    # one pass over punctuation-stripped tokens, phrases included
+    counts = TEXT_LEXICON.get().count(tokenize(transcript))
+    for category, count in counts.items():
+        features[f'{category}_count'] = count / word_count * 100 if word_count > 0 else 0
     
     print(f"  Text features: {word_count} words, cognitive={features['cognitive_count']:.1f}%, negative={features['negative_count']:.1f}%")
     return features
 
+def get_embedding_service():
+    """Shared micro-batching BERT embedding service (lazy started)"""
+    global _embedding_service
+    if _embedding_service is None:
+        with _embedding_service_lock:
+            if _embedding_service is None:
+                _embedding_service = EmbeddingService(load_bert_model).start()
+    return _embedding_service
+
 def extract_bert_embeddings(transcript):
-    """Extract BERT embeddings from transcript"""
+    """
+    Extract BERT embeddings from transcript
+    Concurrent calls are batched together by the embedding service
+    """
     print("Extracting BERT embeddings...")
     
     if not transcript or len(transcript.strip()) == 0:
         print("  Empty transcript, using zero embeddings")
         return np.zeros(768)
     
+    cache = get_feature_cache()
+    cache_key = content_key(BERT_VERSION, transcript)
+    found, embedding = cache.get('bert', cache_key)
+    if found:
+        print("  BERT embedding cache hit")
+        return embedding
+    
     try:
-        import torch
-        tokenizer, model = load_bert_model()
-        
-        if model is None:
-            return np.zeros(768)
-        
-        with torch.no_grad():
-            inputs = tokenizer(transcript, return_tensors='pt', truncation=True, max_length=512, padding=True)
-            outputs = model(**inputs)
-            embeddings = outputs.last_hidden_state.mean(dim=1).squeeze().numpy()
-            return embeddings
-            
+        embedding = get_embedding_service().embed(transcript)
+        # Only cache real model output, not the zero-vector fallback
+        if _bert_model is not None:
+            cache.set('bert', cache_key, embedding)
+        else:
+            fallbacks.inc(path='bert_zero_vector')
+        return embedding
     except Exception as e:
         print(f"  BERT extraction failed: {e}")
+        fallbacks.inc(path='bert_zero_vector')
         return np.zeros(768)
 
 # Emotion recognition model (lazy loaded)
@@ -330,17 +405,80 @@ def load_emotion_model():
         try:
             from transformers import pipeline
             # Using SUPERB pre-trained model for Emotion Recognition
-            _emotion_pipeline = pipeline("audio-classification", model="superb/wav2vec2-base-superb-er")
-            print("Emotion model loaded!")
+            with timed_load('emotion'):
+                classifier = pipeline("audio-classification", model=EMOTION_MODEL_NAME)
+                _emotion_pipeline = emotion_backend(classifier, EMOTION_MODEL_NAME, INFERENCE_BACKEND)
+            print(f"Emotion model loaded! (backend: {INFERENCE_BACKEND})")
+            _register_model_versions()
         except Exception as e:
             print(f"Failed to load emotion model: {e}")
             return None
     return _emotion_pipeline
 
-def detect_emotion(audio_path):
+# Map pipeline labels to readable names
+EMOTION_LABEL_MAP = {
+    'neu': 'Neutral',
+    'hap': 'Happy',
+    'ang': 'Angry',
+    'sad': 'Sad',
+    'fea': 'Fear',
+    'dis': 'Disgust',
+    'sur': 'Surprise'
+}
+
+# Clips longer than one window are classified in overlapping windows so
+# attention memory depends on the window, not the clip length
+EMOTION_WINDOW_SEC = 8.0
+EMOTION_WINDOW_OVERLAP_SEC = 2.0
+EMOTION_WINDOW_BATCH = 4
+
+def emotion_windows(n_samples, sr, window_sec=EMOTION_WINDOW_SEC, overlap_sec=EMOTION_WINDOW_OVERLAP_SEC):
+    """
+    (start, end) sample ranges of equal-length overlapping windows covering
+    the clip; the last window is aligned to the end so none needs padding
+    """
+    window = int(window_sec * sr)
+    hop = max(1, window - int(overlap_sec * sr))
+    if n_samples <= window:
+        return [(0, n_samples)]
+    starts = list(range(0, n_samples - window + 1, hop))
+    if starts[-1] + window < n_samples:
+        starts.append(n_samples - window)
+    return [(start, start + window) for start in starts]
+
+def _emotion_label(raw_label):
+    return EMOTION_LABEL_MAP.get(raw_label, raw_label.capitalize())
+
+def _windowed_emotion(classifier, audio):
+    """
+    Classify overlapping windows in batches and average their class
+    probabilities. Returns (label, score, timeline)
+    """
+    windows = emotion_windows(len(audio.samples), audio.sr)
+    # Slices are views; only EMOTION_WINDOW_BATCH windows are in the model at once
+    inputs = [{'raw': audio.samples[start:end], 'sampling_rate': audio.sr} for start, end in windows]
+    outputs = classifier(inputs, top_k=None, batch_size=EMOTION_WINDOW_BATCH)
+    
+    labels = sorted({o['label'] for window in outputs for o in window})
+    probs = np.array([[{o['label']: o['score'] for o in window}.get(label, 0.0) for label in labels]
+                      for window in outputs])
+    mean = probs.mean(axis=0)
+    best = int(np.argmax(mean))
+    
+    timeline = []
+    for (start, end), row in zip(windows, probs):
+        top = int(np.argmax(row))
+        timeline.append({'start': round(start / audio.sr, 2), 'end': round(end / audio.sr, 2),
+                         'label': _emotion_label(labels[top]), 'score': float(row[top])})
+    print(f"  Windowed emotion over {len(windows)} windows of {EMOTION_WINDOW_SEC:.0f}s")
+    return _emotion_label(labels[best]), float(mean[best]), timeline
+
+def detect_emotion(audio):
     """
     Detect emotion using pre-trained Wav2Vec2 model
-    Returns: {label: 'Neutral', score: 0.95}
+    Accepts a DecodedAudio or a path to decode
+    Returns: {label: 'Neutral', score: 0.95}, plus a per-window 'timeline'
+    for clips longer than EMOTION_WINDOW_SEC
     """
     print("Detecting emotion...")
     
@@ -349,35 +487,20 @@ def detect_emotion(audio_path):
     
     if classifier is not None:
         try:
-            # Convert to wav format first for better compatibility
-            wav_path = convert_to_wav(audio_path)
-            
-            # Pipeline handles file paths directly
+            # Feed the decoded samples directly (no file path, no ffmpeg)
+            audio = decode_audio(audio)
             print(f"--- Emotion Model Pipeline Active: {classifier.model.__class__.__name__} ---")
-            outputs = classifier(wav_path, top_k=1)
+            if audio.duration > EMOTION_WINDOW_SEC:
+                label, score, timeline = _windowed_emotion(classifier, audio)
+                print(f"  Detected Emotion: {label} ({score:.2f})")
+                return {'label': label, 'score': score, 'timeline': timeline}
             
-            # Cleanup converted file if different
-            if wav_path != audio_path and os.path.exists(wav_path):
-                try:
-                    os.remove(wav_path)
-                except:
-                    pass
+            outputs = classifier({'raw': audio.samples, 'sampling_rate': audio.sr}, top_k=1)
             
             # outputs is list of dicts [{'score': 0.9, 'label': 'neu'}, ...]
-            # Map labels to readable names
-            label_map = {
-                'neu': 'Neutral',
-                'hap': 'Happy',
-                'ang': 'Angry',
-                'sad': 'Sad',
-                'fea': 'Fear',
-                'dis': 'Disgust',
-                'sur': 'Surprise'
-            }
-            
             top_result = outputs[0]
             raw_label = top_result['label']
-            label = label_map.get(raw_label, raw_label.capitalize())
+            label = _emotion_label(raw_label)
             score = top_result['score']
             
             print(f"  Detected Emotion: {label} ({score:.2f}) [raw: {raw_label}]")
@@ -402,48 +525,116 @@ def detect_emotion(audio_path):
     ]
     emotion, score = random.choice(fallback_emotions)
     print(f"  Using fallback emotion: {emotion} ({score:.2f})")
-    return {'label': emotion, 'score': score}
+    fallbacks.inc(path='emotion_fallback')
+    return {'label': emotion, 'score': score, 'fallback': True}
+
+def _use_transcript_override(transcript):
+    print(f"Using provided transcript: '{transcript[:100]}...'")
+    return transcript
 
-def extract_all_features(audio_path, transcript_override=None):
-    """Extract all features from an audio file"""
+def extract_all_features(audio_path, transcript_override=None, progress=None):
+    """
+    Extract all features from an audio file path or in-memory upload (BytesIO)
+    Independent stages run concurrently:
+    audio -> speech (VAD) -> {acoustic, emotion, transcript -> {text, bert}}
+    progress(stage, status), if given, receives per-stage progress events
+    """
     print("\n" + "="*50)
     print("FEATURE EXTRACTION PIPELINE")
     print("="*50)
     
-    features = {}
-    
-    # 1. Extract audio features
-    audio_features = extract_audio_features(audio_path)
-    features.update(audio_features)
-    
-    # 2. Extract emotion (NEW)
-    emotion_result = detect_emotion(audio_path)
-    features['detected_emotion'] = emotion_result['label']
-    features['emotion_confidence'] = emotion_result['score']
-    
-    # 3. Use provided transcript or transcribe using fil-PH
+    # Identical audio bytes + transcript override -> identical features
+    cache = get_feature_cache()
+    cache_key = None
+    digest = None
+    if isinstance(audio_path, str) and os.path.exists(audio_path):
+        digest = file_digest(audio_path)
+    elif isinstance(audio_path, io.BytesIO):
+        # In-memory upload (upload_ingest); same key as the bytes on disk
+        digest = buffer_digest(audio_path)
+    if digest is not None:
+        cache_key = content_key(FEATURES_VERSION, TEXT_LEXICON.get().version, digest, transcript_override or '')
+        found, cached = cache.get('features', cache_key)
+        if found:
+            features, transcript = cached
+            print(f"Feature cache hit ({len(features)} features)")
+            if progress is not None:
+                progress('features', 'cached')
+            return features.copy(), transcript
+    
+    # Use provided transcript or transcribe using fil-PH; an override has no
+    # dependency on the audio, so text/BERT can start while decoding
     if transcript_override:
-        transcript = transcript_override
-        print(f"Using provided transcript: '{transcript[:100]}...'")
+        transcript_stage = Stage('transcript', lambda: _use_transcript_override(transcript_override))
     else:
-        transcript = transcribe_audio(audio_path)
-    
-    # 4. Extract text features
-    text_features = extract_text_features(transcript)
-    features.update(text_features)
-    
-    # 5. Extract BERT embeddings
-    bert_embeddings = extract_bert_embeddings(transcript)
-    for i, val in enumerate(bert_embeddings):
-        features[f'bert_{i}'] = float(val)
+        on_partial = (lambda text: progress('transcript', 'partial: ' + text)) if progress is not None else None
+        transcript_stage = Stage('transcript', lambda speech: transcribe_audio(speech['audio'], on_partial=on_partial),
+                                 deps=['speech'], fallback=lambda: "")
+    
+    # Long WAV recordings: the acoustic features are streamed from the file
+    # over the voiced segments in fixed-size blocks, not computed over the
+    # whole decoded clip at once
+    if isinstance(audio_path, str) and (wav_duration(audio_path) or 0) >= STREAM_MIN_SEC:
+        acoustic_stage = Stage('acoustic', lambda audio, speech: extract_audio_features_streaming(
+            audio_path, segments=None if speech['audio'] is audio else speech['segments']), deps=['audio', 'speech'])
+    else:
+        acoustic_stage = Stage('acoustic', lambda speech: extract_audio_features(speech['audio']), deps=['speech'])
+    
+    # With a fitted pre-screen, emotion waits for the acoustic features and
+    # only runs Wav2Vec2 when the cheap estimate is uncertain
+    emotion_fallback = lambda: {'label': 'Neutral', 'score': 0.0, 'fallback': True}
+    if get_prescreen() is not None:
+        emotion_stage = Stage('emotion', lambda speech, acoustic: tiered_emotion(acoustic, lambda: detect_emotion(speech['audio'])),
+                              deps=['speech', 'acoustic'], fallback=emotion_fallback)
+    else:
+        emotion_stage = Stage('emotion', lambda speech: detect_emotion(speech['audio']), deps=['speech'],
+                              fallback=emotion_fallback)
+    
+    results = run_stages([
+        # Decode once and find the speech once; every stage below works on
+        # the in-memory voiced regions
+        Stage('audio', lambda: decode_audio(audio_path)),
+        Stage('speech', lambda audio: detect_speech(audio), deps=['audio']),
+        acoustic_stage,
+        emotion_stage,
+        transcript_stage,
+        Stage('text', lambda transcript: extract_text_features(transcript), deps=['transcript']),
+        Stage('bert', lambda transcript: extract_bert_embeddings(transcript), deps=['transcript'],
+              fallback=lambda: np.zeros(768)),
+    ], on_event=progress)
+    
+    # Model columns go straight into one preallocated float64 vector
+    features = FEATURE_SCHEMA.new_vector()
+    
+    # 1. Audio features and speech/pause statistics
+    features.update(results['acoustic'])
+    features.update(results['speech']['stats'])
+    
+    # 2. Emotion
+    emotion_result = results['emotion']
+    features.info['detected_emotion'] = emotion_result['label']
+    features.info['emotion_confidence'] = emotion_result['score']
+    if emotion_result.get('timeline'):
+        features.info['emotion_timeline'] = emotion_result['timeline']
+    
+    # 3-4. Transcript and text features
+    transcript = results['transcript']
+    features.update(results['text'])
+    
+    # 5. BERT embeddings
+    features.set_group('bert', results['bert'])
     
     print("="*50)
     print(f"Total features extracted: {len(features)}")
     print("="*50 + "\n")
     
+    # Cache only fully successful runs so retries after a model/STT failure
+    # are recomputed rather than served the fallback values
+    if cache_key and transcript and not emotion_result.get('fallback') and _bert_model is not None:
+        cache.set('features', cache_key, (features.copy(), transcript))
+    
     return features, transcript
 
-
 if __name__ == "__main__":
     import sys
     if len(sys.argv) > 1:
@@ -0,0 +1,211 @@
+"""
+Batch Scoring Module
+Scores a directory or manifest of recordings offline: extraction fans out
+across the worker processes, prediction runs once per chunk on the stacked
+feature matrix, and results go to CSV or Parquet. Finished rows are
+appended to a JSONL checkpoint so an interrupted run resumes where it
+stopped.
+
+Usage: python batch_scoring.py <directory|manifest.csv> -o results.csv [--workers 4]
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+
+from prediction import load_model, run_prediction, run_prediction_batch
+from workers import start_workers, submit
+
+AUDIO_EXTENSIONS = {'wav', 'webm', 'mp3', 'ogg', 'm4a'}
+
+# Recordings extracted and scored per prediction call
+BATCH_CHUNK_SIZE = 64
+
+SEVERITY_LEVELS = ["Normal", "Moderate", "Severe"]
+
+def _is_audio(name):
+    return '.' in name and name.rsplit('.', 1)[1].lower() in AUDIO_EXTENSIONS
+
+def within_root(path, root):
+    """True if path, with symlinks resolved, lies inside root"""
+    root = os.path.realpath(root)
+    return os.path.commonpath([os.path.realpath(path), root]) == root
+
+def collect_inputs(source, root=None):
+    """
+    List the recordings to score as dicts with 'path', 'transcript' and
+    'folder'. source is a directory (searched recursively) or a manifest:
+    a CSV with a 'path' column and optional 'transcript'/'folder' columns,
+    or a plain text file with one path per line. Relative manifest paths
+    are resolved against the manifest's directory. With root given, any
+    recording that resolves outside root is skipped.
+    """
+    items = _list_inputs(source)
+    if root is None:
+        return items
+    allowed = [item for item in items if within_root(item['path'], root)]
+    if len(allowed) < len(items):
+        print(f"Batch scoring: skipped {len(items) - len(allowed)} path(s) outside {root}")
+    return allowed
+
+def _list_inputs(source):
+    if os.path.isdir(source):
+        items = []
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if _is_audio(name):
+                    path = os.path.join(root, name)
+                    items.append({'path': path, 'transcript': None,
+                                  'folder': os.path.relpath(root, source)})
+        return sorted(items, key=lambda item: item['path'])
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, newline='', encoding='utf-8') as f:
+        if source.lower().endswith('.csv'):
+            rows = [{'path': row.get('path', '').strip(),
+                     'transcript': row.get('transcript') or None,
+                     'folder': row.get('folder') or 'batch'} for row in csv.DictReader(f)]
+        else:
+            rows = [{'path': line.strip(), 'transcript': None, 'folder': 'batch'}
+                    for line in f if line.strip() and not line.startswith('#')]
+    items = []
+    for row in rows:
+        if not row['path']:
+            continue
+        if not os.path.isabs(row['path']):
+            row['path'] = os.path.join(base, row['path'])
+        items.append(row)
+    return items
+
+def extract_item(path, transcript=None):
+    """
+    Feature extraction for one recording (runs in a worker process if enabled)
+    Recordings longer than STREAM_MIN_SEC are WAV paths here, so
+    extract_all_features streams their acoustic features from disk.
+    """
+    from audio_features import extract_all_features
+    return extract_all_features(path, transcript_override=transcript)
+
+def flatten_result(item, result=None, transcript='', error=None):
+    """One output row per recording"""
+    row = {'path': item['path'], 'folder': item.get('folder', ''), 'error': error or ''}
+    if result is None:
+        return row
+    severity = result['severity']
+    row.update({
+        'severity': severity['level'],
+        'severity_confidence': severity['confidence'],
+    })
+    for level in SEVERITY_LEVELS:
+        row[f'prob_{level.lower()}'] = severity['probabilities'].get(level, 0)
+    row.update({
+        'emotion': result['emotion']['label'],
+        'emotion_confidence': result['emotion']['confidence'],
+        'detected_conditions': ';'.join(result['detected_conditions']),
+        'summary': result['summary'],
+        'transcript': transcript,
+    })
+    return row
+
+def checkpoint_path(output_path):
+    return output_path + '.checkpoint.jsonl'
+
+def load_checkpoint(path):
+    """Rows already written by an earlier run, keyed by recording path"""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                # A run killed mid-write leaves a partial last line
+                continue
+            done[row['path']] = row
+    return done
+
+def write_results(rows, output_path):
+    """Write rows to Parquet (.parquet, needs pandas + pyarrow) or CSV"""
+    if output_path.lower().endswith('.parquet'):
+        import pandas as pd
+        pd.DataFrame(rows).to_parquet(output_path, index=False)
+        return
+    fields = []
+    for row in rows:
+        fields.extend(k for k in row if k not in fields)
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def score_chunk(items, model):
+    """Extract a chunk of recordings in parallel, then predict them in one call"""
+    futures = [submit(extract_item, item['path'], item['transcript']) for item in items]
+    rows = [None] * len(items)
+    extracted = []
+    for i, (item, future) in enumerate(zip(items, futures)):
+        try:
+            features, transcript = future.result()
+            extracted.append((i, features, transcript))
+        except Exception as e:
+            print(f"  Extraction failed for {item['path']}: {e}")
+            rows[i] = flatten_result(item, error=str(e))
+
+    if extracted:
+        results = run_prediction_batch([features for _, features, _ in extracted], model)
+        for (i, _, transcript), result in zip(extracted, results):
+            rows[i] = flatten_result(items[i], result, transcript)
+    return rows
+
+def score_batch(source, output_path, chunk_size=BATCH_CHUNK_SIZE, resume=True, progress=None, input_root=None):
+    """
+    Score every recording in source and write the results to output_path
+    (only recordings under input_root, if given).
+    Returns a summary dict (counts and output path).
+    """
+    items = collect_inputs(source, root=input_root)
+    ckpt = checkpoint_path(output_path)
+    if not resume and os.path.exists(ckpt):
+        os.remove(ckpt)
+    done = load_checkpoint(ckpt)
+    # Failed recordings are retried on resume
+    pending = [item for item in items if item['path'] not in done or done[item['path']].get('error')]
+    print(f"Batch scoring: {len(items)} recordings, {len(items) - len(pending)} already in checkpoint")
+
+    model = load_model()
+    start = time.time()
+    with open(ckpt, 'a', encoding='utf-8') as f:
+        for offset in range(0, len(pending), chunk_size):
+            chunk = pending[offset:offset + chunk_size]
+            for row in score_chunk(chunk, model):
+                f.write(json.dumps(row, default=str) + '\n')
+                done[row['path']] = row
+            f.flush()
+            os.fsync(f.fileno())
+            finished = min(offset + chunk_size, len(pending))
+            print(f"  Scored {finished}/{len(pending)} ({time.time() - start:.1f}s)")
+            if progress is not None:
+                progress('batch', f"{len(items) - len(pending) + finished}/{len(items)}")
+
+    rows = [done[item['path']] for item in items if item['path'] in done]
+    write_results(rows, output_path)
+    failed = sum(1 for row in rows if row.get('error'))
+    print(f"Wrote {len(rows)} rows to {output_path} ({failed} failed)")
+    return {'output': output_path, 'total': len(items), 'scored': len(rows) - failed,
+            'failed': failed, 'resumed': len(items) - len(pending)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help="directory of recordings or manifest (.csv / .txt)")
+    parser.add_argument('-o', '--output', default='batch_results.csv', help="output .csv or .parquet")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="extraction processes (0 = run in this process)")
+    parser.add_argument('--chunk-size', type=int, default=BATCH_CHUNK_SIZE)
+    parser.add_argument('--no-resume', action='store_true', help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    start_workers(load_model, run_prediction, args.workers)
+    score_batch(args.source, args.output, chunk_size=args.chunk_size, resume=not args.no_resume)
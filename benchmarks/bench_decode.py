@@ -0,0 +1,81 @@
+"""
+Decode Benchmark
+Per-format decode latency of each in-process decoder against the pydub
+path that spawns an ffmpeg subprocess, on real sample uploads. Every
+decoder starts from the bytes in memory and ends with float32 16 kHz mono.
+
+Usage: python benchmarks/bench_decode.py samples/ [more files or dirs] [--repeats 5]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from decoders import decode_native, native_decoders, sniff_format
+
+TARGET_SR = 16000
+
+def decode_ffmpeg(data):
+    """The pre-decoder path: pydub.AudioSegment.from_file (ffmpeg subprocess)"""
+    from pydub import AudioSegment
+    audio = AudioSegment.from_file(io.BytesIO(data)).set_frame_rate(TARGET_SR).set_channels(1)
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+    return samples / float(1 << (8 * audio.sample_width - 1))
+
+def collect(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += [os.path.join(path, name) for name in sorted(os.listdir(path))]
+        else:
+            files.append(path)
+    return [path for path in files if os.path.isfile(path)]
+
+def time_decoder(decode, data, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        samples = decode(data)
+        timings.append(time.perf_counter() - start)
+    return timings, len(samples) / TARGET_SR
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help="audio files or directories of them")
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    by_format = {}
+    for path in collect(args.paths):
+        with open(path, 'rb') as f:
+            data = f.read()
+        by_format.setdefault(sniff_format(data[:16]) or 'unknown', []).append(data)
+
+    print(f"{'format':>7} {'decoder':>10} {'files':>6} {'mean ms':>9} {'p95 ms':>9} {'x realtime':>11}")
+    for fmt, blobs in sorted(by_format.items()):
+        decoders = {name: (lambda data, name=name: decode_native(io.BytesIO(data), TARGET_SR, fmt, [name])[0])
+                    for name in native_decoders(fmt)}
+        decoders['ffmpeg'] = decode_ffmpeg
+        for name, decode in decoders.items():
+            timings, audio_seconds = [], 0.0
+            try:
+                for data in blobs:
+                    # First call outside the timings (imports, codec init)
+                    decode(data)
+                    t, seconds = time_decoder(decode, data, args.repeats)
+                    timings += t
+                    audio_seconds += seconds * args.repeats
+            except Exception as e:
+                print(f"{fmt:>7} {name:>10}  failed: {e}")
+                continue
+            timings = np.array(timings) * 1000
+            print(f"{fmt:>7} {name:>10} {len(blobs):6d} {timings.mean():9.1f} {np.percentile(timings, 95):9.1f} "
+                  f"{audio_seconds / (timings.sum() / 1000):11.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+"""
+Pipeline Benchmark
+Times every stage of extraction and prediction on synthetic, reproducible
+input. No recordings or network access are needed:
+
+  decode      in-memory WAV bytes -> DecodedAudio
+  vad         detect_speech
+  acoustic    extract_audio_features (jitter/shimmer/HNR/MFCC)
+  emotion     detect_emotion (Wav2Vec2, windowed for long clips)
+  transcript  local speech-to-text (--models real only)
+  text        extract_text_features on a Taglish transcript of matching length
+  bert        extract_bert_embeddings
+  prediction  run_prediction for one recording
+  pipeline    extract_all_features end to end (feature cache cleared per run)
+
+Audio is a seeded source-filter speech model: syllables of a jittered
+glottal pulse train through moving formant resonators, unvoiced noise
+bursts and pauses over a low noise floor. Transcripts are seeded
+Tagalog/English word sequences that include the lexicon categories.
+
+--models stub swaps Wav2Vec2 and BERT for deterministic stand-ins and the
+prediction bundle for a random linear model, so only our own code is
+timed. --models real loads the actual models from the local cache
+(HF_HUB_OFFLINE is set) and transcribes with the local backends.
+
+Reports latency percentiles, throughput (x realtime for audio stages,
+words/s for text) and the process peak RSS after each stage. --save
+writes the run as a JSON baseline; --compare reports the p50 change
+against one and exits non-zero on regressions above --threshold.
+
+Usage: python benchmarks/bench_pipeline.py [--durations 1 10 60 600] [--models stub|real]
+                                           [--save base.json] [--compare base.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import types
+import wave
+import zlib
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SR = 16000
+SEED = 1234
+DEFAULT_DURATIONS = [1, 10, 60, 600]
+
+# Clips longer than this get fewer timed runs
+LONG_CLIP_SEC = 60
+
+# Speaking rate used to size transcripts to the audio
+WORDS_PER_SEC = 2.5
+
+FILLER_WORDS = [
+    'ang', 'ng', 'sa', 'na', 'ako', 'ko', 'mo', 'siya', 'kami', 'tayo', 'yung', 'kasi', 'pero', 'tapos',
+    'talaga', 'lang', 'din', 'po', 'naman', 'parang', 'so', 'like', 'the', 'and', 'really', 'school',
+    'exam', 'thesis', 'deadline', 'prof', 'grades', 'family', 'friends', 'work', 'tomorrow', 'today',
+]
+
+# ---------------------------------------------------------------- synthetic input
+
+def synth_speech(duration, seed=SEED, sr=SR):
+    """Seeded speech-like float32 signal of the given length"""
+    from scipy.signal import lfilter
+    rng = np.random.default_rng(seed + int(duration * 1000))
+    n_total = int(duration * sr)
+    out = np.zeros(n_total, dtype=np.float64)
+    pos = 0
+    while pos < n_total:
+        if rng.random() < 0.15:
+            # Pause
+            pos += int(rng.uniform(0.2, 0.9) * sr)
+            continue
+        n = min(int(rng.uniform(0.12, 0.3) * sr), n_total - pos)
+        if rng.random() < 0.25:
+            # Unvoiced consonant: high-passed noise burst
+            burst = lfilter([1, -0.95], [1], rng.standard_normal(n)) * 0.05
+            out[pos:pos + n] += burst
+        else:
+            # Voiced syllable: jittered pulse train with a pitch glide and shimmer
+            f0 = rng.uniform(100, 220) * np.linspace(1.0, rng.uniform(0.85, 1.15), n)
+            f0 *= 1 + 0.01 * rng.standard_normal(n)
+            phase = np.cumsum(f0 / sr)
+            pulses = np.diff(np.floor(phase), prepend=0.0)
+            pulses *= 1 + 0.05 * rng.standard_normal(n)
+            source = lfilter([1], [1, -0.97], pulses)
+            for formant, bandwidth in ((rng.uniform(300, 900), 80), (rng.uniform(900, 2300), 120),
+                                       (rng.uniform(2300, 3200), 160)):
+                r = np.exp(-np.pi * bandwidth / sr)
+                theta = 2 * np.pi * formant / sr
+                source = lfilter([1 - r], [1, -2 * r * np.cos(theta), r * r], source)
+            envelope = np.hanning(n)
+            out[pos:pos + n] += source / (np.abs(source).max() + 1e-9) * envelope * rng.uniform(0.2, 0.6)
+        pos += n
+    out += 0.002 * rng.standard_normal(n_total)
+    return np.clip(out, -1, 1).astype(np.float32)
+
+def wav_bytes(samples, sr=SR):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sr)
+        w.writeframes((samples * 32767).astype('<i2').tobytes())
+    return buffer.getvalue()
+
+def synth_transcript(n_words, seed=SEED):
+    """Seeded Taglish text with lexicon words, phrases and punctuation"""
+    from audio_features import ABSOLUTIST_WORDS, COGNITIVE_WORDS, NEGATIVE_WORDS, PRONOUNS
+    rng = np.random.default_rng(seed + n_words)
+    lexicon = [w.replace('_', ' ') for w in COGNITIVE_WORDS + NEGATIVE_WORDS + PRONOUNS + ABSOLUTIST_WORDS]
+    words = []
+    while len(words) < n_words:
+        sentence = [rng.choice(lexicon) if rng.random() < 0.2 else rng.choice(FILLER_WORDS)
+                    for _ in range(rng.integers(4, 14))]
+        words += sentence
+        words[-1] += rng.choice(['.', '.', '?', '!', '...'])
+    return ' '.join(words[:n_words])
+
+# ---------------------------------------------------------------- model stubs
+
+class StubEmotionClassifier:
+    """Wav2Vec2 pipeline stand-in: same call shapes, scores from signal energy"""
+
+    labels = ['neu', 'hap', 'ang', 'sad']
+
+    @property
+    def model(self):
+        # detect_emotion logs classifier.model's class name
+        return self
+
+    def _one(self, item):
+        energy = float(np.abs(item['raw']).mean()) if len(item['raw']) else 0.0
+        scores = np.abs(np.sin(energy * 1000 + np.arange(len(self.labels))))
+        scores /= scores.sum()
+        return [{'label': label, 'score': float(s)} for label, s in zip(self.labels, scores)]
+
+    def __call__(self, inputs, top_k=None, batch_size=None):
+        if isinstance(inputs, list):
+            return [self._one(item) for item in inputs]
+        result = self._one(inputs)
+        return sorted(result, key=lambda o: -o['score'])[:top_k] if top_k else result
+
+class StubEmbeddingService:
+    """BERT stand-in: deterministic 768-d vector per text"""
+
+    def embed(self, text, timeout=None):
+        rng = np.random.default_rng(zlib.crc32(text.encode('utf-8')))
+        return rng.standard_normal(768)
+
+    def embed_many(self, texts, timeout=None):
+        return [self.embed(text) for text in texts]
+
+def stub_prediction_bundle(seed=SEED):
+    """Random linear severity model over the fused-preprocessing path"""
+    from feature_schema import FEATURE_SCHEMA
+    from prediction import EDUCATIONAL_INSIGHTS
+    from preprocessing import FusedPreprocessor
+    rng = np.random.default_rng(seed)
+    n_features = FEATURE_SCHEMA.n_features
+    columns = np.sort(rng.choice(n_features, 200, replace=False))
+    weights = rng.standard_normal((200, 3)) * 0.05
+
+    def predict_proba(X):
+        logits = X @ weights
+        z = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return z / z.sum(axis=1, keepdims=True)
+
+    multi_labels = list(EDUCATIONAL_INSIGHTS)
+    return {
+        'severity_labels': ["Normal", "Moderate", "Severe"],
+        'multi_labels': multi_labels,
+        'multilabel_thresholds': [0.3] * len(multi_labels),
+        'imputer': types.SimpleNamespace(n_features_in_=n_features),
+        'preprocess': FusedPreprocessor(columns, np.zeros(200), np.zeros(200), np.ones(200)),
+        'severity_model': types.SimpleNamespace(predict_proba=predict_proba),
+        'label_encoder': types.SimpleNamespace(classes_=np.array(['Moderate', 'Normal', 'Severe'])),
+    }
+
+def install_models(mode):
+    """Stub or load the heavy models; returns the prediction bundle"""
+    import audio_features
+    from prediction import load_model
+    if mode == 'stub':
+        audio_features._emotion_pipeline = StubEmotionClassifier()
+        audio_features._embedding_service = StubEmbeddingService()
+        return stub_prediction_bundle()
+    audio_features.load_emotion_model()
+    audio_features.load_bert_model()
+    return load_model()
+
+# ---------------------------------------------------------------- measurement
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+@contextlib.contextmanager
+def quiet(enabled):
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def measure(fn, runs, work, verbose):
+    """Time fn() runs times; work is the amount processed per call (audio s, words, rows)"""
+    times = []
+    with quiet(not verbose):
+        # One untimed call first (lazy imports, filter design caches)
+        fn()
+        for _ in range(runs):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    times = np.array(times)
+    return {
+        'runs': runs,
+        'p50_ms': float(np.percentile(times, 50) * 1000),
+        'p90_ms': float(np.percentile(times, 90) * 1000),
+        'p99_ms': float(np.percentile(times, 99) * 1000),
+        'mean_ms': float(times.mean() * 1000),
+        'throughput': float(work / times.mean()) if times.mean() > 0 else float('inf'),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+def bench_duration(duration, args, bundle):
+    import audio_features as af
+    from feature_cache import get_feature_cache
+    from prediction import run_prediction
+    runs = args.repeats if duration <= LONG_CLIP_SEC else max(1, args.repeats // 5)
+    data = wav_bytes(synth_speech(duration))
+    transcript = synth_transcript(max(1, int(duration * WORDS_PER_SEC)))
+    n_words = len(transcript.split())
+    cache = get_feature_cache()
+
+    with quiet(not args.verbose):
+        audio = af.decode_audio(io.BytesIO(data))
+        speech = af.detect_speech(audio)['audio']
+        features, _ = af.extract_all_features(io.BytesIO(data), transcript_override=transcript)
+
+    stages = [
+        ('decode', lambda: af.decode_audio(io.BytesIO(data)), duration),
+        ('vad', lambda: af.detect_speech(audio), duration),
+        ('acoustic', lambda: af.extract_audio_features(speech), duration),
+        ('emotion', lambda: af.detect_emotion(speech), duration),
+    ]
+    if args.models == 'real':
+        from transcription import transcribe
+        stages.append(('transcript', lambda: transcribe(speech.samples, speech.sr, names=['whisper', 'vosk']),
+                       duration))
+    stages += [
+        ('text', lambda: af.extract_text_features(transcript), n_words),
+        ('bert', lambda: (cache.invalidate('bert'), af.extract_bert_embeddings(transcript)), 1),
+        ('prediction', lambda: run_prediction(features, bundle), 1),
+        ('pipeline', lambda: (cache.invalidate('features'),
+                              af.extract_all_features(io.BytesIO(data), transcript_override=transcript)), duration),
+    ]
+
+    results = {}
+    for name, fn, work in stages:
+        try:
+            results[name] = measure(fn, runs, work, args.verbose)
+        except Exception as e:
+            print(f"  {name}: failed ({e})")
+    return results
+
+# ---------------------------------------------------------------- baselines
+
+def run_metadata(args):
+    import scipy
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'models': args.models,
+        'seed': SEED,
+        'repeats': args.repeats,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Print p50 changes against a baseline; returns the regressed keys"""
+    regressions = []
+    print(f"\nAgainst baseline ({baseline['meta'].get('timestamp')}, models={baseline['meta'].get('models')}):")
+    print(f"{'stage':>20} {'base p50':>10} {'p50':>10} {'change':>8}")
+    for key, current in results.items():
+        old = baseline['results'].get(key)
+        if old is None:
+            continue
+        change = current['p50_ms'] / old['p50_ms'] - 1 if old['p50_ms'] > 0 else 0.0
+        slower = current['p50_ms'] - old['p50_ms']
+        # Sub-millisecond stages are all noise in relative terms
+        flag = '  REGRESSION' if change > threshold and slower > min_delta_ms else ''
+        if flag:
+            regressions.append(key)
+        print(f"{key:>20} {old['p50_ms']:10.1f} {current['p50_ms']:10.1f} {change:+7.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--durations', type=float, nargs='+', default=DEFAULT_DURATIONS,
+                        help="clip lengths in seconds (up to 3600)")
+    parser.add_argument('--models', choices=['stub', 'real'], default='stub')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--save', help="write this run as a JSON baseline")
+    parser.add_argument('--compare', help="baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="p50 slowdown counted as a regression")
+    parser.add_argument('--min-delta-ms', type=float, default=0.5,
+                        help="smaller p50 slowdowns are never counted as regressions")
+    parser.add_argument('--verbose', action='store_true', help="keep the pipeline's own logging")
+    args = parser.parse_args()
+
+    # Never reach for the network: models come from the local cache or stubs
+    os.environ.setdefault('HF_HUB_OFFLINE', '1')
+    os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+    os.environ['TRANSCRIBE_BACKENDS'] = 'whisper,vosk'
+
+    with quiet(not args.verbose):
+        bundle = install_models(args.models)
+
+    results = {}
+    print(f"{'stage':>20} {'runs':>5} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'throughput':>14} {'peak RSS':>9}")
+    for duration in args.durations:
+        for stage, r in bench_duration(duration, args, bundle).items():
+            key = f"{stage}@{duration:g}s"
+            results[key] = r
+            unit = 'words/s' if stage == 'text' else ('x rt' if stage not in ('bert', 'prediction') else 'calls/s')
+            print(f"{key:>20} {r['runs']:5d} {r['p50_ms']:10.1f} {r['p90_ms']:10.1f} {r['p99_ms']:10.1f} "
+                  f"{r['throughput']:9.1f} {unit:<4} {r['peak_rss_mb']:7.0f}MB")
+
+    run = {'meta': run_metadata(args), 'results': results}
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"\nBaseline saved to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold, args.min_delta_ms):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Preprocessing Benchmark
+Times the sklearn imputer -> scaler -> selector chain against the fused
+gather + affine kernel compiled by load_model, per request (N=1) and for
+batches, and reports the largest difference between the two.
+
+Uses the real model bundle if it loads, else a synthetic chain fitted on
+random data with the same input width.
+
+Usage: python benchmarks/bench_preprocess.py [--repeats 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from feature_schema import FEATURE_SCHEMA
+from preprocessing import compile_preprocessing, patch_imputer, sklearn_chain
+
+BATCH_SIZES = [1, 8, 64, 512]
+
+def synthetic_chain(n_features=FEATURE_SCHEMA.n_features, n_keep=200, seed=0):
+    """SimpleImputer/StandardScaler/SelectKBest fitted on random data"""
+    from sklearn.feature_selection import SelectKBest, f_classif
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import StandardScaler
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((400, n_features))
+    X[rng.random(X.shape) < 0.05] = np.nan
+    y = rng.integers(0, 3, len(X))
+    imputer = SimpleImputer(strategy='median').fit(X)
+    scaler = StandardScaler().fit(imputer.transform(X))
+    selector = SelectKBest(f_classif, k=n_keep).fit(scaler.transform(imputer.transform(X)), y)
+    return imputer, scaler, selector
+
+def load_chain():
+    try:
+        import joblib
+        from prediction import MODEL_PATH
+        bundle = joblib.load(MODEL_PATH)
+        print(f"Using model bundle {MODEL_PATH}")
+        return bundle['imputer'], bundle['scaler'], bundle['selector']
+    except Exception as e:
+        print(f"Model bundle unavailable ({e}); using a synthetic chain")
+        return synthetic_chain()
+
+def per_call_us(fn, repeats):
+    """Median wall time of one call, in microseconds"""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+
+    imputer, scaler, selector = load_chain()
+    patch_imputer(imputer)
+    fused = compile_preprocessing(imputer, scaler, selector)
+    if fused is None:
+        print("This chain cannot be fused")
+        return
+    print(f"Fused kernel keeps {len(fused.columns)} of {imputer.n_features_in_} input columns\n")
+
+    rng = np.random.default_rng(1)
+    print(f"{'batch':>6} {'sklearn us':>11} {'fused us':>9} {'speedup':>8} {'max error':>10}")
+    for n in BATCH_SIZES:
+        X = rng.standard_normal((n, imputer.n_features_in_))
+        X[rng.random(X.shape) < 0.1] = np.nan
+        chain_us = per_call_us(lambda: sklearn_chain(imputer, scaler, selector, X), args.repeats)
+        fused_us = per_call_us(lambda: fused.transform(X), args.repeats)
+        error = np.max(np.abs(sklearn_chain(imputer, scaler, selector, X) - fused.transform(X)))
+        print(f"{n:6d} {chain_us:11.1f} {fused_us:9.1f} {chain_us / fused_us:7.1f}x {error:10.2g}")
+
+if __name__ == "__main__":
+    main()
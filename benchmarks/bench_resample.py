@@ -0,0 +1,75 @@
+"""
+Resampling Benchmark
+Compares scipy.signal.resample (one full-length FFT) with the cached
+polyphase resampler and its streaming block mode for the browser/mobile
+rates seen in practice, including prime-length inputs.
+
+Usage: python benchmarks/bench_resample.py [--seconds 10 60]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import signal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from resampler import StreamingResampler, design_filter, resample
+
+TARGET_SR = 16000
+SOURCE_RATES = [44100, 48000, 22050]
+STREAM_BLOCK = 16384
+
+def next_prime(n):
+    """Smallest prime >= n (prime-length FFTs are scipy.signal.resample's worst case)"""
+    def is_prime(k):
+        if k < 2:
+            return False
+        i = 2
+        while i * i <= k:
+            if k % i == 0:
+                return False
+            i += 1
+        return True
+    while not is_prime(n):
+        n += 1
+    return n
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def stream(x, src_sr):
+    resampler = StreamingResampler(src_sr, TARGET_SR)
+    out = [resampler.process(x[i:i + STREAM_BLOCK]) for i in range(0, len(x), STREAM_BLOCK)]
+    out.append(resampler.flush())
+    return np.concatenate(out)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, nargs='+', default=[10, 60])
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"{'src_sr':>7} {'samples':>9} {'prime':>5} {'fft ms':>9} {'poly ms':>8} {'stream ms':>9} {'max |poly-stream|':>18}")
+    for src_sr in SOURCE_RATES:
+        design_filter(src_sr, TARGET_SR)  # warm the filter cache, as a server would
+        for seconds in args.seconds:
+            for prime in (False, True):
+                n = int(seconds * src_sr)
+                if prime:
+                    n = next_prime(n)
+                x = rng.standard_normal(n).astype(np.float32)
+                n_out = int(n * TARGET_SR / src_sr)
+                fft_time, _ = timed(lambda: signal.resample(x, n_out))
+                poly_time, poly = timed(lambda: resample(x, src_sr, TARGET_SR))
+                stream_time, streamed = timed(lambda: stream(x, src_sr))
+                diff = np.max(np.abs(poly - streamed))
+                print(f"{src_sr:7d} {n:9d} {'yes' if prime else 'no':>5} {fft_time * 1000:9.1f} "
+                      f"{poly_time * 1000:8.1f} {stream_time * 1000:9.1f} {diff:18.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Transcription Benchmark
+Runs each speech-to-text backend over a sample set and reports latency and
+word error rate against reference transcripts.
+
+The sample set is a manifest CSV in the batch_scoring format with the
+reference text in the 'transcript' column:
+
+    path,transcript
+    samples/001.wav,hindi ko alam kung kaya ko pa
+
+Usage: python benchmarks/bench_transcribe.py manifest.csv [--backends google whisper vosk]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audio_features import decode_audio
+from batch_scoring import collect_inputs
+from transcription import BACKEND_CLASSES, get_backend
+
+def normalize(text):
+    """Lowercase words with punctuation stripped (apostrophes/hyphens kept)"""
+    return re.findall(r"[\w'-]+", (text or '').lower())
+
+def word_errors(reference, hypothesis):
+    """Word-level Levenshtein distance (substitutions + insertions + deletions)"""
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1,
+                             previous[j - 1] + (ref_word != hyp_word))
+        previous = current
+    return previous[-1], len(ref)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('manifest', help="CSV with path and reference transcript columns")
+    parser.add_argument('--backends', nargs='+', default=sorted(BACKEND_CLASSES), choices=sorted(BACKEND_CLASSES))
+    args = parser.parse_args()
+
+    samples = [item for item in collect_inputs(args.manifest) if item['transcript']]
+    clips = [decode_audio(item['path']) for item in samples]
+    audio_seconds = sum(clip.duration for clip in clips)
+    print(f"{len(clips)} clips, {audio_seconds:.1f}s of audio\n")
+
+    print(f"{'backend':>8} {'mean ms':>9} {'p95 ms':>9} {'RTF':>6} {'WER':>7} {'failed':>7}")
+    for name in args.backends:
+        backend = get_backend(name)
+        if not backend.available():
+            print(f"{name:>8}  (not available)")
+            continue
+        # Load the model outside the timed runs
+        try:
+            backend.transcribe(np.zeros(16000, dtype=np.float32), 16000)
+        except Exception:
+            pass
+        latencies, errors, words, failed = [], 0, 0, 0
+        for item, clip in zip(samples, clips):
+            start = time.perf_counter()
+            try:
+                hypothesis = backend.transcribe(clip.samples, clip.sr)
+            except Exception as e:
+                print(f"  [{name}] {os.path.basename(item['path'])}: {e}")
+                hypothesis, failed = "", failed + 1
+            latencies.append(time.perf_counter() - start)
+            e, n = word_errors(item['transcript'], hypothesis)
+            errors, words = errors + e, words + n
+        latencies = np.array(latencies) * 1000
+        print(f"{name:>8} {latencies.mean():9.0f} {np.percentile(latencies, 95):9.0f} "
+              f"{latencies.sum() / 1000 / audio_seconds:6.2f} {errors / max(words, 1):7.1%} {failed:7d}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Decoders Module
+In-process audio decoding to float32 mono at the target rate. The
+container is sniffed from its magic bytes (upload file names and
+extensions are not trusted), then the native decoders for that format
+are tried in order:
+
+  soundfile   libsndfile: wav, flac, ogg/vorbis/opus, mp3 (libsndfile >= 1.1)
+  av          PyAV (in-process FFmpeg libraries): webm/opus, m4a/aac, mp3, ogg
+  scipy       scipy.io.wavfile: PCM/float wav only, always available
+
+decode_native raises UnsupportedAudio when none of them can decode the
+input; callers then fall back to the ffmpeg-subprocess path (pydub).
+"""
+
+import numpy as np
+
+from resampler import resample
+
+# Native decoders tried per sniffed format, in order
+FORMAT_DECODERS = {
+    'wav': ['soundfile', 'scipy'],
+    'flac': ['soundfile', 'av'],
+    'ogg': ['soundfile', 'av'],
+    'mp3': ['soundfile', 'av'],
+    'webm': ['av'],
+    'm4a': ['av'],
+    'aiff': ['soundfile', 'av'],
+}
+
+SNIFF_BYTES = 16
+
+class UnsupportedAudio(Exception):
+    """No in-process decoder could handle the input"""
+    pass
+
+def sniff_format(head):
+    """Container format from the first bytes of a file, or None"""
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return 'wav'
+    if head[:4] == b'fLaC':
+        return 'flac'
+    if head[:4] == b'OggS':
+        return 'ogg'
+    if head[:4] == b'\x1a\x45\xdf\xa3':
+        # EBML header: webm and matroska audio
+        return 'webm'
+    if head[4:8] == b'ftyp':
+        return 'm4a'
+    if head[:4] == b'FORM' and head[8:12] in (b'AIFF', b'AIFC'):
+        return 'aiff'
+    if head[:3] == b'ID3' or (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return 'mp3'
+    return None
+
+def _read_head(source):
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return f.read(SNIFF_BYTES)
+    position = source.tell()
+    head = source.read(SNIFF_BYTES)
+    source.seek(position)
+    return head
+
+def _mono(data):
+    return data.mean(axis=1) if data.ndim > 1 else data
+
+def _decode_soundfile(source, target_sr):
+    import soundfile
+    data, sr = soundfile.read(source, dtype='float32', always_2d=True)
+    return _mono(data), sr
+
+def _decode_av(source, target_sr):
+    import av
+    chunks = []
+    with av.open(source) as container:
+        if not container.streams.audio:
+            raise UnsupportedAudio("no audio stream")
+        stream = container.streams.audio[0]
+        # libswresample converts to packed float mono at the target rate as it decodes
+        converter = av.AudioResampler(format='flt', layout='mono', rate=target_sr)
+        for frame in container.decode(stream):
+            for converted in converter.resample(frame):
+                chunks.append(converted.to_ndarray().reshape(-1))
+        for converted in converter.resample(None):
+            chunks.append(converted.to_ndarray().reshape(-1))
+    samples = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+    return samples, target_sr
+
+def _decode_scipy(source, target_sr):
+    import scipy.io.wavfile as wav
+    sr, data = wav.read(source)
+    if data.dtype == np.uint8:
+        data = (data.astype(np.float32) - 128.0) / 128.0
+    elif np.issubdtype(data.dtype, np.integer):
+        data = data.astype(np.float32) / float(np.iinfo(data.dtype).max + 1)
+    return _mono(data.astype(np.float32, copy=False)), sr
+
+DECODERS = {
+    'soundfile': _decode_soundfile,
+    'av': _decode_av,
+    'scipy': _decode_scipy,
+}
+
+# Module each decoder needs (checked by native_decoders)
+DECODER_MODULES = {'soundfile': 'soundfile', 'av': 'av', 'scipy': 'scipy.io.wavfile'}
+
+def decode_native(source, target_sr=16000, fmt=None, decoders=None):
+    """
+    Decode a path or seekable file-like object in process, trying decoders
+    (default: FORMAT_DECODERS for the sniffed format) in order.
+    Returns (float32 mono samples at target_sr, format, decoder name).
+    """
+    fmt = fmt or sniff_format(_read_head(source))
+    if fmt not in FORMAT_DECODERS:
+        raise UnsupportedAudio(f"unrecognised audio container ({fmt or 'unknown magic bytes'})")
+    errors = []
+    for name in decoders or FORMAT_DECODERS[fmt]:
+        if not isinstance(source, str):
+            source.seek(0)
+        try:
+            samples, sr = DECODERS[name](source, target_sr)
+        except ImportError:
+            continue
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+            continue
+        if sr != target_sr:
+            samples = resample(samples, sr, target_sr)
+        return np.ascontiguousarray(samples, dtype=np.float32), fmt, name
+    raise UnsupportedAudio(f"{fmt}: " + ("; ".join(errors) or "no native decoder installed"))
+
+def native_decoders(fmt):
+    """Installed native decoders for a format (for reporting and the benchmark)"""
+    available = []
+    for name in FORMAT_DECODERS.get(fmt, []):
+        try:
+            __import__(DECODER_MODULES[name])
+            available.append(name)
+        except ImportError:
+            pass
+    return available
@@ -0,0 +1,123 @@
+"""
+BERT Embedding Service
+Queues transcripts from concurrent requests and embeds them in dynamic
+micro-batches: one padded forward pass per batch instead of one per request
+"""
+
+import queue
+import threading
+import time
+
+import numpy as np
+
+# Batching limits: a batch is run when it is full or the oldest item has
+# waited this long
+BERT_MAX_BATCH_SIZE = 16
+BERT_MAX_WAIT_MS = 10
+BERT_MAX_LENGTH = 512
+EMBEDDING_DIM = 768
+
+class _PendingEmbedding:
+    """A queued transcript and the slot its caller is waiting on"""
+    __slots__ = ('text', 'done', 'result', 'error')
+
+    def __init__(self, text):
+        self.text = text
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class EmbeddingService:
+    """
+    In-process micro-batching front end for a BERT model.
+    loader() must return (tokenizer, model), or (None, None) when the model
+    is unavailable, in which case zero vectors are returned.
+    """
+
+    def __init__(self, loader, max_batch_size=BERT_MAX_BATCH_SIZE, max_wait_ms=BERT_MAX_WAIT_MS):
+        self.loader = loader
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches_run = 0
+        self.items_embedded = 0
+
+    def start(self):
+        """Start the batching thread (idempotent)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='bert-batcher', daemon=True)
+                self._thread.start()
+        return self
+
+    def embed(self, text, timeout=None):
+        """Embed one transcript; blocks until its batch has run"""
+        return self.embed_many([text], timeout=timeout)[0]
+
+    def embed_many(self, texts, timeout=None):
+        """Embed several transcripts; they are batched with everyone else's"""
+        self.start()
+        pending = [_PendingEmbedding(text) for text in texts]
+        for item in pending:
+            self._queue.put(item)
+        results = []
+        for item in pending:
+            if not item.done.wait(timeout):
+                raise TimeoutError("BERT embedding timed out")
+            if item.error is not None:
+                raise item.error
+            results.append(item.result)
+        return results
+
+    def _collect_batch(self):
+        """Block for the first item, then gather more until full or max_wait passes"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            try:
+                embeddings = self._forward([item.text for item in batch])
+                for item, embedding in zip(batch, embeddings):
+                    item.result = embedding
+            except Exception as e:
+                for item in batch:
+                    item.error = e
+            finally:
+                for item in batch:
+                    item.done.set()
+
+    def _forward(self, texts):
+        """One forward pass over a batch padded to its longest item"""
+        tokenizer, model = self.loader()
+        if model is None:
+            return [np.zeros(EMBEDDING_DIM) for _ in texts]
+        
+        import torch
+        with torch.no_grad():
+            inputs = tokenizer(texts, return_tensors='pt', truncation=True,
+                               max_length=BERT_MAX_LENGTH, padding='longest')
+            outputs = model(**inputs)
+            # Mean over real tokens only, so a padded item gets exactly the
+            # embedding it would get in a batch of one
+            mask = inputs['attention_mask'].unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+            summed = (outputs.last_hidden_state * mask).sum(dim=1)
+            embeddings = (summed / mask.sum(dim=1).clamp(min=1)).numpy()
+        
+        self.batches_run += 1
+        self.items_embedded += len(texts)
+        if len(texts) > 1:
+            print(f"  [BERT] Embedded batch of {len(texts)} transcripts")
+        return list(embeddings)
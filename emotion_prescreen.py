@@ -0,0 +1,235 @@
+"""
+Emotion Pre-screen Module
+Tiered emotion detection: a small softmax model over the prosodic features
+extract_audio_features already computes gives a temperature-calibrated
+estimate, and Wav2Vec2 only runs when that estimate is uncertain.
+
+The pre-screen is distilled from Wav2Vec2 itself: `fit` extracts features
+from a directory of recordings, labels them with the full model and saves
+the fitted weights. Without a weights file every clip goes to Wav2Vec2.
+Both run on the VAD-trimmed speech, as in extract_all_features; weights
+fitted on untrimmed audio must be refit.
+
+Usage: python emotion_prescreen.py <recordings dir> [-o emotion_prescreen.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+
+import numpy as np
+
+# Fitted weights; the pre-screen is off if this file does not exist
+PRESCREEN_PATH = os.environ.get('EMOTION_PRESCREEN_PATH', 'emotion_prescreen.json')
+
+# Calibrated probability at or above which Wav2Vec2 is skipped
+PRESCREEN_CONFIDENCE = 0.85
+
+# Fraction of confident clips still sent to Wav2Vec2 to measure agreement
+PRESCREEN_AUDIT_RATE = 0.05
+
+PRESCREEN_FEATURES = (
+    ['energy_mean', 'energy_std', 'jitter', 'shimmer', 'hnr', 'hnr_mean', 'hnr_std',
+     'pitch_mean', 'pitch_std'] + [f'mfcc_{i}' for i in range(13)]
+)
+
+class EmotionPrescreen:
+    """Standardize -> linear -> softmax(logits / temperature)"""
+
+    def __init__(self, labels, mean, scale, weights, bias, temperature=1.0):
+        self.labels = list(labels)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = np.asarray(bias, dtype=np.float64)
+        self.temperature = float(temperature)
+
+    @staticmethod
+    def feature_row(features):
+        return np.array([features.get(key, 0.0) for key in PRESCREEN_FEATURES], dtype=np.float64)
+
+    def predict_proba(self, X):
+        logits = ((np.atleast_2d(X) - self.mean) / self.scale) @ self.weights + self.bias
+        return _softmax(logits / self.temperature)
+
+    def estimate(self, features):
+        """{'label', 'score'} for one clip's acoustic features"""
+        probs = self.predict_proba(self.feature_row(features))[0]
+        best = int(np.argmax(probs))
+        return {'label': self.labels[best], 'score': float(probs[best])}
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'labels': self.labels, 'features': PRESCREEN_FEATURES,
+                       'mean': self.mean.tolist(), 'scale': self.scale.tolist(),
+                       'weights': self.weights.tolist(), 'bias': self.bias.tolist(),
+                       'temperature': self.temperature}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            params = json.load(f)
+        if params.get('features') != PRESCREEN_FEATURES:
+            raise ValueError("pre-screen was fitted on a different feature list")
+        return cls(params['labels'], params['mean'], params['scale'], params['weights'],
+                   params['bias'], params.get('temperature', 1.0))
+
+def _softmax(logits):
+    z = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return z / z.sum(axis=1, keepdims=True)
+
+def fit_prescreen(X, labels, l2=1e-2, epochs=500, lr=0.5, holdout=0.2, seed=0):
+    """
+    Multinomial logistic regression by full-batch gradient descent, then a
+    temperature fitted on a held-out split (minimum NLL) for calibration
+    """
+    X = np.asarray(X, dtype=np.float64)
+    classes = sorted(set(labels))
+    y = np.array([classes.index(label) for label in labels])
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(X))
+    n_hold = int(len(X) * holdout) if len(X) >= 10 else 0
+    hold, train = order[:n_hold], order[n_hold:]
+
+    mean = X[train].mean(axis=0)
+    scale = X[train].std(axis=0)
+    scale[scale == 0] = 1.0
+    Z = (X[train] - mean) / scale
+    onehot = np.eye(len(classes))[y[train]]
+    W = np.zeros((X.shape[1], len(classes)))
+    b = np.zeros(len(classes))
+    for _ in range(epochs):
+        grad = _softmax(Z @ W + b) - onehot
+        W -= lr * (Z.T @ grad / len(Z) + l2 * W)
+        b -= lr * grad.mean(axis=0)
+
+    model = EmotionPrescreen(classes, mean, scale, W, b)
+    if n_hold:
+        logits = ((X[hold] - mean) / scale) @ W + b
+        def nll(t):
+            p = _softmax(logits / t)[np.arange(n_hold), y[hold]]
+            return -np.mean(np.log(p + 1e-12))
+        model.temperature = float(min(np.linspace(0.25, 5.0, 96), key=nll))
+    return model
+
+class PrescreenStats:
+    """How often Wav2Vec2 was skipped and how often the two tiers agree"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clips = 0
+        self.skipped = 0
+        self.full_runs = 0
+        self.audited = 0
+        self.audit_agree = 0
+        self.compared = 0
+        self.agree = 0
+
+    def record(self, skipped, audited=False, agreed=None):
+        with self._lock:
+            self.clips += 1
+            if skipped:
+                self.skipped += 1
+                return
+            self.full_runs += 1
+            if agreed is None:
+                return
+            self.compared += 1
+            self.agree += int(agreed)
+            if audited:
+                self.audited += 1
+                self.audit_agree += int(agreed)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'clips': self.clips,
+                'skipped': self.skipped,
+                'skip_rate': self.skipped / self.clips if self.clips else 0.0,
+                'full_runs': self.full_runs,
+                'agreement': self.agree / self.compared if self.compared else None,
+                # Agreement on confident clips: estimates how often a skip was right
+                'confident_agreement': self.audit_agree / self.audited if self.audited else None,
+                'audited': self.audited,
+            }
+
+prescreen_stats = PrescreenStats()
+
+_prescreen = None
+_prescreen_loaded = False
+_prescreen_lock = threading.Lock()
+
+def get_prescreen():
+    """Fitted pre-screen, or None if no weights file is available"""
+    global _prescreen, _prescreen_loaded
+    if not _prescreen_loaded:
+        with _prescreen_lock:
+            if not _prescreen_loaded:
+                if os.path.exists(PRESCREEN_PATH):
+                    try:
+                        _prescreen = EmotionPrescreen.load(PRESCREEN_PATH)
+                        print(f"Emotion pre-screen loaded ({', '.join(_prescreen.labels)})")
+                    except Exception as e:
+                        print(f"Failed to load emotion pre-screen: {e}")
+                _prescreen_loaded = True
+    return _prescreen
+
+def tiered_emotion(acoustic, run_full, threshold=PRESCREEN_CONFIDENCE, audit_rate=PRESCREEN_AUDIT_RATE):
+    """
+    Emotion for one clip: the pre-screen estimate when it is at least
+    threshold confident, else run_full() (Wav2Vec2)
+    """
+    prescreen = get_prescreen()
+    if prescreen is None or acoustic is None:
+        return run_full()
+
+    estimate = prescreen.estimate(acoustic)
+    confident = estimate['score'] >= threshold
+    audit = confident and random.random() < audit_rate
+    if confident and not audit:
+        print(f"  Emotion pre-screen: {estimate['label']} ({estimate['score']:.2f}), skipping Wav2Vec2")
+        prescreen_stats.record(skipped=True)
+        return dict(estimate, tier='prescreen')
+
+    result = run_full()
+    agreed = None if result.get('fallback') else result['label'] == estimate['label']
+    prescreen_stats.record(skipped=False, audited=audit, agreed=agreed)
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help="directory of recordings to distill from")
+    parser.add_argument('-o', '--output', default=PRESCREEN_PATH)
+    args = parser.parse_args()
+
+    from audio_features import decode_audio, detect_emotion, detect_speech, extract_audio_features
+    rows, labels = [], []
+    for name in sorted(os.listdir(args.source)):
+        try:
+            # Same input as serving: the voiced regions detect_speech keeps
+            speech = detect_speech(decode_audio(os.path.join(args.source, name)))['audio']
+            acoustic = extract_audio_features(speech)
+            teacher = detect_emotion(speech)
+        except Exception as e:
+            print(f"Skipping {name}: {e}")
+            continue
+        if teacher.get('fallback'):
+            continue
+        rows.append(EmotionPrescreen.feature_row(acoustic))
+        labels.append(teacher['label'])
+
+    if len(set(labels)) < 2:
+        raise SystemExit("Need recordings of at least two emotions to fit the pre-screen")
+    model = fit_prescreen(np.vstack(rows), labels)
+    probs = model.predict_proba(np.vstack(rows))
+    predicted = [model.labels[i] for i in probs.argmax(axis=1)]
+    confident = probs.max(axis=1) >= PRESCREEN_CONFIDENCE
+    agree = np.array(predicted) == np.array(labels)
+    print(f"Fitted on {len(rows)} clips, temperature {model.temperature:.2f}")
+    print(f"  Agreement with Wav2Vec2: {agree.mean():.1%}")
+    print(f"  Would skip {confident.mean():.1%} of clips, agreement on those: "
+          f"{agree[confident].mean() if confident.any() else float('nan'):.1%}")
+    model.save(args.output)
+    print(f"Saved to {args.output}")
@@ -0,0 +1,235 @@
+"""
+Feature Cache Module
+Content-addressed two-level cache for BERT embeddings and full feature
+extraction results: an in-memory LRU with size/TTL limits in front of an
+optional SQLite store that survives restarts
+"""
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# In-memory level limits
+CACHE_MAX_ENTRIES = 2048
+CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# On-disk level: set FEATURE_CACHE_DB to a file path to enable it
+CACHE_DB_PATH = os.environ.get('FEATURE_CACHE_DB')
+
+def content_key(*parts):
+    """SHA-256 hex digest over str/bytes parts (None hashes as empty)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            part = b''
+        elif isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(len(part).to_bytes(8, 'little'))
+        digest.update(part)
+    return digest.hexdigest()
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 hex digest of a file's bytes, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def buffer_digest(buffer):
+    """SHA-256 hex digest of an in-memory buffer (same value as file_digest of its bytes)"""
+    return hashlib.sha256(buffer.getbuffer()).hexdigest()
+
+class LRUCache:
+    """Thread-safe LRU mapping with an entry limit and per-entry TTL"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (found, value)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if self.ttl and expires_at < time.time():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time() + (self.ttl or 0), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def discard_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+class SQLiteStore:
+    """Persistent key/value level backed by a single SQLite file"""
+
+    def __init__(self, path, ttl=CACHE_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS cache ('
+                               'key TEXT PRIMARY KEY, namespace TEXT, created REAL, value BLOB)')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS versions (namespace TEXT PRIMARY KEY, version TEXT)')
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute('SELECT created, value FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return False, None
+        created, blob = row
+        if self.ttl and created + self.ttl < time.time():
+            return False, None
+        return True, pickle.loads(blob)
+
+    def set(self, key, namespace, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)',
+                               (key, namespace, time.time(), blob))
+
+    def invalidate(self, namespace=None):
+        with self._lock, self._conn:
+            if namespace is None:
+                self._conn.execute('DELETE FROM cache')
+            else:
+                self._conn.execute('DELETE FROM cache WHERE namespace = ?', (namespace,))
+
+    def get_version(self, namespace):
+        with self._lock:
+            row = self._conn.execute('SELECT version FROM versions WHERE namespace = ?', (namespace,)).fetchone()
+        return row[0] if row else None
+
+    def set_version(self, namespace, version):
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO versions VALUES (?, ?)', (namespace, version))
+
+class FeatureCache:
+    """
+    Two-level cache partitioned by namespace ('bert', 'features', ...)
+    Keys are content hashes; see content_key() and file_digest().
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, db_path=CACHE_DB_PATH):
+        self.memory = LRUCache(max_entries, ttl)
+        self.disk = None
+        if db_path:
+            try:
+                self.disk = SQLiteStore(db_path, ttl)
+                print(f"Feature cache persisted to: {db_path}")
+            except Exception as e:
+                print(f"Warning: could not open feature cache DB {db_path}: {e}")
+        self._versions = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def _count(self, namespace, field):
+        with self._lock:
+            counts = self._counters.setdefault(namespace, {'hits': 0, 'disk_hits': 0, 'misses': 0})
+            counts[field] += 1
+
+    def get(self, namespace, key):
+        """Return (found, value), checking memory then disk"""
+        full_key = f"{namespace}:{key}"
+        found, value = self.memory.get(full_key)
+        if found:
+            self._count(namespace, 'hits')
+            return True, value
+        if self.disk is not None:
+            try:
+                found, value = self.disk.get(full_key)
+            except Exception as e:
+                print(f"  Feature cache read failed: {e}")
+                found = False
+            if found:
+                self.memory.set(full_key, value)
+                self._count(namespace, 'disk_hits')
+                return True, value
+        self._count(namespace, 'misses')
+        return False, None
+
+    def set(self, namespace, key, value):
+        full_key = f"{namespace}:{key}"
+        self.memory.set(full_key, value)
+        if self.disk is not None:
+            try:
+                self.disk.set(full_key, namespace, value)
+            except Exception as e:
+                print(f"  Feature cache write failed: {e}")
+
+    def invalidate(self, namespace=None):
+        """Drop cached entries for one namespace (or everything)"""
+        self.memory.discard_prefix(f"{namespace}:" if namespace else '')
+        if self.disk is not None:
+            self.disk.invalidate(namespace)
+        print(f"Feature cache invalidated: {namespace or 'all namespaces'}")
+
+    def set_model_version(self, namespace, version):
+        """
+        Invalidation hook for model changes: record the model/version that
+        produces a namespace and drop its entries if that has changed,
+        including entries persisted by a previous run
+        """
+        previous = self._versions.get(namespace)
+        if previous is None and self.disk is not None:
+            previous = self.disk.get_version(namespace)
+        if previous is not None and previous != version:
+            self.invalidate(namespace)
+        self._versions[namespace] = version
+        if self.disk is not None and previous != version:
+            self.disk.set_version(namespace, version)
+
+    def stats(self):
+        """Hit/miss counters per namespace"""
+        with self._lock:
+            counters = {ns: dict(counts) for ns, counts in self._counters.items()}
+        return {'entries': len(self.memory), 'persistent': self.disk is not None, 'namespaces': counters}
+
+_feature_cache = None
+_feature_cache_lock = threading.Lock()
+_inherited_caches = []
+
+def get_feature_cache():
+    """Process-wide cache instance"""
+    global _feature_cache
+    if _feature_cache is None:
+        with _feature_cache_lock:
+            if _feature_cache is None:
+                _feature_cache = FeatureCache()
+    return _feature_cache
+
+def reset_after_fork():
+    """
+    Called in a forked worker: the parent's SQLite connection and locks must
+    not be shared, so the next get_feature_cache() opens a fresh instance.
+    The inherited one is kept referenced, never closed, so its connection is
+    not finalised under the parent's feet.
+    """
+    global _feature_cache, _feature_cache_lock
+    if _feature_cache is not None:
+        _inherited_caches.append(_feature_cache)
+    _feature_cache = None
+    _feature_cache_lock = threading.Lock()
@@ -0,0 +1,126 @@
+"""
+Feature Schema Module
+The fixed column layout of the model input, shared by the extractor and the
+predictor, and FeatureVector: one recording's features as a contiguous
+float64 array plus a small dict of human-readable fields
+"""
+
+import copy
+
+import numpy as np
+
+# Feature names expected by the model, in training column order
+AUDIO_FEATURES = ['jitter', 'shimmer', 'hnr']
+MFCC_FEATURES = [f'mfcc_{i}' for i in range(13)]
+BERT_FEATURES = [f'bert_{i}' for i in range(768)]
+
+# Text analysis feature categories (simplified LIWC-style)
+TEXT_FEATURES = [
+    'cognitive_count', 'negative_count', 'pronoun_count', 'absolutist_count',
+    'transcript_length', 'word_count', 'avg_word_length',
+    'sentence_count', 'question_count', 'exclamation_count'
+]
+
+class FeatureSchema:
+    """Named groups of columns laid out back to back in one vector"""
+
+    def __init__(self, groups):
+        names = []
+        self.groups = {}
+        for group, group_names in groups:
+            self.groups[group] = slice(len(names), len(names) + len(group_names))
+            names.extend(group_names)
+        self.names = tuple(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+    @property
+    def n_features(self):
+        return len(self.names)
+
+    def validate(self, n_features):
+        """Raise ValueError if a model expects a different number of inputs"""
+        if n_features != self.n_features:
+            raise ValueError(f"model expects {n_features} features, schema has {self.n_features} "
+                             f"(missing columns are left at zero, extra ones ignored)")
+
+    def new_vector(self):
+        return FeatureVector(self)
+
+FEATURE_SCHEMA = FeatureSchema([
+    ('audio', AUDIO_FEATURES),
+    ('mfcc', MFCC_FEATURES),
+    ('bert', BERT_FEATURES),
+    ('text', TEXT_FEATURES),
+])
+
+class FeatureVector:
+    """
+    One recording's features. Schema columns live in .values (preallocated,
+    zero until set); everything else (emotion label, extra acoustic stats)
+    goes in .info. Reads like the old flat features dict.
+    """
+
+    __slots__ = ('schema', 'values', 'info')
+
+    def __init__(self, schema=FEATURE_SCHEMA, values=None, info=None):
+        self.schema = schema
+        self.values = np.zeros(schema.n_features) if values is None else np.asarray(values, dtype=np.float64)
+        self.info = {} if info is None else dict(info)
+
+    @classmethod
+    def from_dict(cls, features, schema=FEATURE_SCHEMA):
+        vector = cls(schema)
+        vector.update(features)
+        return vector
+
+    def set_group(self, group, values):
+        """Write a whole column group (e.g. the BERT embedding) in one copy"""
+        self.values[self.schema.groups[group]] = values
+
+    def group(self, group):
+        return self.values[self.schema.groups[group]]
+
+    def update(self, features):
+        index = self.schema.index
+        for key, value in features.items():
+            if key in index:
+                self.values[index[key]] = value
+            else:
+                self.info[key] = value
+
+    def copy(self):
+        # info holds lists/dicts (emotion timeline); copies must not share them
+        return FeatureVector(self.schema, self.values.copy(), copy.deepcopy(self.info))
+
+    def to_dict(self):
+        """Flat {name: value} dict, as extract_all_features used to return"""
+        features = dict(zip(self.schema.names, self.values.tolist()))
+        features.update(self.info)
+        return features
+
+    def __getitem__(self, key):
+        if key in self.info:
+            return self.info[key]
+        return float(self.values[self.schema.index[key]])
+
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def __contains__(self, key):
+        return key in self.info or key in self.schema.index
+
+    def get(self, key, default=None):
+        if key in self.info:
+            return self.info[key]
+        if key in self.schema.index:
+            return float(self.values[self.schema.index[key]])
+        return default
+
+    def keys(self):
+        return list(self.schema.names) + list(self.info)
+
+    def __len__(self):
+        return self.schema.n_features + len(self.info)
+
+    def __repr__(self):
+        return f"FeatureVector({self.schema.n_features} columns, info={sorted(self.info)})"
@@ -0,0 +1,335 @@
+"""
+Inference Backend Module
+Runs the BERT and Wav2Vec2 models through a configurable backend:
+
+  torch        eager fp32 PyTorch (default)
+  torch-int8   torch.quantization.quantize_dynamic on the Linear layers
+  onnx         exported ONNX graph run by onnxruntime
+  onnx-int8    the ONNX graph with onnxruntime dynamic int8 quantization
+
+Select with INFERENCE_BACKEND=<name>. ONNX graphs are exported on first use
+into ONNX_MODEL_DIR and reused afterwards. Any backend failure falls back
+to fp32 torch. Run this module to export the graphs and print an accuracy
+drift report of every backend against fp32. With AUDIO_WORKERS > 0, export
+first (--export-only): exporting traces the model in torch, which should
+not happen in the parent before it forks.
+
+Usage: python inference_backends.py [--backends onnx-int8 torch-int8] [--audio-dir DIR] [--export-only]
+"""
+
+import argparse
+import os
+import threading
+import types
+
+import numpy as np
+
+BACKENDS = ('torch', 'torch-int8', 'onnx', 'onnx-int8')
+DEFAULT_BACKEND = 'torch'
+
+# Where exported/quantized ONNX graphs are kept
+ONNX_MODEL_DIR = os.environ.get('ONNX_MODEL_DIR', 'onnx_models')
+ONNX_OPSET = 14
+
+# Reference transcripts for the drift report (English + Tagalog/Taglish)
+REFERENCE_TEXTS = [
+    "I think I am doing okay today, just a little tired.",
+    "I always feel like I will fail no matter what I do.",
+    "Hindi ko alam kung kaya ko pa, sobrang pagod na ako.",
+    "Masaya ako ngayon kasi natapos ko na yung project namin.",
+    "Nobody ever listens to me and I can't stop worrying about exams.",
+    "Sa tingin ko okay lang naman, pero minsan kinakabahan ako.",
+]
+
+def get_backend_name():
+    """Configured backend (INFERENCE_BACKEND), 'torch' if unset or unknown"""
+    name = os.environ.get('INFERENCE_BACKEND', DEFAULT_BACKEND).strip().lower()
+    if name not in BACKENDS:
+        print(f"Warning: unknown INFERENCE_BACKEND '{name}', using {DEFAULT_BACKEND}")
+        return DEFAULT_BACKEND
+    return name
+
+def _onnx_path(model_name, quantized=False):
+    stem = model_name.replace('/', '__')
+    return os.path.join(ONNX_MODEL_DIR, stem + ('.int8.onnx' if quantized else '.onnx'))
+
+def quantize_torch(model):
+    """Dynamic int8 quantization of every nn.Linear (weights int8, activations fp32)"""
+    import torch
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    quantized.eval()
+    return quantized
+
+def quantize_onnx(src_path, dst_path):
+    """onnxruntime dynamic int8 quantization of an exported graph"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(src_path, dst_path, weight_type=QuantType.QInt8)
+    return dst_path
+
+def export_bert_onnx(model, tokenizer, path):
+    """Export a BertModel to ONNX: token ids/mask/type ids -> last_hidden_state"""
+    import torch
+
+    class _HiddenStates(torch.nn.Module):
+        def __init__(self, bert):
+            super().__init__()
+            self.bert = bert
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.bert(input_ids=input_ids, attention_mask=attention_mask,
+                             token_type_ids=token_type_ids).last_hidden_state
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    sample = tokenizer(["warmup export"], return_tensors='pt')
+    axes = {0: 'batch', 1: 'tokens'}
+    with torch.no_grad():
+        torch.onnx.export(_HiddenStates(model).eval(),
+                          (sample['input_ids'], sample['attention_mask'], sample['token_type_ids']),
+                          path, input_names=['input_ids', 'attention_mask', 'token_type_ids'],
+                          output_names=['last_hidden_state'],
+                          dynamic_axes={'input_ids': axes, 'attention_mask': axes, 'token_type_ids': axes,
+                                        'last_hidden_state': axes},
+                          opset_version=ONNX_OPSET)
+    print(f"  Exported BERT to {path}")
+    return path
+
+def export_audio_classifier_onnx(model, path, sr=16000):
+    """Export a Wav2Vec2 sequence classifier to ONNX: input_values -> logits"""
+    import torch
+
+    class _Logits(torch.nn.Module):
+        def __init__(self, classifier):
+            super().__init__()
+            self.classifier = classifier
+
+        def forward(self, input_values):
+            return self.classifier(input_values=input_values).logits
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    sample = torch.zeros(1, sr)
+    with torch.no_grad():
+        torch.onnx.export(_Logits(model).eval(), (sample,), path,
+                          input_names=['input_values'], output_names=['logits'],
+                          dynamic_axes={'input_values': {0: 'batch', 1: 'samples'}, 'logits': {0: 'batch'}},
+                          opset_version=ONNX_OPSET)
+    print(f"  Exported Wav2Vec2 classifier to {path}")
+    return path
+
+def _ensure_onnx(model_name, quantized, export):
+    """Path of the (optionally quantized) graph, exporting it if missing"""
+    path = _onnx_path(model_name)
+    if not os.path.exists(path):
+        export(path)
+    if not quantized:
+        return path
+    int8_path = _onnx_path(model_name, quantized=True)
+    if not os.path.exists(int8_path):
+        quantize_onnx(path, int8_path)
+        print(f"  Quantized {path} -> {int8_path}")
+    return int8_path
+
+class _LazySession:
+    """
+    onnxruntime session created on first use, so a preloading parent can
+    hand the graph path to forked workers without sharing ORT thread pools
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._session = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import onnxruntime as ort
+                    self._session = ort.InferenceSession(self.path, providers=['CPUExecutionProvider'])
+        return self._session
+
+class OnnxBertModel:
+    """Drop-in for BertModel in EmbeddingService: model(**inputs).last_hidden_state"""
+
+    def __init__(self, path):
+        self.path = path
+        self._session = _LazySession(path)
+
+    def __call__(self, **inputs):
+        import torch
+        session = self._session.get()
+        feeds = {}
+        for node in session.get_inputs():
+            value = inputs.get(node.name)
+            if value is None and node.name == 'token_type_ids':
+                value = torch.zeros_like(inputs['input_ids'])
+            feeds[node.name] = value.numpy().astype(np.int64)
+        hidden = session.run(['last_hidden_state'], feeds)[0]
+        return types.SimpleNamespace(last_hidden_state=torch.from_numpy(hidden))
+
+    def eval(self):
+        return self
+
+class OnnxAudioClassifier:
+    """
+    Drop-in for the transformers audio-classification pipeline:
+    classifier({'raw': samples, 'sampling_rate': sr}, top_k=k)
+    """
+
+    def __init__(self, path, feature_extractor, id2label):
+        self.path = path
+        self.feature_extractor = feature_extractor
+        self.id2label = {int(k): v for k, v in id2label.items()}
+        self._session = _LazySession(path)
+        # detect_emotion logs classifier.model.__class__.__name__
+        self.model = self
+
+    def __call__(self, inputs, top_k=5, batch_size=1):
+        """One clip dict, or a list of them (run one at a time: no padding)"""
+        if isinstance(inputs, list):
+            return [self(item, top_k=top_k) for item in inputs]
+        samples = np.asarray(inputs['raw'], dtype=np.float32)
+        sr = inputs.get('sampling_rate', self.feature_extractor.sampling_rate)
+        if sr != self.feature_extractor.sampling_rate:
+            from resampler import resample
+            samples = resample(samples, sr, self.feature_extractor.sampling_rate)
+        features = self.feature_extractor(samples, sampling_rate=self.feature_extractor.sampling_rate,
+                                          return_tensors='np')
+        logits = self._session.get().run(['logits'], {'input_values': features['input_values'].astype(np.float32)})[0][0]
+        probs = np.exp(logits - logits.max())
+        probs /= probs.sum()
+        order = np.argsort(probs)[::-1][:top_k]
+        return [{'label': self.id2label[int(i)], 'score': float(probs[i])} for i in order]
+
+def bert_backend(model, tokenizer, model_name, backend=None):
+    """Wrap a loaded fp32 BertModel for the configured backend"""
+    backend = backend or get_backend_name()
+    try:
+        if backend == 'torch-int8':
+            return quantize_torch(model)
+        if backend in ('onnx', 'onnx-int8'):
+            path = _ensure_onnx(model_name, backend == 'onnx-int8',
+                                lambda p: export_bert_onnx(model, tokenizer, p))
+            return OnnxBertModel(path)
+    except Exception as e:
+        print(f"  {backend} backend unavailable for BERT ({e}), using fp32 torch")
+    return model
+
+def emotion_backend(classifier, model_name, backend=None):
+    """Wrap a loaded audio-classification pipeline for the configured backend"""
+    backend = backend or get_backend_name()
+    try:
+        if backend == 'torch-int8':
+            classifier.model = quantize_torch(classifier.model)
+            return classifier
+        if backend in ('onnx', 'onnx-int8'):
+            path = _ensure_onnx(model_name, backend == 'onnx-int8',
+                                lambda p: export_audio_classifier_onnx(classifier.model, p))
+            return OnnxAudioClassifier(path, classifier.feature_extractor, classifier.model.config.id2label)
+    except Exception as e:
+        print(f"  {backend} backend unavailable for the emotion model ({e}), using fp32 torch")
+    return classifier
+
+def _reference_audio(audio_dir=None, sr=16000, seconds=4):
+    """Clips from audio_dir if given, else a few synthetic voiced signals"""
+    if audio_dir:
+        from audio_features import decode_audio
+        clips = []
+        for name in sorted(os.listdir(audio_dir)):
+            try:
+                clips.append(decode_audio(os.path.join(audio_dir, name), target_sr=sr).samples)
+            except Exception as e:
+                print(f"  Skipping {name}: {e}")
+        if clips:
+            return clips
+    rng = np.random.default_rng(0)
+    t = np.arange(seconds * sr) / sr
+    clips = []
+    for f0, noise in [(110, 0.02), (180, 0.05), (240, 0.1), (140, 0.3)]:
+        phase = 2 * np.pi * np.cumsum(f0 + 15 * np.sin(2 * np.pi * 0.5 * t)) / sr
+        voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+        clips.append((0.3 * voice + noise * rng.standard_normal(len(t))).astype(np.float32))
+    return clips
+
+def drift_report(backends, texts=REFERENCE_TEXTS, clips=None):
+    """
+    Compare every backend with fp32 torch on the reference set. Returns
+    {backend: {'bert': {...}, 'emotion': {...}}} with cosine similarity /
+    max abs difference of the embeddings and top-1 agreement / max
+    probability difference of the emotion classifier.
+    """
+    from transformers import BertModel, BertTokenizer, pipeline
+    from audio_features import BERT_MODEL_NAME, EMOTION_MODEL_NAME
+    from embedding_service import EmbeddingService
+
+    clips = clips if clips is not None else _reference_audio()
+    tokenizer = BertTokenizer.from_pretrained(BERT_MODEL_NAME)
+
+    def embed(model):
+        return np.vstack(EmbeddingService(lambda: (tokenizer, model))._forward(list(texts)))
+
+    def classify(classifier):
+        labels = [o['label'] for o in classifier({'raw': clips[0], 'sampling_rate': 16000}, top_k=None)]
+        rows = []
+        for clip in clips:
+            scores = {o['label']: o['score'] for o in classifier({'raw': clip, 'sampling_rate': 16000}, top_k=len(labels))}
+            rows.append([scores[label] for label in labels])
+        return labels, np.array(rows)
+
+    reference_bert = BertModel.from_pretrained(BERT_MODEL_NAME).eval()
+    reference_emb = embed(reference_bert)
+    labels, reference_probs = classify(pipeline("audio-classification", model=EMOTION_MODEL_NAME))
+
+    report = {}
+    for backend in backends:
+        fresh_bert = BertModel.from_pretrained(BERT_MODEL_NAME).eval()
+        emb = embed(bert_backend(fresh_bert, tokenizer, BERT_MODEL_NAME, backend))
+        cosine = np.sum(emb * reference_emb, axis=1) / (
+            np.linalg.norm(emb, axis=1) * np.linalg.norm(reference_emb, axis=1) + 1e-12)
+
+        classifier = emotion_backend(pipeline("audio-classification", model=EMOTION_MODEL_NAME),
+                                     EMOTION_MODEL_NAME, backend)
+        _, probs = classify(_OrderedClassifier(classifier, labels))
+        report[backend] = {
+            'bert': {'cosine_min': float(cosine.min()), 'cosine_mean': float(cosine.mean()),
+                     'max_abs_diff': float(np.max(np.abs(emb - reference_emb)))},
+            'emotion': {'top1_agreement': float(np.mean(probs.argmax(1) == reference_probs.argmax(1))),
+                        'max_prob_diff': float(np.max(np.abs(probs - reference_probs)))},
+        }
+    return report
+
+class _OrderedClassifier:
+    """Forces the label order of the fp32 reference (ONNX and torch may sort ties differently)"""
+
+    def __init__(self, classifier, labels):
+        self.classifier = classifier
+        self.labels = labels
+
+    def __call__(self, inputs, top_k=None):
+        scores = {o['label']: o['score'] for o in self.classifier(inputs, top_k=len(self.labels))}
+        return [{'label': label, 'score': scores[label]} for label in self.labels]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', default=[b for b in BACKENDS if b != 'torch'], choices=BACKENDS)
+    parser.add_argument('--audio-dir', help="directory of reference recordings (default: synthetic clips)")
+    parser.add_argument('--export-only', action='store_true', help="write the ONNX graphs and exit")
+    args = parser.parse_args()
+
+    if args.export_only:
+        from transformers import BertModel, BertTokenizer, pipeline
+        from audio_features import BERT_MODEL_NAME, EMOTION_MODEL_NAME
+        tokenizer = BertTokenizer.from_pretrained(BERT_MODEL_NAME)
+        classifier = pipeline("audio-classification", model=EMOTION_MODEL_NAME)
+        for backend in args.backends:
+            if backend.startswith('onnx'):
+                bert_backend(BertModel.from_pretrained(BERT_MODEL_NAME).eval(), tokenizer, BERT_MODEL_NAME, backend)
+                emotion_backend(classifier, EMOTION_MODEL_NAME, backend)
+        raise SystemExit(0)
+
+    report = drift_report(args.backends, clips=_reference_audio(args.audio_dir))
+    print(f"\n{'backend':>11} {'bert cos min':>13} {'bert cos mean':>14} {'bert max diff':>14} "
+          f"{'emotion top1':>13} {'emotion max diff':>17}")
+    for backend, stats in report.items():
+        bert, emotion = stats['bert'], stats['emotion']
+        print(f"{backend:>11} {bert['cosine_min']:13.5f} {bert['cosine_mean']:14.5f} {bert['max_abs_diff']:14.4f} "
+              f"{emotion['top1_agreement']:13.2%} {emotion['max_prob_diff']:17.4f}")
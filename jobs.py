@@ -0,0 +1,173 @@
+"""
+Background Job Module
+Bounded worker pool for asynchronous uploads: submit returns a job ID at
+once, clients poll the job or follow its server-sent-events stream
+"""
+
+import json
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Worker threads running jobs, and the most jobs that may be queued or
+# running at once before submissions are refused (HTTP 429)
+JOB_WORKERS = 2
+JOB_QUEUE_LIMIT = 16
+
+# Finished jobs are kept this long for polling (seconds), and swept out
+# this often even when no new jobs arrive
+JOB_RESULT_TTL = 60 * 60
+JOB_SWEEP_SEC = 60
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity"""
+    pass
+
+class Job:
+    """State of one background job; updates wake SSE listeners"""
+
+    def __init__(self, job_id, kind):
+        self.id = job_id
+        self.kind = kind
+        self.status = 'queued'
+        self.progress = []
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.updated = self.created
+        self.version = 0
+        self._changed = threading.Condition()
+
+    def _touch(self):
+        # Caller holds self._changed
+        self.updated = time.time()
+        self.version += 1
+        self._changed.notify_all()
+
+    def set_status(self, status, result=None, error=None):
+        with self._changed:
+            self.status = status
+            if result is not None:
+                self.result = result
+            if error is not None:
+                self.error = error
+            self._touch()
+
+    def report(self, stage, status):
+        """Progress callback: record a stage event"""
+        with self._changed:
+            self.progress.append({'stage': stage, 'status': status,
+                                  'elapsed': round(time.time() - self.created, 3)})
+            self._touch()
+
+    def wait_for_change(self, seen_version, timeout):
+        """Block until version moves past seen_version or timeout; returns version"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != seen_version, timeout=timeout)
+            return self.version
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def to_dict(self):
+        with self._changed:
+            data = {
+                'job_id': self.id,
+                'kind': self.kind,
+                'status': self.status,
+                'progress': list(self.progress),
+                'created': self.created,
+                'updated': self.updated,
+            }
+            if self.status == 'done':
+                data['result'] = self.result
+            if self.error is not None:
+                data['error'] = self.error
+            return data
+
+class JobManager:
+    """Runs jobs on a bounded thread pool with queue-depth backpressure"""
+
+    def __init__(self, workers=JOB_WORKERS, max_pending=JOB_QUEUE_LIMIT, ttl=JOB_RESULT_TTL):
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        threading.Thread(target=self._sweep, name='job-expiry', daemon=True).start()
+
+    @property
+    def depth(self):
+        """Jobs queued or running"""
+        return self._pending
+
+    def submit(self, fn, *args, kind='job', on_finish=None, **kwargs):
+        """
+        Queue fn(*args, progress=job.report, **kwargs); raises QueueFullError
+        when at capacity. on_finish(), if given, runs after fn however it ends.
+        """
+        with self._lock:
+            self._expire()
+            if self._pending >= self.max_pending:
+                raise QueueFullError(f"job queue full ({self._pending}/{self.max_pending})")
+            job = Job(uuid.uuid4().hex, kind)
+            self._jobs[job.id] = job
+            self._pending += 1
+        self._executor.submit(self._run, job, fn, args, kwargs, on_finish)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def _run(self, job, fn, args, kwargs, on_finish):
+        job.set_status('running')
+        try:
+            result = fn(*args, progress=job.report, **kwargs)
+            job.set_status('done', result=result)
+        except Exception as e:
+            traceback.print_exc()
+            job.set_status('failed', error=str(e))
+        finally:
+            with self._lock:
+                self._pending -= 1
+            if on_finish is not None:
+                try:
+                    on_finish()
+                except Exception as e:
+                    print(f"Job {job.id} cleanup failed: {e}")
+
+    def _expire(self):
+        # Caller holds self._lock
+        cutoff = time.time() - self.ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.updated < cutoff]:
+            del self._jobs[job_id]
+
+    def _sweep(self):
+        while True:
+            time.sleep(min(JOB_SWEEP_SEC, self.ttl))
+            with self._lock:
+                self._expire()
+
+    def stream_events(self, job, heartbeat=15.0):
+        """
+        Server-sent-events generator: one 'progress' event per change and a
+        final 'done' or 'failed' event carrying the job state
+        """
+        seen = -1
+        while True:
+            version = job.wait_for_change(seen, heartbeat)
+            if version == seen:
+                yield ": keep-alive\n\n"
+                continue
+            seen = version
+            state = job.to_dict()
+            event = state['status'] if job.finished else 'progress'
+            yield f"event: {event}\ndata: {json.dumps(state, default=str)}\n\n"
+            if job.finished:
+                return
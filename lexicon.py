@@ -0,0 +1,144 @@
+"""
+Lexicon Module
+Word-category matcher for the LIWC-style text features. Entries are
+compiled once into a token trie whose nodes carry a bitmask of the
+categories they complete, so one pass over the tokens counts every
+category and multi-word entries ('sa_tingin', 'hindi kailanman') match as
+phrases. External lexicon files are picked up when they change.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+# Directory of <category>.txt files (one entry per line, '#' comments)
+# that replace the built-in lists; unset = built-ins only
+LEXICON_DIR = os.environ.get('LEXICON_DIR')
+
+# Seconds between checks of the lexicon files for changes
+LEXICON_RELOAD_SEC = 5.0
+
+_TOKEN_RE = re.compile(r"[^\W_]+(?:['-][^\W_]+)*")
+
+def tokenize(text):
+    """Lowercase word tokens with surrounding punctuation stripped"""
+    return _TOKEN_RE.findall(text.lower()) if text else []
+
+def _entry_tokens(entry):
+    # 'sa_tingin' and 'sa tingin' are the same phrase
+    return tuple(tokenize(entry.replace('_', ' ')))
+
+class Lexicon:
+    """Compiled categories -> entries; count() is a single leftmost-longest pass"""
+
+    def __init__(self, categories):
+        self.categories = list(categories)
+        self._trie = {}
+        self.max_phrase = 1
+        digest = hashlib.sha256()
+        for bit, (category, entries) in enumerate(categories.items()):
+            digest.update(category.encode('utf-8') + b'\0')
+            for entry in sorted(set(entries)):
+                tokens = _entry_tokens(entry)
+                if not tokens:
+                    continue
+                digest.update(entry.encode('utf-8') + b'\0')
+                node = self._trie
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                node[None] = node.get(None, 0) | (1 << bit)
+                self.max_phrase = max(self.max_phrase, len(tokens))
+        self.version = digest.hexdigest()[:16]
+
+    def match(self, tokens):
+        """Yield (start, length, mask) for every match, leftmost-longest, non-overlapping"""
+        i, n = 0, len(tokens)
+        trie = self._trie
+        while i < n:
+            node, best_len, best_mask = trie, 0, 0
+            for j in range(i, min(n, i + self.max_phrase)):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                if None in node:
+                    best_len, best_mask = j - i + 1, node[None]
+            if best_len:
+                yield i, best_len, best_mask
+                i += best_len
+            else:
+                i += 1
+
+    def count(self, tokens):
+        """{category: number of matches}; an entry in several categories counts in each"""
+        masks = Counter(mask for _, _, mask in self.match(tokens))
+        counts = dict.fromkeys(self.categories, 0)
+        for mask, n in masks.items():
+            for bit, category in enumerate(self.categories):
+                if mask >> bit & 1:
+                    counts[category] += n
+        return counts
+
+def read_lexicon_file(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.split('#', 1)[0].strip() for line in f if line.split('#', 1)[0].strip()]
+
+class LexiconStore:
+    """
+    Holds the compiled Lexicon: built-in categories, each replaced by
+    <directory>/<category>.txt when that file exists. Files are re-checked
+    at most every check_interval seconds and recompiled on change.
+    """
+
+    def __init__(self, defaults, directory=LEXICON_DIR, check_interval=LEXICON_RELOAD_SEC):
+        self.defaults = {category: list(entries) for category, entries in defaults.items()}
+        self.directory = directory
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self._stamp = None
+        self._lexicon = None
+        self.get()
+
+    def _file_stamp(self):
+        if not self.directory:
+            return ()
+        stamp = []
+        for category in self.defaults:
+            path = os.path.join(self.directory, f'{category}.txt')
+            try:
+                stat = os.stat(path)
+                stamp.append((category, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append((category, None, None))
+        return tuple(stamp)
+
+    def _compile(self):
+        categories = {}
+        for category, entries in self.defaults.items():
+            path = os.path.join(self.directory, f'{category}.txt') if self.directory else None
+            if path and os.path.exists(path):
+                try:
+                    entries = read_lexicon_file(path)
+                except OSError as e:
+                    print(f"  Lexicon: could not read {path}: {e}, using built-in list")
+            categories[category] = entries
+        return Lexicon(categories)
+
+    def get(self):
+        """Current Lexicon, recompiled first if the files changed"""
+        now = time.monotonic()
+        if self._lexicon is not None and now - self._checked < self.check_interval:
+            return self._lexicon
+        with self._lock:
+            if self._lexicon is None or now - self._checked >= self.check_interval:
+                self._checked = now
+                stamp = self._file_stamp()
+                if stamp != self._stamp:
+                    self._lexicon = self._compile()
+                    if self._stamp is not None:
+                        print(f"  Lexicon reloaded (version {self._lexicon.version})")
+                    self._stamp = stamp
+        return self._lexicon
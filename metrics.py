@@ -0,0 +1,214 @@
+"""
+Metrics Module
+In-process counters, gauges and latency histograms rendered in the
+Prometheus text exposition format for GET /metrics. No client library is
+needed.
+
+Worker processes cannot update the server's metrics directly, so after
+each dispatched call a worker drains what it recorded and the server
+merges it (see workers.py).
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_PREFIX = 'biomarker_'
+
+# Latency buckets in seconds: sub-millisecond decode up to multi-minute STT
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_registry = {}
+_lock = threading.Lock()
+
+def _reset_lock():
+    # A fork taken while another thread held the lock must not deadlock the child
+    global _lock
+    _lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_lock)
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = METRICS_PREFIX + name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        with _lock:
+            if self.name in _registry:
+                raise ValueError(f"metric '{self.name}' already registered")
+            _registry[self.name] = self
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name + '_total', help_text, labels)
+
+    def inc(self, n=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + n
+
+    def _render(self):
+        return [f"{self.name}{_format_labels(self.labels, key)} {_number(value)}"
+                for key, value in sorted(self._values.items())]
+
+    def _merge(self, values):
+        for key, value in values.items():
+            self._values[key] = self._values.get(key, 0) + value
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = value
+
+    def _render(self):
+        return [f"{self.name}{_format_labels(self.labels, key)} {_number(value)}"
+                for key, value in sorted(self._values.items())]
+
+    def _merge(self, values):
+        self._values.update(values)
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; values are (bucket counts, count, sum)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            counts, count, total = self._values.get(key) or ([0] * len(self.buckets), 0, 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, count + 1, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render(self):
+        lines = []
+        for key, (counts, count, total) in sorted(self._values.items()):
+            for bound, n in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, [('le', _number(bound))])} {n}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_number(total)}")
+        return lines
+
+    def _merge(self, values):
+        for key, (counts, count, total) in values.items():
+            own_counts, own_count, own_total = self._values.get(key) or ([0] * len(self.buckets), 0, 0.0)
+            self._values[key] = ([a + b for a, b in zip(own_counts, counts)], own_count + count, own_total + total)
+
+def render():
+    """All metrics in Prometheus text format"""
+    lines = []
+    with _lock:
+        for metric in _registry.values():
+            lines += metric._header() + metric._render()
+    return '\n'.join(lines) + '\n'
+
+def drain():
+    """Take (and reset) everything recorded in this process: {metric name: values}"""
+    with _lock:
+        state = {name: metric._values for name, metric in _registry.items() if metric._values}
+        for metric in _registry.values():
+            metric._values = {}
+    return state
+
+def merge(state):
+    """Add a drain() result from another process"""
+    with _lock:
+        for name, values in (state or {}).items():
+            if name in _registry:
+                _registry[name]._merge(values)
+
+# Shared metrics, recorded across modules
+stage_seconds = Histogram('stage_seconds', "Feature pipeline stage latency", labels=('stage',))
+stage_fallbacks = Counter('stage_fallbacks', "Pipeline stages resolved by their fallback",
+                          labels=('stage', 'reason'))
+fallbacks = Counter('fallbacks', "Degraded code paths taken (decoder, BERT zero vector, simulated prediction...)",
+                    labels=('path',))
+decodes = Counter('decodes', "Audio decodes by format and decoder", labels=('format', 'decoder'))
+model_load_seconds = Gauge('model_load_seconds', "Time taken to load each model", labels=('model',))
+request_seconds = Histogram('request_seconds', "End-to-end request latency", labels=('endpoint',))
+prediction_seconds = Histogram('prediction_seconds', "Severity prediction latency per call")
+firestore_commit_seconds = Histogram('firestore_commit_seconds', "Firestore batch commit latency",
+                                     labels=('outcome',))
+
+@contextmanager
+def timed_load(model):
+    """Record how long a model load takes in model_load_seconds"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        model_load_seconds.set(time.perf_counter() - start, model=model)
+
+class StageTimer:
+    """
+    progress(stage, status) callback that also keeps this request's stage
+    timings, forwarding every event to an outer callback if given
+    """
+
+    def __init__(self, progress=None):
+        self.progress = progress
+        self.timings = {}
+        self._started = {}
+
+    def __call__(self, stage, status):
+        now = time.perf_counter()
+        if status == 'started':
+            self._started[stage] = now
+        elif stage in self._started and status in ('done', 'fallback', 'failed'):
+            self.timings[stage] = round(now - self._started.pop(stage), 4)
+        if self.progress is not None:
+            self.progress(stage, status)
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block outside the pipeline as one more stage"""
+        self(name, 'started')
+        status = 'failed'
+        try:
+            yield
+            status = 'done'
+        finally:
+            self(name, status)
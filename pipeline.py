@@ -0,0 +1,133 @@
+"""
+Pipeline Stage Scheduler
+Runs independent feature extraction stages concurrently on a thread pool,
+following their dependency graph, with a per-stage timeout
+"""
+
+import concurrent.futures
+import time
+
+from metrics import stage_fallbacks, stage_seconds
+
+# Default per-stage timeout (seconds) and thread pool size
+STAGE_TIMEOUT = 120
+MAX_STAGE_WORKERS = 4
+
+class StageTimeout(Exception):
+    """Raised when a stage without a fallback exceeds its timeout"""
+    pass
+
+class Stage:
+    """
+    A unit of pipeline work. fn is called with the results of the stages
+    named in deps as keyword arguments. If fallback is given, it is called
+    (with no arguments) to produce a result when fn fails or times out.
+    """
+
+    def __init__(self, name, fn, deps=(), timeout=STAGE_TIMEOUT, fallback=None):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.fallback = fallback
+
+def _check_graph(stages):
+    """Reject unknown dependencies and cycles before anything runs"""
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+    
+    visiting, done = set(), set()
+    def visit(name):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle through stage '{name}'")
+        visiting.add(name)
+        for dep in by_name[name].deps:
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+    for name in by_name:
+        visit(name)
+    return by_name
+
+def run_stages(stages, max_workers=MAX_STAGE_WORKERS, on_event=None):
+    """
+    Run stages as soon as all their dependencies have finished
+    Returns {stage name: result}
+
+    on_event(stage_name, status), if given, is called as each stage is
+    'started', 'done', or resolved by its 'fallback'.
+
+    A stage that raises or times out uses its fallback if it has one;
+    otherwise the error is re-raised and pending stages are cancelled.
+    A timed-out stage's thread cannot be killed; it is abandoned and its
+    result discarded.
+    """
+    by_name = _check_graph(stages)
+    results = {}
+    pending = {stage.name for stage in stages}
+    running = {}  # future -> (stage, start time)
+    
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stage')
+    
+    def notify(name, status):
+        if on_event is not None:
+            try:
+                on_event(name, status)
+            except Exception as e:
+                print(f"  [Stage] progress callback failed: {e}")
+    
+    def resolve(stage, exc):
+        if stage.fallback is None:
+            raise exc
+        stage_fallbacks.inc(stage=stage.name, reason='timeout' if isinstance(exc, StageTimeout) else 'error')
+        print(f"  [Stage] {stage.name} {'timed out' if isinstance(exc, StageTimeout) else 'failed'}: {exc} -> using fallback")
+        results[stage.name] = stage.fallback()
+        notify(stage.name, 'fallback')
+    
+    try:
+        while pending or running:
+            # Submit every stage whose dependencies are all resolved
+            for name in sorted(pending):
+                stage = by_name[name]
+                if all(dep in results for dep in stage.deps):
+                    kwargs = {dep: results[dep] for dep in stage.deps}
+                    running[executor.submit(stage.fn, **kwargs)] = (stage, time.perf_counter())
+                    pending.discard(name)
+                    notify(name, 'started')
+            
+            if not running:
+                break
+            
+            # Wait until something finishes or the nearest deadline passes
+            now = time.perf_counter()
+            deadlines = [start + stage.timeout - now for stage, start in running.values() if stage.timeout]
+            wait_for = max(0.0, min(deadlines)) if deadlines else None
+            finished, _ = concurrent.futures.wait(running, timeout=wait_for,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+            
+            for future in finished:
+                stage, start = running.pop(future)
+                try:
+                    results[stage.name] = future.result()
+                    elapsed = time.perf_counter() - start
+                    stage_seconds.observe(elapsed, stage=stage.name)
+                    print(f"  [Stage] {stage.name} done in {elapsed:.2f}s")
+                    notify(stage.name, 'done')
+                except Exception as e:
+                    resolve(stage, e)
+            
+            now = time.perf_counter()
+            for future, (stage, start) in list(running.items()):
+                if stage.timeout and now - start >= stage.timeout:
+                    running.pop(future)
+                    future.cancel()
+                    resolve(stage, StageTimeout(f"stage '{stage.name}' exceeded {stage.timeout}s"))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return results
@@ -0,0 +1,131 @@
+"""
+Fused Preprocessing Module
+Folds the fitted SimpleImputer, StandardScaler and feature selector into a
+single gather + fill + affine step over only the columns the selector keeps
+"""
+
+import numpy as np
+
+# Largest difference from the sklearn chain accepted by the load-time check
+EQUIVALENCE_ATOL = 1e-9
+
+# Rows in the random probe batch used for that check
+PROBE_ROWS = 32
+
+def patch_imputer(imputer):
+    """SimpleImputer pickled by an older sklearn lacks _fill_dtype"""
+    # --- PATCH FOR SKLEARN VERSION MISMATCH ---
+    if not hasattr(imputer, '_fill_dtype'):
+        print("  [Patching] Fixing SimpleImputer compatibility...")
+        imputer._fill_dtype = np.float64
+    # ------------------------------------------
+
+class FusedPreprocessor:
+    """
+    out = (where(missing(X[:, cols]), fill, X[:, cols]) - mean) / scale
+
+    cols indexes the raw input columns that survive imputation and
+    selection; fill, mean and scale are the fitted statistics for those
+    columns only, so nothing outside the selected set is touched.
+    """
+
+    def __init__(self, columns, fill, mean, scale, missing_values=np.nan):
+        self.columns = np.ascontiguousarray(columns, dtype=np.intp)
+        self.fill = np.ascontiguousarray(fill, dtype=np.float64)
+        self.mean = None if mean is None else np.ascontiguousarray(mean, dtype=np.float64)
+        self.scale = None if scale is None else np.ascontiguousarray(scale, dtype=np.float64)
+        self.missing_values = missing_values
+        self.n_features_in_ = None
+
+    def transform(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        out = X.take(self.columns, axis=1)
+        if isinstance(self.missing_values, float) and np.isnan(self.missing_values):
+            missing = np.isnan(out)
+        else:
+            missing = out == self.missing_values
+        if missing.any():
+            np.copyto(out, np.broadcast_to(self.fill, out.shape), where=missing)
+        # Same in-place order as StandardScaler.transform
+        if self.mean is not None:
+            out -= self.mean
+        if self.scale is not None:
+            out /= self.scale
+        return out
+
+def compile_preprocessing(imputer, scaler, selector):
+    """
+    Build a FusedPreprocessor from the fitted sklearn steps, or return None
+    if a step uses an option the fused kernel does not model
+    """
+    if getattr(imputer, 'add_indicator', False) or not hasattr(imputer, 'statistics_'):
+        return None
+    if not hasattr(selector, 'get_support') or not hasattr(scaler, 'mean_'):
+        return None
+    if type(scaler).__name__ != 'StandardScaler':
+        return None
+
+    stats = np.asarray(imputer.statistics_, dtype=np.float64)
+    # The imputer drops columns it could not fit a statistic for, unless
+    # told to keep them (then they are filled with 0)
+    empty = np.isnan(stats)
+    if getattr(imputer, 'strategy', None) == 'constant':
+        empty[:] = False
+    if getattr(imputer, 'keep_empty_features', False):
+        stats = np.where(empty, 0.0, stats)
+        empty[:] = False
+    imputed_columns = np.flatnonzero(~empty)
+
+    support = np.asarray(selector.get_support(), dtype=bool)
+    if len(support) != len(imputed_columns):
+        return None
+
+    mean = scaler.mean_ if getattr(scaler, 'with_mean', True) else None
+    scale = scaler.scale_ if getattr(scaler, 'with_std', True) else None
+    fused = FusedPreprocessor(
+        imputed_columns[support],
+        stats[imputed_columns][support],
+        None if mean is None else np.asarray(mean)[support],
+        None if scale is None else np.asarray(scale)[support],
+        missing_values=imputer.missing_values,
+    )
+    fused.n_features_in_ = imputer.n_features_in_
+    return fused
+
+def sklearn_chain(imputer, scaler, selector, X):
+    """Reference path: the three transforms one after another"""
+    return selector.transform(scaler.transform(imputer.transform(X)))
+
+def check_equivalence(fused, imputer, scaler, selector, rows=PROBE_ROWS, seed=0):
+    """Max |fused - sklearn| on a random probe batch with missing values"""
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((rows, imputer.n_features_in_))
+    X[rng.random(X.shape) < 0.1] = np.nan
+    expected = sklearn_chain(imputer, scaler, selector, X)
+    got = fused.transform(X)
+    if expected.shape != got.shape:
+        return np.inf
+    return float(np.max(np.abs(expected - got))) if got.size else 0.0
+
+def fuse_model_preprocessing(model):
+    """
+    Compile the bundle's imputer/scaler/selector and verify the result
+    against sklearn. Returns the FusedPreprocessor, or None to keep using
+    the original chain.
+    """
+    try:
+        imputer, scaler, selector = model['imputer'], model['scaler'], model['selector']
+        patch_imputer(imputer)
+        fused = compile_preprocessing(imputer, scaler, selector)
+        if fused is None:
+            print("  Fused preprocessing unavailable for this model, using sklearn chain")
+            return None
+        error = check_equivalence(fused, imputer, scaler, selector)
+    except Exception as e:
+        print(f"  Fused preprocessing failed: {e}")
+        return None
+    if not error <= EQUIVALENCE_ATOL:
+        print(f"  Fused preprocessing differs from sklearn (max error {error:.3g}), using sklearn chain")
+        return None
+    print(f"  Fused preprocessing: {len(fused.columns)}/{fused.n_features_in_} columns (max error {error:.1g})")
+    return fused
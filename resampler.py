@@ -0,0 +1,112 @@
+"""
+Resampling Module
+Polyphase (resample_poly) resampling with filter designs cached per
+(src_sr, dst_sr) pair, plus a streaming block mode with identical output
+"""
+
+from fractions import Fraction
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+
+# Same anti-aliasing design resample_poly uses by default
+KAISER_BETA = 5.0
+HALF_LEN_FACTOR = 10
+
+# Ratios whose reduced up/down terms exceed this are approximated, since the
+# filter length grows with max(up, down)
+MAX_POLYPHASE_FACTOR = 1000
+
+@lru_cache(maxsize=64)
+def resample_ratio(src_sr, dst_sr):
+    """Reduced (up, down) factors for src_sr -> dst_sr"""
+    src_sr, dst_sr = int(src_sr), int(dst_sr)
+    g = gcd(src_sr, dst_sr)
+    up, down = dst_sr // g, src_sr // g
+    if max(up, down) > MAX_POLYPHASE_FACTOR:
+        approx = Fraction(dst_sr, src_sr).limit_denominator(MAX_POLYPHASE_FACTOR)
+        print(f"  Resampler: approximating {src_sr}->{dst_sr} Hz as {approx.numerator}/{approx.denominator}")
+        up, down = approx.numerator, approx.denominator
+    return up, down
+
+@lru_cache(maxsize=64)
+def design_filter(src_sr, dst_sr):
+    """Cached low-pass FIR for src_sr -> dst_sr (unscaled, as resample_poly's window)"""
+    from scipy.signal import firwin
+    up, down = resample_ratio(src_sr, dst_sr)
+    max_rate = max(up, down)
+    h = firwin(2 * HALF_LEN_FACTOR * max_rate + 1, 1.0 / max_rate, window=('kaiser', KAISER_BETA))
+    h.setflags(write=False)
+    return h
+
+def resample(x, src_sr, dst_sr):
+    """Resample a 1-D signal with polyphase filtering and a cached filter"""
+    x = np.asarray(x)
+    if int(src_sr) == int(dst_sr):
+        return x
+    from scipy.signal import resample_poly
+    up, down = resample_ratio(src_sr, dst_sr)
+    y = resample_poly(x.astype(np.float64), up, down, window=design_filter(src_sr, dst_sr))
+    return y.astype(x.dtype) if np.issubdtype(x.dtype, np.floating) else y
+
+class StreamingResampler:
+    """
+    Block-wise resampler. Concatenating process() outputs and the final
+    flush() gives the same samples as resample() on the whole signal, while
+    only the last few filter lengths of input are kept in memory.
+    """
+
+    def __init__(self, src_sr, dst_sr):
+        self.src_sr = int(src_sr)
+        self.dst_sr = int(dst_sr)
+        self.up, self.down = resample_ratio(src_sr, dst_sr)
+        if self.up == self.down:
+            # Pass-through: there is no low-pass to design (cutoff = Nyquist)
+            return
+        self._h = design_filter(src_sr, dst_sr) * self.up
+        self._half_len = (len(self._h) - 1) // 2
+        self._buffer = np.zeros(0)
+        self._buffer_start = 0  # input index of _buffer[0]
+        self._n_in = 0
+        self._n_out = 0         # next output index
+
+    def process(self, block):
+        """Feed the next input block; returns the outputs it completes"""
+        block = np.asarray(block, dtype=np.float64)
+        if self.up == self.down:
+            return block.astype(np.float32)
+        self._buffer = np.concatenate((self._buffer, block))
+        self._n_in += len(block)
+        # Output m needs inputs up to (m*down + half_len) // up
+        ready = -(-(self._n_in * self.up - self._half_len) // self.down)
+        return self._emit(max(ready, self._n_out))
+
+    def flush(self):
+        """Emit the remaining outputs (input past the end is treated as zero)"""
+        if self.up == self.down:
+            return np.zeros(0, dtype=np.float32)
+        total = -(-self._n_in * self.up // self.down)
+        return self._emit(total)
+
+    def _emit(self, end):
+        from scipy.signal import upfirdn
+        start = self._n_out
+        if end <= start:
+            return np.zeros(0, dtype=np.float32)
+
+        # Shift the filter so upfirdn's output grid lands on global outputs
+        offset = self._buffer_start * self.up
+        pre = (offset - self._half_len) % self.down
+        h = np.concatenate((np.zeros(pre), self._h)) if pre else self._h
+        z = upfirdn(h, self._buffer, self.up, self.down)
+        first = (start * self.down + self._half_len - offset + pre) // self.down
+        out = z[first:first + (end - start)]
+
+        # Drop input no later output can reach
+        self._n_out = end
+        keep_from = -(-(end * self.down - self._half_len) // self.up)
+        keep_from = min(max(keep_from, self._buffer_start), self._n_in)
+        self._buffer = self._buffer[keep_from - self._buffer_start:]
+        self._buffer_start = keep_from
+        return out.astype(np.float32)
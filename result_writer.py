@@ -0,0 +1,237 @@
+"""
+Result Writer Module
+Background persistence for analysis results: requests enqueue a document
+and return, a writer thread commits queued documents to Firestore in
+WriteBatch commits (up to FIRESTORE_BATCH_LIMIT docs, or whatever arrived
+within RESULT_FLUSH_SEC) and retries failed commits with backoff.
+
+Documents that still cannot be written, or that arrive while the queue is
+full, are appended to a local JSON-lines journal and replayed at start-up,
+after the next successful commit and every RESULT_REPLAY_SEC, so a
+Firestore outage costs latency in the background, not lost results
+(delivery is at-least-once).
+
+Any client with Firestore's batch()/collection() shape works, so this runs
+against the emulator (FIRESTORE_EMULATOR_HOST) or a fake in tests.
+"""
+
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+
+from metrics import fallbacks, firestore_commit_seconds
+
+# Firestore allows at most 500 writes per batch commit
+FIRESTORE_BATCH_LIMIT = 500
+
+# A partial batch is committed once its oldest document has waited this long
+RESULT_FLUSH_SEC = 1.0
+
+# Documents waiting in memory; beyond this they go straight to the journal
+RESULT_QUEUE_LIMIT = 5000
+
+# Commit attempts per batch, with exponential backoff between them
+RESULT_WRITE_RETRIES = 4
+RESULT_BACKOFF_SEC = 0.5
+RESULT_BACKOFF_MAX_SEC = 30.0
+
+# While the journal is non-empty and traffic is idle, replay is retried this often
+RESULT_REPLAY_SEC = 60.0
+
+# Append-only spill file for documents that could not be written
+RESULT_JOURNAL_PATH = os.environ.get('RESULT_JOURNAL_PATH', os.path.join(os.getcwd(), 'pending_results.jsonl'))
+
+def _encode(value):
+    # datetimes survive the journal round trip; numpy scalars become numbers
+    if isinstance(value, datetime.datetime):
+        return {'__datetime__': value.isoformat()}
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"cannot journal {type(value).__name__}")
+
+def _decode(obj):
+    if set(obj) == {'__datetime__'}:
+        return datetime.datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+class ResultWriter:
+    """Bounded queue of (collection, document) drained by one writer thread"""
+
+    def __init__(self, db, batch_size=FIRESTORE_BATCH_LIMIT, flush_interval=RESULT_FLUSH_SEC,
+                 max_queue=RESULT_QUEUE_LIMIT, journal_path=RESULT_JOURNAL_PATH,
+                 retries=RESULT_WRITE_RETRIES, backoff=RESULT_BACKOFF_SEC):
+        self.db = db
+        self.batch_size = min(batch_size, FIRESTORE_BATCH_LIMIT)
+        self.flush_interval = flush_interval
+        self.journal_path = journal_path
+        self.retries = retries
+        self.backoff = backoff
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._journal_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._counters = {'enqueued': 0, 'written': 0, 'batches': 0, 'retries': 0,
+                          'journaled': 0, 'replayed': 0, 'rejournaled': 0}
+        self._recover_replay()
+        self._thread = threading.Thread(target=self._run, name='result-writer', daemon=True)
+        self._thread.start()
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self._counters[key] += n
+
+    def enqueue(self, collection, document):
+        """Queue one document for writing; never blocks on Firestore"""
+        self._count('enqueued')
+        try:
+            self._queue.put_nowait((collection, document))
+        except queue.Full:
+            print(f"Result queue full, journaling document for '{collection}'")
+            self._journal([(collection, document)])
+
+    def _next_batch(self):
+        """Block for a first document, then gather until the batch is full or flush_interval passes"""
+        try:
+            items = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(items) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0 and not self._stopping.is_set():
+                    items.append(self._queue.get(timeout=remaining))
+                else:
+                    items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _commit(self, items):
+        batch = self.db.batch()
+        for collection, document in items:
+            batch.set(self.db.collection(collection).document(), document)
+        batch.commit()
+
+    def _commit_with_retry(self, items):
+        """True once committed; False after the last retry failed"""
+        delay = self.backoff
+        for attempt in range(self.retries):
+            start = time.perf_counter()
+            try:
+                self._commit(items)
+                firestore_commit_seconds.observe(time.perf_counter() - start, outcome='ok')
+                self._count('written', len(items))
+                self._count('batches')
+                return True
+            except Exception as e:
+                firestore_commit_seconds.observe(time.perf_counter() - start, outcome='error')
+                print(f"Firestore batch commit failed ({len(items)} docs, attempt {attempt + 1}/{self.retries}): {e}")
+                if attempt + 1 < self.retries:
+                    self._count('retries')
+                    if self._stopping.wait(delay):
+                        break
+                    delay = min(delay * 2, RESULT_BACKOFF_MAX_SEC)
+        return False
+
+    def _journal(self, items, rejournal=False):
+        # rejournal: documents a failed replay puts back, already counted
+        # (and in the fallback metric) when first journaled
+        if self.journal_path is None:
+            print(f"Dropping {len(items)} result(s): Firestore unavailable and no journal configured")
+            return
+        with self._journal_lock:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                for collection, document in items:
+                    f.write(json.dumps({'collection': collection, 'document': document}, default=_encode) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        if rejournal:
+            self._count('rejournaled', len(items))
+            return
+        self._count('journaled', len(items))
+        fallbacks.inc(len(items), path='firestore_journal')
+
+    def _recover_replay(self):
+        # A replay interrupted by a crash: its documents go back into the journal.
+        # Callers other than __init__ hold _journal_lock
+        replay_path = self.journal_path and self.journal_path + '.replay'
+        if replay_path and os.path.exists(replay_path):
+            with open(replay_path, encoding='utf-8') as src, open(self.journal_path, 'a', encoding='utf-8') as dst:
+                for line in src:
+                    if line.endswith('\n'):
+                        dst.write(line)
+            os.remove(replay_path)
+
+    def journal_pending(self):
+        return self.journal_path is not None and os.path.exists(self.journal_path)
+
+    def _replay_journal(self):
+        """Commit journaled documents in batches; anything left over stays journaled"""
+        replay_path = self.journal_path + '.replay'
+        with self._journal_lock:
+            # Never replace a .replay file a failed pass left behind
+            self._recover_replay()
+            if not os.path.exists(self.journal_path):
+                return
+            os.replace(self.journal_path, replay_path)
+        items = []
+        with open(replay_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line, object_hook=_decode)
+                except ValueError:
+                    # Torn last line from a crash mid-write
+                    continue
+                items.append((entry['collection'], entry['document']))
+        print(f"Replaying {len(items)} journaled result(s)")
+        done = 0
+        try:
+            for start in range(0, len(items), self.batch_size):
+                chunk = items[start:start + self.batch_size]
+                if not self._commit_with_retry(chunk):
+                    break
+                self._count('replayed', len(chunk))
+                done = start + len(chunk)
+        finally:
+            # Whatever was not committed goes back into the journal before
+            # the replay file is dropped (if that fails, the file stays for
+            # the next pass to recover)
+            if done < len(items):
+                self._journal(items[done:], rejournal=True)
+            os.remove(replay_path)
+
+    def _run(self):
+        next_replay = 0.0  # start-up: replay anything left by a previous run
+        while True:
+            items = self._next_batch()
+            if items:
+                if self._commit_with_retry(items):
+                    next_replay = 0.0
+                else:
+                    self._journal(items)
+                    next_replay = time.monotonic() + RESULT_REPLAY_SEC
+            if self._stopping.is_set():
+                if self._queue.empty():
+                    return
+            elif time.monotonic() >= next_replay and self.journal_pending():
+                next_replay = time.monotonic() + RESULT_REPLAY_SEC
+                try:
+                    self._replay_journal()
+                except Exception as e:
+                    print(f"Journal replay failed: {e}")
+
+    def close(self, timeout=10.0):
+        """Flush what is queued (journaling anything that cannot be written) and stop"""
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            counters = dict(self._counters)
+        return dict(counters, queued=self._queue.qsize(), journal_pending=self.journal_pending())
@@ -0,0 +1,352 @@
+"""
+Streaming Feature Extraction Module
+Constant-memory jitter, shimmer, HNR and MFCC extraction for long WAV
+recordings: the file is read in fixed-size blocks and the statistics are
+updated incrementally, optionally keeping a per-window time series
+"""
+
+import os
+import wave
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from audio_dsp import (FRAME_SEC, HOP_SEC, RunningStats, frame_pitch_hnr, frame_rms,
+                       hnr_from_autocorr, jitter_from_counts, lag_autocorrelation,
+                       pitch_frame_params, sign_change_counts)
+from resampler import StreamingResampler
+
+# Block (window) length read from disk per step
+STREAM_BLOCK_SEC = 10.0
+
+# WAV recordings at least this long are streamed by extract_all_features
+# instead of running the in-memory extractor over the whole clip
+STREAM_MIN_SEC = float(os.environ.get('STREAM_MIN_SEC', 600))
+
+# MFCC framing (librosa defaults), kept continuous across blocks
+MFCC_N_FFT = 2048
+MFCC_HOP = 512
+
+def iter_wav_blocks(path, block_samples):
+    """
+    Yield (float32 mono block, sample rate) from a WAV file without loading
+    it whole. PCM files are read with the wave module; other encodings
+    (e.g. float WAV) fall back to a memory-mapped scipy read.
+    """
+    try:
+        with wave.open(path, 'rb') as wf:
+            sr = wf.getframerate()
+            channels = wf.getnchannels()
+            width = wf.getsampwidth()
+            while True:
+                raw = wf.readframes(block_samples)
+                if not raw:
+                    break
+                yield _pcm_to_float(raw, width, channels), sr
+        return
+    except wave.Error:
+        pass
+
+    import scipy.io.wavfile as wav
+    sr, data = wav.read(path, mmap=True)
+    for start in range(0, len(data), block_samples):
+        block = np.asarray(data[start:start + block_samples])
+        if block.ndim > 1:
+            block = block.mean(axis=1)
+        if block.dtype == np.int16:
+            block = block.astype(np.float32) / 32768.0
+        elif block.dtype == np.int32:
+            block = block.astype(np.float32) / 2147483648.0
+        yield block.astype(np.float32), sr
+
+def wav_duration(path):
+    """Length in seconds of a WAV file from its header, or None if it is not one"""
+    try:
+        with wave.open(path, 'rb') as wf:
+            return wf.getnframes() / float(wf.getframerate())
+    except (wave.Error, EOFError, OSError):
+        pass
+    try:
+        import scipy.io.wavfile as wav
+        sr, data = wav.read(path, mmap=True)
+        return len(data) / float(sr)
+    except Exception:
+        return None
+
+def _select(block, start, segments):
+    """Samples of block (starting at stream index start) inside the (start, end) segments"""
+    end = start + len(block)
+    parts = [block[max(seg_start, start) - start:min(seg_end, end) - start]
+             for seg_start, seg_end in segments if seg_start < end and seg_end > start]
+    if len(parts) == 1:
+        return parts[0]
+    return np.concatenate(parts) if parts else block[:0]
+
+def _pcm_to_float(raw, width, channels):
+    """Interleaved little-endian PCM bytes -> float32 mono"""
+    if width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128.0
+    elif width == 2:
+        data = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768.0
+    elif width == 3:
+        bytes3 = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        ints = (bytes3[:, 0].astype(np.int32) | (bytes3[:, 1].astype(np.int32) << 8)
+                | (bytes3[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints >= 1 << 23, ints - (1 << 24), ints)
+        data = ints.astype(np.float32) / float(1 << 23)
+    else:
+        data = np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2147483648.0
+    if channels > 1:
+        data = data.reshape(-1, channels).mean(axis=1)
+    return data
+
+class _FrameCarry:
+    """Cuts a block stream into frames on a global hop grid, carrying the remainder"""
+
+    def __init__(self, frame_length, hop_length):
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.span = self.buffer
+        self.frames_emitted = 0
+
+    def push(self, block):
+        """Return the frames completed by this block as a zero-copy view"""
+        buf = np.concatenate((self.buffer, block)) if len(self.buffer) else block
+        if len(buf) < self.frame_length:
+            self.buffer = buf
+            self.span = buf[:0]
+            return np.zeros((0, self.frame_length), dtype=buf.dtype)
+        n_frames = (len(buf) - self.frame_length) // self.hop_length + 1
+        frames = sliding_window_view(buf, self.frame_length)[::self.hop_length][:n_frames]
+        # Contiguous samples covered by the returned frames
+        self.span = buf[:(n_frames - 1) * self.hop_length + self.frame_length]
+        self.buffer = buf[n_frames * self.hop_length:]
+        self.frames_emitted += n_frames
+        return frames
+
+class StreamingAudioFeatures:
+    """
+    Incremental version of extract_audio_features for a block stream.
+    Jitter, shimmer and the clip-level HNR match the in-memory path exactly;
+    MFCC means use uncentred frames and so differ only at the clip edges.
+    """
+
+    def __init__(self, sr=16000, keep_timeline=False):
+        self.sr = sr
+        self.keep_timeline = keep_timeline
+        self.timeline = []
+        self.n_samples = 0
+
+        # Jitter: sign-change counts, continued across block boundaries
+        self._sign_counts = np.zeros(3, dtype=np.int64)
+        self._last_sign = None
+
+        # Shimmer/energy: frame RMS on the 25ms/10ms grid. The newest frame is
+        # held back because the legacy slicing drops a frame ending exactly
+        # at the end of the clip.
+        self._frames = _FrameCarry(int(FRAME_SEC * sr), int(HOP_SEC * sr))
+        self._pending_rms = None
+        self._prev_rms = None
+        self._abs_diff_sum = 0.0
+        self._n_diffs = 0
+        self._energy = RunningStats()
+
+        # HNR: lag autocorrelation sums, with max_lag samples of lookahead
+        self._min_lag, self._max_lag, self._hnr_frame = pitch_frame_params(sr)
+        self._n_lags = self._max_lag + 1
+        self._hnr_buffer = np.zeros(0)
+        self._autocorr = np.zeros(self._n_lags)
+        self._frame_hnr = RunningStats()
+        self._frame_pitch = RunningStats()
+
+        # MFCC: running mean over frames
+        self._mfcc_frames = _FrameCarry(MFCC_N_FFT, MFCC_HOP)
+        self._mfcc = RunningStats((13,))
+        self._band_sums = np.zeros(13)
+        self._band_weight = 0
+
+    def update(self, block):
+        """Consume the next block of float32 mono samples"""
+        block = np.asarray(block, dtype=np.float32)
+        if len(block) == 0:
+            return
+        start = self.n_samples
+        self.n_samples += len(block)
+        window = {'start': start / self.sr, 'end': self.n_samples / self.sr}
+
+        # Jitter
+        signs = np.sign(block).astype(np.int8)
+        if self._last_sign is not None:
+            signs = np.concatenate(([self._last_sign], signs))
+        counts = sign_change_counts(signs)
+        self._sign_counts += counts
+        self._last_sign = signs[-1]
+        window['jitter'] = float(np.clip(jitter_from_counts(counts), 0, 10))
+
+        # Shimmer / energy
+        rms = frame_rms(self._frames.push(block))
+        if self._pending_rms is not None:
+            rms = np.concatenate(([self._pending_rms], rms))
+        if len(rms):
+            self._commit_rms(rms[:-1])
+            self._pending_rms = rms[-1]
+        if self.keep_timeline:
+            window['shimmer'] = float(np.clip(_shimmer(rms), 0, 20))
+            window['energy'] = float(np.mean(rms)) if len(rms) else 0.0
+
+        # HNR: frames whose lookahead is complete
+        buf = np.concatenate((self._hnr_buffer, block))
+        core = ((len(buf) - self._n_lags) // self._hnr_frame) * self._hnr_frame
+        if core > 0:
+            block_autocorr = self._consume_autocorr(buf, core)
+            self._hnr_buffer = buf[core:]
+            if self.keep_timeline:
+                window['hnr'] = hnr_from_autocorr(block_autocorr, self._min_lag, self._max_lag)[0]
+        else:
+            self._hnr_buffer = buf
+
+        # MFCC
+        block_mfcc = self._update_mfcc(block)
+        if self.keep_timeline:
+            if block_mfcc is not None:
+                window['mfcc'] = [float(v) for v in block_mfcc]
+            self.timeline.append(window)
+
+    def _commit_rms(self, rms):
+        if len(rms) == 0:
+            return
+        if self._prev_rms is not None:
+            rms_ext = np.concatenate(([self._prev_rms], rms))
+        else:
+            rms_ext = rms
+        diffs = np.abs(np.diff(rms_ext))
+        self._abs_diff_sum += float(diffs.sum())
+        self._n_diffs += len(diffs)
+        self._energy.update(rms)
+        self._prev_rms = rms[-1]
+
+    def _consume_autocorr(self, buf, core_length):
+        autocorr = lag_autocorrelation(buf, self._n_lags, self._hnr_frame, core_length=core_length)
+        frame_hnr, frame_pitch, voiced = frame_pitch_hnr(autocorr, self.sr)
+        self._frame_hnr.update(frame_hnr[voiced])
+        self._frame_pitch.update(frame_pitch[voiced])
+        block_autocorr = autocorr.sum(axis=0)
+        self._autocorr += block_autocorr
+        return block_autocorr
+
+    def _update_mfcc(self, block):
+        frames = self._mfcc_frames.push(block)
+        if len(frames) == 0:
+            return None
+        try:
+            import librosa
+            # Frames are contiguous on the hop grid: hand librosa the span they cover
+            mfccs = librosa.feature.mfcc(y=self._mfcc_frames.span, sr=self.sr, n_mfcc=13,
+                                         n_fft=MFCC_N_FFT, hop_length=MFCC_HOP, center=False)
+            self._mfcc.update(mfccs.T)
+            return mfccs.mean(axis=1)
+        except Exception:
+            # Fallback: simple spectral band means, weighted by block length
+            spectrum = np.abs(np.fft.rfft(block))[:len(block) // 2]
+            band_size = max(len(spectrum) // 13, 1)
+            bands = np.array([np.mean(spectrum[i * band_size:(i + 1) * band_size]) if len(spectrum) else 0.0
+                              for i in range(13)])
+            self._band_sums += bands * len(block)
+            self._band_weight += len(block)
+            return bands
+
+    def result(self):
+        """Final clip-level features (same keys as extract_audio_features)"""
+        if self.n_samples < self.sr * 0.5:
+            raise ValueError("Audio too short. Please record at least 1 second.")
+
+        # Last held-back frame counts unless it ends exactly at the end of the clip
+        if self._pending_rms is not None:
+            last_end = (self._frames.frames_emitted - 1) * self._frames.hop_length + self._frames.frame_length
+            if last_end < self.n_samples:
+                self._commit_rms(np.array([self._pending_rms]))
+            self._pending_rms = None
+
+        # Remaining HNR samples have no further lookahead (zero padding, as in-memory)
+        if len(self._hnr_buffer):
+            self._consume_autocorr(self._hnr_buffer, len(self._hnr_buffer))
+            self._hnr_buffer = np.zeros(0)
+
+        shimmer = self._abs_diff_sum / self._n_diffs / (self._energy.mean + 1e-10) * 100 if self._n_diffs else 0.0
+        hnr, _ = hnr_from_autocorr(self._autocorr[:self.n_samples], self._min_lag, self._max_lag)
+
+        features = {
+            'jitter': float(np.clip(jitter_from_counts(self._sign_counts), 0, 10)),
+            'shimmer': float(np.clip(shimmer, 0, 20)),
+            'energy_mean': float(self._energy.mean),
+            'energy_std': float(self._energy.std),
+            'hnr': hnr,
+            'hnr_mean': float(self._frame_hnr.mean),
+            'hnr_std': float(self._frame_hnr.std),
+            'pitch_mean': float(self._frame_pitch.mean),
+            'pitch_std': float(self._frame_pitch.std),
+        }
+
+        if self._mfcc.count:
+            mfcc_means = self._mfcc.mean
+        elif self._band_weight:
+            mfcc_means = self._band_sums / self._band_weight
+        else:
+            mfcc_means = np.zeros(13)
+        for i in range(13):
+            features[f'mfcc_{i}'] = float(mfcc_means[i])
+        return features
+
+def _shimmer(rms):
+    if len(rms) < 2:
+        return 0.0
+    return np.mean(np.abs(np.diff(rms))) / (np.mean(rms) + 1e-10) * 100
+
+def extract_audio_features_streaming(wav_path, sr=16000, block_sec=STREAM_BLOCK_SEC, return_timeline=False,
+                                     segments=None):
+    """
+    Extract audio features from a WAV file block by block
+    Memory stays constant regardless of duration.
+    segments, if given, are (start, end) sample ranges at sr to keep (the
+    detect_speech segments); the rest is skipped, as if the voiced regions
+    had been concatenated.
+    Returns features, or (features, timeline) when return_timeline is set;
+    the timeline has one entry per block with its start/end time and the
+    window's jitter, shimmer, energy, HNR and MFCC means.
+    """
+    print(f"Streaming audio features from: {wav_path}")
+    extractor = StreamingAudioFeatures(sr=sr, keep_timeline=return_timeline)
+    resampler = None
+    position = 0
+
+    def feed(block):
+        nonlocal position
+        start, position = position, position + len(block)
+        extractor.update(block if segments is None else _select(block, start, segments))
+
+    for block, file_sr in iter_wav_blocks(wav_path, int(block_sec * sr)):
+        if file_sr != sr:
+            if resampler is None:
+                resampler = StreamingResampler(file_sr, sr)
+            block = resampler.process(block)
+        feed(block)
+    if resampler is not None:
+        feed(resampler.flush())
+
+    features = extractor.result()
+    print(f"  Streamed {extractor.n_samples / sr:.1f}s: jitter={features['jitter']:.2f}, shimmer={features['shimmer']:.2f}, hnr={features['hnr']:.2f}")
+    if return_timeline:
+        return features, extractor.timeline
+    return features
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1:
+        features, timeline = extract_audio_features_streaming(sys.argv[1], return_timeline=True)
+        for window in timeline:
+            print(f"  {window['start']:8.1f}-{window['end']:8.1f}s  jitter={window['jitter']:.2f}  "
+                  f"shimmer={window.get('shimmer', 0):.2f}  hnr={window.get('hnr', 0):.2f}")
+        print(f"\nExtracted {len(features)} features")
+    else:
+        print("Usage: python streaming_features.py <file.wav>")
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The modules live at the repository root, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SR = 16000
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+@pytest.fixture
+def speech_like(rng):
+    """3 s of 0.5 s voiced bursts (jittered 180 Hz tone) and 0.5 s gaps over a low noise floor"""
+    t = np.arange(3 * SR) / SR
+    tone = 0.3 * np.sin(2 * np.pi * 180 * t * (1 + 0.01 * np.sin(2 * np.pi * 3 * t)))
+    voiced = np.where((t % 1.0) < 0.5, tone, 0.0)
+    return (voiced + 0.001 * rng.standard_normal(len(t))).astype(np.float32)
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from audio_dsp import (frame_features, frame_signal, frame_zero_crossings, jitter_from_counts, lag_autocorrelation,
+                       pitch_hnr_track, sign_change_counts)
+from conftest import SR
+
+def legacy_hnr(y, sr):
+    """Whole-signal autocorrelation HNR as extract_audio_features computed it before framing"""
+    autocorr = np.correlate(y, y, mode='full')
+    autocorr = autocorr[len(autocorr) // 2:]
+    peak_idx = np.argmax(autocorr[int(sr / 500):int(sr / 50)]) + int(sr / 500) if len(autocorr) > int(sr / 50) else 1
+    hnr = 10 * np.log10(autocorr[0] / (np.abs(autocorr[peak_idx]) + 1e-10) + 1e-10)
+    return float(np.clip(hnr, 0, 40))
+
+def legacy_frame_stats(y, sr):
+    """Jitter and shimmer as extract_audio_features computed them with Python-level framing"""
+    zcr = np.abs(np.diff(np.sign(y)))
+    jitter = np.std(zcr) / (np.mean(zcr) + 1e-10) * 100 if len(zcr) > 1 else 0.0
+    frame_size, hop_size = int(0.025 * sr), int(0.010 * sr)
+    frames = [y[i:i + frame_size] for i in range(0, len(y) - frame_size, hop_size)]
+    rms = [np.sqrt(np.mean(f ** 2)) for f in frames]
+    shimmer = np.mean(np.abs(np.diff(rms))) / (np.mean(rms) + 1e-10) * 100 if len(rms) > 1 else 0.0
+    return jitter, shimmer, rms
+
+@pytest.mark.parametrize('n', [SR * 3, SR * 3 + 160, SR * 3 + 161, 400, 401])
+def test_frame_features_match_legacy_loops(speech_like, n):
+    y = np.resize(speech_like, n)
+    jitter, shimmer, rms = legacy_frame_stats(y, SR)
+    stats = frame_features(y, SR)
+    # The legacy std/mean ran in float32; the counts are exact
+    assert stats['jitter'] == pytest.approx(jitter, rel=1e-6)
+    assert stats['shimmer'] == pytest.approx(shimmer, rel=1e-6, abs=1e-9)
+    np.testing.assert_allclose(stats['frame_rms'], rms, rtol=1e-6)
+
+def test_frame_signal_is_a_zero_copy_view(rng):
+    y = rng.standard_normal(1000)
+    frames = frame_signal(y, 400, 160)
+    # Frames start strictly before len(y) - frame_length, as the legacy slicing did
+    assert frames.shape == (4, 400)
+    assert np.shares_memory(frames, y)
+    np.testing.assert_array_equal(frames[2], y[320:720])
+    assert frame_signal(y[:400], 400, 160).shape == (0, 400)
+
+def test_frame_zero_crossings_match_per_frame_count(rng):
+    y = rng.standard_normal(4000)
+    expected = [np.mean(np.sign(f[1:]) != np.sign(f[:-1])) for f in frame_signal(y, 400, 160)]
+    np.testing.assert_allclose(frame_zero_crossings(y, 400, 160), expected)
+
+def test_jitter_counts_add_across_blocks(rng):
+    signs = np.sign(rng.standard_normal(10001)).astype(np.int8)
+    split = sign_change_counts(signs[:4000]) + sign_change_counts(signs[3999:])
+    assert jitter_from_counts(split) == pytest.approx(jitter_from_counts(sign_change_counts(signs)))
+
+def test_clip_hnr_matches_legacy_autocorrelation(speech_like):
+    y = speech_like.astype(np.float64)
+    assert pitch_hnr_track(y, SR)['hnr'] == pytest.approx(legacy_hnr(y, SR), abs=1e-6)
+
+@pytest.mark.parametrize('n', [SR // 2 + 1, 12345, SR])
+def test_clip_hnr_matches_legacy_on_noise(rng, n):
+    y = rng.standard_normal(n)
+    assert pitch_hnr_track(y, SR)['hnr'] == pytest.approx(legacy_hnr(y, SR), abs=1e-6)
+
+def test_frame_rows_sum_to_full_autocorrelation(rng):
+    y = rng.standard_normal(5000)
+    n_lags = 321
+    full = np.correlate(y, y, mode='full')[len(y) - 1:len(y) - 1 + n_lags]
+    framed = lag_autocorrelation(y, n_lags, 640, block_frames=3)
+    np.testing.assert_allclose(framed.sum(axis=0), full, atol=1e-8)
+
+def test_pitch_of_a_pure_tone():
+    t = np.arange(SR) / SR
+    track = pitch_hnr_track(np.sin(2 * np.pi * 200 * t), SR)
+    assert track['voiced_ratio'] > 0.9
+    assert track['pitch_mean'] == pytest.approx(200, rel=0.02)
+    # The legacy HNR is 10*log10(r0 / r_peak): close to 0 dB when periodic
+    assert track['hnr_mean'] < 1
+
+def test_noise_is_mostly_unvoiced(rng):
+    assert pitch_hnr_track(rng.standard_normal(SR), SR)['voiced_ratio'] < 0.2
@@ -0,0 +1,61 @@
+import threading
+import time
+
+import pytest
+
+import jobs
+from jobs import JobManager, QueueFullError
+
+def wait_finished(job, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not job.finished:
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.01)
+
+def test_job_result_and_progress():
+    manager = JobManager()
+    def work(x, progress):
+        progress('stage', 'done')
+        return x * 2
+    job = manager.submit(work, 21)
+    wait_finished(job)
+    state = manager.get(job.id).to_dict()
+    assert state['status'] == 'done' and state['result'] == 42
+    assert state['progress'][0]['stage'] == 'stage'
+
+def test_failure_is_recorded():
+    manager = JobManager()
+    def work(progress):
+        raise RuntimeError("boom")
+    job = manager.submit(work)
+    wait_finished(job)
+    assert job.status == 'failed' and job.error == 'boom'
+
+def test_queue_limit():
+    manager = JobManager(workers=1, max_pending=1)
+    release = threading.Event()
+    manager.submit(lambda progress: release.wait(2))
+    with pytest.raises(QueueFullError):
+        manager.submit(lambda progress: None)
+    release.set()
+
+def test_finished_jobs_expire_on_lookup():
+    manager = JobManager(ttl=0.05)
+    job = manager.submit(lambda progress: 1)
+    wait_finished(job)
+    time.sleep(0.1)
+    assert manager.get(job.id) is None
+
+def test_finished_jobs_expire_without_any_calls(monkeypatch):
+    monkeypatch.setattr(jobs, 'JOB_SWEEP_SEC', 0.05)
+    manager = JobManager(ttl=0.05)
+    job = manager.submit(lambda progress: 1)
+    wait_finished(job)
+    time.sleep(0.3)
+    assert job.id not in manager._jobs
+
+def test_event_stream_ends_with_final_state():
+    manager = JobManager()
+    job = manager.submit(lambda progress: 'ok')
+    events = list(manager.stream_events(job, heartbeat=0.05))
+    assert events[-1].startswith('event: done')
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from feature_schema import FEATURE_SCHEMA, FeatureVector
+from prediction import build_feature_matrix, predict_matrix, run_prediction, run_prediction_batch
+
+EMOTIONS = ['Fear', 'Sad', 'Angry', 'Disgust', 'Surprise', 'Happy', 'Neutral', 'Calm']
+
+class Identity:
+    def __init__(self, n_features):
+        self.n_features_in_ = n_features
+        self._fill_dtype = np.float64
+
+    def transform(self, X):
+        return X
+
+class LinearSeverity:
+    """Softmax over a fixed random projection, like a fitted classifier's predict_proba"""
+
+    def __init__(self, n_features, seed=0):
+        self.W = np.random.default_rng(seed).standard_normal((n_features, 3)) * 0.05
+
+    def predict_proba(self, X):
+        logits = X @ self.W
+        e = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return e / e.sum(axis=1, keepdims=True)
+
+class Labels:
+    # LabelEncoder sorts its classes
+    classes_ = np.array(['Moderate', 'Normal', 'Severe'])
+
+@pytest.fixture
+def model():
+    n = FEATURE_SCHEMA.n_features
+    return {'imputer': Identity(n), 'scaler': Identity(n), 'selector': Identity(n),
+            'severity_model': LinearSeverity(n), 'label_encoder': Labels()}
+
+def random_rows(n, seed=1):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(n):
+        row = {name: float(v) for name, v in zip(FEATURE_SCHEMA.names, rng.standard_normal(FEATURE_SCHEMA.n_features))}
+        row['word_count'] = float(rng.choice([0, 12]))
+        row['negative_count'] = float(rng.choice([0, 0, 2.5]))
+        row['detected_emotion'] = str(rng.choice(EMOTIONS))
+        row['emotion_confidence'] = float(rng.uniform(0, 1))
+        rows.append(row)
+    return rows
+
+def legacy_severity(features, model):
+    """Per-recording severity rules as app.run_prediction applied them before vectorising"""
+    X = np.array([[features.get(name, 0.0) for name in FEATURE_SCHEMA.names]])
+    if features.get('word_count', 0) == 0:
+        probs = {"Normal": 100, "Moderate": 0, "Severe": 0}
+    else:
+        proba = model['severity_model'].predict_proba(X)[0]
+        probs = {label: float(p) * 100 for label, p in zip(model['label_encoder'].classes_, proba)}
+        if features.get('negative_count', 0) == 0:
+            probs = {"Normal": 95, "Moderate": 5, "Severe": 0}
+    emotion = features.get('detected_emotion', 'Neutral')
+    conf = features.get('emotion_confidence', 0.0)
+    if conf > 0.5:
+        boost = 15 * conf
+        if emotion in ['Fear', 'Sad', 'Angry', 'Disgust', 'Surprise']:
+            probs['Severe'] += boost
+            probs['Moderate'] += boost * 0.5
+            probs['Normal'] = max(0, probs['Normal'] - boost)
+        elif emotion in ['Happy', 'Neutral']:
+            probs['Normal'] += boost
+            probs['Severe'] = max(0, probs['Severe'] - boost)
+            probs['Moderate'] = max(0, probs['Moderate'] - boost * 0.5)
+    total = sum(probs.values())
+    probs = {k: v / total * 100 for k, v in probs.items()}
+    label = max(probs, key=probs.get)
+    return {'level': label, 'confidence': int(round(probs[label])),
+            'probabilities': {k: int(round(round(v, 1))) for k, v in probs.items()}}
+
+def severity(result):
+    return {key: result['severity'][key] for key in ('level', 'confidence', 'probabilities')}
+
+def test_batch_matches_legacy_per_row_rules(model):
+    rows = random_rows(64)
+    results = run_prediction_batch(rows, model)
+    assert [severity(r) for r in results] == [legacy_severity(row, model) for row in rows]
+
+def test_batch_matches_single_calls(model):
+    rows = random_rows(16, seed=2)
+    batch = [severity(r) for r in run_prediction_batch(rows, model)]
+    assert batch == [severity(run_prediction(row, model)) for row in rows]
+
+def test_columnar_and_feature_vector_input(model):
+    rows = random_rows(8, seed=3)
+    expected = [severity(r) for r in run_prediction_batch(rows, model)]
+    columnar = {key: [row[key] for row in rows] for key in rows[0]}
+    assert [severity(r) for r in run_prediction_batch(columnar, model)] == expected
+    vectors = [FeatureVector.from_dict(row) for row in rows]
+    assert [severity(r) for r in run_prediction_batch(vectors, model)] == expected
+
+def test_feature_matrix_layout(model):
+    rows = random_rows(4, seed=4)
+    X = build_feature_matrix(rows, FEATURE_SCHEMA.n_features)
+    np.testing.assert_array_equal(X, [[row[name] for name in FEATURE_SCHEMA.names] for row in rows])
+    vectors = [FeatureVector.from_dict(row) for row in rows]
+    np.testing.assert_array_equal(build_feature_matrix(vectors, FEATURE_SCHEMA.n_features), X)
+    # A model expecting fewer columns gets the leading ones
+    np.testing.assert_array_equal(build_feature_matrix(rows, 10), X[:, :10])
+
+def test_predict_matrix_with_context_rows(model):
+    rows = random_rows(8, seed=5)
+    X = build_feature_matrix(rows, FEATURE_SCHEMA.n_features)
+    assert [severity(r) for r in predict_matrix(X, model, rows=rows)] == [legacy_severity(row, model) for row in rows]
+
+def test_simulated_fallback_without_a_model():
+    rows = random_rows(3, seed=6)
+    results = run_prediction_batch(rows, {'severity_labels': ["Normal", "Moderate", "Severe"]})
+    assert [r['severity']['level'] for r in results] == [severity(run_prediction(row, {}))['level'] for row in rows]
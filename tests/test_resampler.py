@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from scipy.signal import resample_poly
+
+from resampler import StreamingResampler, design_filter, resample, resample_ratio
+
+RATES = [(44100, 16000), (48000, 16000), (22050, 16000), (8000, 16000)]
+
+@pytest.mark.parametrize('src_sr,dst_sr', RATES)
+def test_matches_resample_poly(rng, src_sr, dst_sr):
+    x = rng.standard_normal(src_sr // 2 + 7)
+    up, down = resample_ratio(src_sr, dst_sr)
+    np.testing.assert_allclose(resample(x, src_sr, dst_sr), resample_poly(x, up, down), atol=1e-10)
+
+@pytest.mark.parametrize('src_sr,dst_sr', RATES)
+@pytest.mark.parametrize('block', [1, 997, 4096])
+def test_streaming_matches_whole_signal(rng, src_sr, dst_sr, block):
+    x = rng.standard_normal(src_sr // 4 + 13).astype(np.float32)
+    stream = StreamingResampler(src_sr, dst_sr)
+    out = np.concatenate([stream.process(x[i:i + block]) for i in range(0, len(x), block)] + [stream.flush()])
+    np.testing.assert_allclose(out, resample(x, src_sr, dst_sr), atol=1e-5)
+
+def test_keeps_tone_frequency():
+    src_sr, dst_sr = 44100, 16000
+    t = np.arange(src_sr) / src_sr
+    y = resample(np.sin(2 * np.pi * 440 * t), src_sr, dst_sr)
+    assert len(y) == dst_sr
+    assert np.argmax(np.abs(np.fft.rfft(y))) == 440
+
+def test_same_rate_is_passthrough(rng):
+    x = rng.standard_normal(100).astype(np.float32)
+    assert resample(x, 16000, 16000) is x
+    np.testing.assert_array_equal(StreamingResampler(16000, 16000).process(x), x)
+
+def test_float32_in_float32_out(rng):
+    assert resample(rng.standard_normal(1000).astype(np.float32), 48000, 16000).dtype == np.float32
+
+def test_large_factors_are_approximated():
+    up, down = resample_ratio(44101, 16000)
+    assert max(up, down) <= 1000
+    assert abs(up / down - 16000 / 44101) < 1e-5
+
+def test_filter_design_is_cached():
+    assert design_filter(44100, 16000) is design_filter(44100, 16000)
@@ -0,0 +1,142 @@
+import json
+import os
+import time
+
+import pytest
+
+from result_writer import ResultWriter
+
+class FakeFirestore:
+    """batch()/collection() shape of the Firestore client; fails while down"""
+
+    def __init__(self):
+        self.down = False
+        self.committed = []
+
+    def batch(self):
+        db = self
+
+        class Batch:
+            def __init__(self):
+                self.docs = []
+
+            def set(self, ref, document):
+                self.docs.append(document)
+
+            def commit(self):
+                if db.down:
+                    raise RuntimeError("unavailable")
+                db.committed += self.docs
+
+        return Batch()
+
+    def collection(self, name):
+        class Collection:
+            def document(self):
+                return None
+
+        return Collection()
+
+@pytest.fixture
+def db():
+    return FakeFirestore()
+
+def make_writer(db, tmp_path, **kwargs):
+    kwargs = dict(dict(journal_path=str(tmp_path / 'journal.jsonl'), retries=1, backoff=0, flush_interval=0.02),
+                  **kwargs)
+    return ResultWriter(db, **kwargs)
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def write_journal(path, docs):
+    with open(path, 'w', encoding='utf-8') as f:
+        for doc in docs:
+            f.write(json.dumps({'collection': 'recordings', 'document': doc}) + '\n')
+
+def test_documents_are_committed(db, tmp_path):
+    writer = make_writer(db, tmp_path)
+    for i in range(5):
+        writer.enqueue('recordings', {'i': i})
+    writer.close()
+    assert sorted(doc['i'] for doc in db.committed) == list(range(5))
+    assert writer.stats()['written'] == 5
+
+def test_failed_commits_are_journaled_then_replayed(db, tmp_path):
+    db.down = True
+    writer = make_writer(db, tmp_path)
+    writer.enqueue('recordings', {'i': 1})
+    writer.close()
+    assert writer.journal_pending()
+    assert writer.stats()['journaled'] == 1
+
+    db.down = False
+    writer._replay_journal()
+    assert db.committed == [{'i': 1}]
+    assert not writer.journal_pending()
+
+def test_start_up_replays_the_journal(db, tmp_path):
+    write_journal(tmp_path / 'journal.jsonl', [{'i': 1}, {'i': 2}])
+    writer = make_writer(db, tmp_path)
+    wait_for(lambda: not writer.journal_pending())
+    writer.close()
+    assert sorted(doc['i'] for doc in db.committed) == [1, 2]
+
+def test_failed_replay_keeps_documents_without_recounting(db, tmp_path):
+    writer = make_writer(db, tmp_path)
+    writer.close()
+    write_journal(writer.journal_path, [{'i': i} for i in range(3)])
+    db.down = True
+    writer._replay_journal()
+    writer._replay_journal()
+    stats = writer.stats()
+    assert stats['journaled'] == 0 and stats['rejournaled'] == 6
+    db.down = False
+    writer._replay_journal()
+    assert sorted(doc['i'] for doc in db.committed) == [0, 1, 2]
+
+def test_replay_interrupted_by_an_exception_loses_nothing(db, tmp_path):
+    writer = make_writer(db, tmp_path, batch_size=2)
+    writer.close()
+    write_journal(writer.journal_path, [{'i': i} for i in range(5)])
+    # A .replay file left behind by an earlier failed pass
+    write_journal(writer.journal_path + '.replay', [{'i': 99}])
+
+    commit = writer._commit_with_retry
+    calls = []
+    def flaky(items):
+        calls.append(items)
+        if len(calls) == 2:
+            raise ValueError("interrupted")
+        return commit(items)
+    writer._commit_with_retry = flaky
+    with pytest.raises(ValueError):
+        writer._replay_journal()
+    assert not os.path.exists(writer.journal_path + '.replay')
+
+    writer._commit_with_retry = commit
+    writer._replay_journal()
+    assert sorted(doc['i'] for doc in db.committed) == [0, 1, 2, 3, 4, 99]
+
+def test_torn_last_line_is_skipped(db, tmp_path):
+    write_journal(tmp_path / 'journal.jsonl', [{'i': 1}])
+    with open(tmp_path / 'journal.jsonl', 'a', encoding='utf-8') as f:
+        f.write('{"collection": "recordings", "docu')
+    writer = make_writer(db, tmp_path)
+    wait_for(lambda: not writer.journal_pending())
+    writer.close()
+    assert db.committed == [{'i': 1}]
+
+def test_datetimes_survive_the_journal(db, tmp_path):
+    import datetime
+    stamp = datetime.datetime(2024, 5, 1, 12, 30)
+    db.down = True
+    writer = make_writer(db, tmp_path)
+    writer.enqueue('recordings', {'timestamp': stamp})
+    writer.close()
+    db.down = False
+    writer._replay_journal()
+    assert db.committed == [{'timestamp': stamp}]
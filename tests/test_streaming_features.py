@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+import scipy.io.wavfile as wav
+
+from audio_features import DecodedAudio, decode_audio, extract_audio_features
+from conftest import SR
+from feature_cache import FeatureCache
+from streaming_features import extract_audio_features_streaming, wav_duration
+
+# MFCC means use uncentred frames when streamed (and a different spectral
+# fallback without librosa), so only these are expected to match exactly
+EXACT_KEYS = ('jitter', 'shimmer', 'energy_mean', 'energy_std', 'hnr', 'hnr_mean', 'hnr_std',
+              'pitch_mean', 'pitch_std')
+
+def write_wav(path, samples, sr):
+    wav.write(path, sr, (np.clip(samples, -1, 1) * 32767).astype(np.int16))
+    return str(path)
+
+def in_memory(path):
+    return extract_audio_features(decode_audio(path))
+
+def assert_features_match(streamed, reference):
+    assert set(streamed) == set(reference)
+    for key in EXACT_KEYS:
+        assert streamed[key] == pytest.approx(reference[key], rel=1e-6, abs=1e-9), key
+
+@pytest.mark.parametrize('block_sec', [0.37, 1.0, 10.0])
+def test_streaming_matches_in_memory(tmp_path, speech_like, block_sec):
+    path = write_wav(tmp_path / 'clip.wav', speech_like, SR)
+    streamed = extract_audio_features_streaming(path, block_sec=block_sec)
+    assert_features_match(streamed, in_memory(path))
+
+def test_streaming_resamples_like_decode(tmp_path, rng):
+    src_sr = 44100
+    t = np.arange(2 * src_sr) / src_sr
+    y = 0.3 * np.sin(2 * np.pi * 180 * t) + 0.01 * rng.standard_normal(len(t))
+    path = write_wav(tmp_path / 'clip44k.wav', y, src_sr)
+    assert_features_match(extract_audio_features_streaming(path, block_sec=0.5), in_memory(path))
+
+def test_segments_match_concatenated_voiced_audio(tmp_path, speech_like):
+    path = write_wav(tmp_path / 'clip.wav', speech_like, SR)
+    segments = [(int(0.2 * SR), int(0.7 * SR)), (int(1.1 * SR), int(1.8 * SR)), (int(2.0 * SR), int(2.6 * SR))]
+    samples = np.concatenate([speech_like[start:end] for start, end in segments])
+    # Same int16 round trip as the file
+    samples = (np.clip(samples, -1, 1) * 32767).astype(np.int16).astype(np.float32) / 32768.0
+    reference = extract_audio_features(DecodedAudio(samples, SR))
+    streamed = extract_audio_features_streaming(path, block_sec=0.45, segments=segments)
+    assert_features_match(streamed, reference)
+
+def test_timeline_has_one_window_per_block(tmp_path, speech_like):
+    path = write_wav(tmp_path / 'clip.wav', speech_like, SR)
+    features, timeline = extract_audio_features_streaming(path, block_sec=1.0, return_timeline=True)
+    assert [(w['start'], w['end']) for w in timeline] == [(0.0, 1.0), (1.0, 2.0), (2.0, 3.0)]
+    assert all('jitter' in w and 'shimmer' in w for w in timeline)
+
+def test_too_short_is_rejected(tmp_path):
+    path = write_wav(tmp_path / 'short.wav', np.zeros(SR // 4), SR)
+    with pytest.raises(ValueError):
+        extract_audio_features_streaming(path)
+
+def test_wav_duration(tmp_path, speech_like):
+    assert wav_duration(write_wav(tmp_path / 'clip.wav', speech_like, SR)) == pytest.approx(3.0)
+    not_wav = tmp_path / 'clip.mp3'
+    not_wav.write_bytes(b'ID3' + bytes(64))
+    assert wav_duration(str(not_wav)) is None
+
+def test_long_wavs_are_streamed_by_extract_all_features(tmp_path, speech_like, monkeypatch):
+    import audio_features
+    calls = []
+    def spy(path, **kwargs):
+        calls.append((path, kwargs))
+        return extract_audio_features_streaming(path, **kwargs)
+    monkeypatch.setattr(audio_features, 'STREAM_MIN_SEC', 2.0)
+    monkeypatch.setattr(audio_features, 'extract_audio_features_streaming', spy)
+    monkeypatch.setattr(audio_features, 'get_feature_cache', lambda: FeatureCache(db_path=None))
+
+    path = write_wav(tmp_path / 'long.wav', speech_like, SR)
+    features, _ = audio_features.extract_all_features(path, transcript_override="hello")
+    assert len(calls) == 1 and calls[0][0] == path
+    # The VAD trimmed the gaps, so only the voiced segments were streamed
+    segments = calls[0][1]['segments']
+    assert segments
+    assert features['jitter'] == pytest.approx(extract_audio_features_streaming(path, segments=segments)['jitter'])
+
+    monkeypatch.setattr(audio_features, 'STREAM_MIN_SEC', 10.0)
+    audio_features.extract_all_features(path, transcript_override="hello")
+    assert len(calls) == 1
@@ -0,0 +1,46 @@
+import numpy as np
+
+from audio_dsp import voice_activity
+from conftest import SR
+
+def test_speech_segments_follow_bursts(speech_like):
+    vad = voice_activity(speech_like, SR)
+    assert vad['segment_count'] == 3
+    assert vad['pause_count'] == 2
+    # 1.5 s of bursts plus the padding around each segment
+    assert 1.5 <= vad['speech_sec'] <= 2.2
+
+def test_digital_silence_padding_does_not_disable_trimming(speech_like):
+    padding = np.zeros(2 * SR, dtype=np.float32)
+    padded = np.concatenate([padding, speech_like, padding])
+    vad = voice_activity(padded, SR)
+    unpadded = voice_activity(speech_like, SR)
+    assert vad['segment_count'] == unpadded['segment_count']
+    # Only the VAD_PAD_SEC padding at the clip edges differs
+    assert abs(vad['speech_sec'] - unpadded['speech_sec']) <= 0.25
+    # Nothing of the zero padding is kept
+    assert vad['segments'][0][0] >= 2 * SR - int(0.2 * SR)
+    assert vad['segments'][-1][1] <= len(padded) - 2 * SR + int(0.2 * SR)
+
+def test_silent_input_has_no_speech():
+    vad = voice_activity(np.zeros(SR, dtype=np.float32), SR)
+    assert vad['segments'] == []
+    assert vad['speech_ratio'] == 0.0
+
+def test_low_noise_alone_is_not_speech(rng):
+    noise = (0.001 * rng.standard_normal(3 * SR)).astype(np.float32)
+    assert voice_activity(noise, SR)['speech_ratio'] == 0.0
+
+def test_steady_loud_signal_is_all_speech():
+    t = np.arange(3 * SR) / SR
+    tone = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    vad = voice_activity(tone, SR)
+    assert vad['speech_ratio'] == 1.0
+    assert vad['pause_count'] == 0
+
+def test_quiet_consonant_stretches_are_not_pauses():
+    # Loud vowels with -30 dB stretches between them and no silence at all
+    t = np.arange(3 * SR) / SR
+    envelope = np.where((t % 1.0) < 0.7, 0.3, 0.01)
+    vad = voice_activity((envelope * np.sin(2 * np.pi * 220 * t)).astype(np.float32), SR)
+    assert vad['pause_count'] == 0
@@ -0,0 +1,237 @@
+"""
+Transcription Module
+Pluggable speech-to-text backends behind one interface:
+
+  google    Google Web Speech API via SpeechRecognition (network, fil-PH)
+  whisper   faster-whisper on CPU with int8 weights (local, Tagalog)
+  vosk      Vosk/Kaldi with a local model directory (local, streaming)
+
+TRANSCRIBE_BACKENDS is a comma-separated preference list; the first backend
+that is available and does not fail is used, so "whisper,google" runs
+locally and only falls back to the network. Local engines run on a small
+shared thread pool and can report partial transcripts while decoding.
+"""
+
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from metrics import timed_load
+
+# Default: Google first, then the local engines when it is unreachable
+TRANSCRIBE_BACKENDS = [name.strip() for name in os.environ.get('TRANSCRIBE_BACKENDS', 'google,whisper,vosk').split(',')
+                       if name.strip()]
+
+# Concurrent transcriptions (local engines are CPU bound)
+TRANSCRIBE_WORKERS = int(os.environ.get('TRANSCRIBE_WORKERS', '2'))
+
+# Google Web Speech language (Tagalog/Taglish, matches the training data)
+GOOGLE_LANGUAGE = 'fil-PH'
+
+# faster-whisper model size / path, quantization and language
+WHISPER_MODEL = os.environ.get('WHISPER_MODEL', 'small')
+WHISPER_COMPUTE_TYPE = 'int8'
+WHISPER_LANGUAGE = 'tl'
+WHISPER_BEAM_SIZE = 1
+
+# Vosk model directory (e.g. a Tagalog/Filipino model from alphacephei)
+VOSK_MODEL_PATH = os.environ.get('VOSK_MODEL_PATH', 'vosk-model-tl')
+VOSK_CHUNK_SEC = 0.5
+
+def pcm16(samples):
+    """Little-endian int16 PCM array from float samples in [-1, 1)"""
+    return (np.clip(samples, -1.0, 1.0 - 1.0 / 32768) * 32768).astype('<i2')
+
+class TranscriptionError(Exception):
+    """A backend could not produce a transcript (not 'no speech')"""
+    pass
+
+class TranscriptionBackend(ABC):
+    """
+    transcribe(samples, sr, on_partial=None) returns the transcript ("" for
+    no recognisable speech) or raises TranscriptionError. samples is mono
+    float32 in [-1, 1]; on_partial(text), if given, receives the transcript
+    so far while decoding.
+    """
+
+    name = None
+
+    def available(self):
+        return True
+
+    @abstractmethod
+    def transcribe(self, samples, sr, on_partial=None):
+        pass
+
+class GoogleBackend(TranscriptionBackend):
+    name = 'google'
+
+    def available(self):
+        try:
+            import speech_recognition  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def transcribe(self, samples, sr, on_partial=None):
+        import speech_recognition as speech
+        audio_data = speech.AudioData(pcm16(samples).tobytes(), sr, 2)
+        try:
+            return speech.Recognizer().recognize_google(audio_data, language=GOOGLE_LANGUAGE)
+        except speech.UnknownValueError:
+            return ""
+        except speech.RequestError as e:
+            raise TranscriptionError(f"Google speech recognition error: {e}")
+
+class WhisperBackend(TranscriptionBackend):
+    """faster-whisper (CTranslate2) with int8 weights on CPU"""
+
+    name = 'whisper'
+
+    def __init__(self, model=WHISPER_MODEL, compute_type=WHISPER_COMPUTE_TYPE, language=WHISPER_LANGUAGE):
+        self.model_name = model
+        self.compute_type = compute_type
+        self.language = language
+        self._model = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        try:
+            import faster_whisper  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def _load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from faster_whisper import WhisperModel
+                    print(f"Loading Whisper model '{self.model_name}' ({self.compute_type})...")
+                    with timed_load('whisper'):
+                        self._model = WhisperModel(self.model_name, device='cpu', compute_type=self.compute_type,
+                                                   cpu_threads=max(1, (os.cpu_count() or 1) // TRANSCRIBE_WORKERS))
+        return self._model
+
+    def transcribe(self, samples, sr, on_partial=None):
+        if sr != 16000:
+            from resampler import resample
+            samples = resample(samples, sr, 16000)
+        segments, _ = self._load().transcribe(np.asarray(samples, dtype=np.float32), language=self.language,
+                                              beam_size=WHISPER_BEAM_SIZE)
+        parts = []
+        # segments is a generator: decoding happens as it is consumed
+        for segment in segments:
+            parts.append(segment.text.strip())
+            if on_partial is not None:
+                on_partial(' '.join(parts))
+        return ' '.join(part for part in parts if part)
+
+class VoskBackend(TranscriptionBackend):
+    """Vosk/Kaldi recognizer fed in VOSK_CHUNK_SEC chunks"""
+
+    name = 'vosk'
+
+    def __init__(self, model_path=VOSK_MODEL_PATH):
+        self.model_path = model_path
+        self._model = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        try:
+            import vosk  # noqa: F401
+        except ImportError:
+            return False
+        return os.path.isdir(self.model_path)
+
+    def _load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from vosk import Model, SetLogLevel
+                    SetLogLevel(-1)
+                    print(f"Loading Vosk model from {self.model_path}...")
+                    with timed_load('vosk'):
+                        self._model = Model(self.model_path)
+        return self._model
+
+    def transcribe(self, samples, sr, on_partial=None):
+        from vosk import KaldiRecognizer
+        recognizer = KaldiRecognizer(self._load(), sr)
+        pcm = pcm16(samples)
+        chunk = int(VOSK_CHUNK_SEC * sr)
+        parts = []
+        for start in range(0, len(pcm), chunk):
+            if recognizer.AcceptWaveform(pcm[start:start + chunk].tobytes()):
+                text = json.loads(recognizer.Result()).get('text', '')
+                if text:
+                    parts.append(text)
+            if on_partial is not None:
+                partial = json.loads(recognizer.PartialResult()).get('partial', '')
+                on_partial(' '.join(parts + ([partial] if partial else [])))
+        final = json.loads(recognizer.FinalResult()).get('text', '')
+        if final:
+            parts.append(final)
+        return ' '.join(parts)
+
+BACKEND_CLASSES = {cls.name: cls for cls in (GoogleBackend, WhisperBackend, VoskBackend)}
+
+_backends = {}
+_backends_lock = threading.Lock()
+_executor = None
+
+def get_backend(name):
+    """Shared backend instance by name (models load on first use)"""
+    with _backends_lock:
+        if name not in _backends:
+            if name not in BACKEND_CLASSES:
+                raise ValueError(f"unknown transcription backend '{name}'")
+            _backends[name] = BACKEND_CLASSES[name]()
+        return _backends[name]
+
+def backend_chain(names=None):
+    """Available backends in preference order"""
+    chain = []
+    for name in names or TRANSCRIBE_BACKENDS:
+        try:
+            backend = get_backend(name)
+        except ValueError as e:
+            print(f"  {e}")
+            continue
+        if backend.available():
+            chain.append(backend)
+    return chain
+
+def _get_executor():
+    global _executor
+    with _backends_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=TRANSCRIBE_WORKERS, thread_name_prefix='stt')
+        return _executor
+
+def _run_chain(samples, sr, on_partial, names):
+    errors = []
+    for backend in backend_chain(names):
+        try:
+            transcript = backend.transcribe(samples, sr, on_partial=on_partial)
+            return transcript, backend.name
+        except Exception as e:
+            print(f"  [{backend.name}] transcription failed: {e}")
+            errors.append(f"{backend.name}: {e}")
+    raise TranscriptionError("; ".join(errors) or "no transcription backend available")
+
+def submit_transcription(samples, sr, on_partial=None, names=None):
+    """Queue a transcription on the STT pool; the Future gives (transcript, backend name)"""
+    return _get_executor().submit(_run_chain, samples, sr, on_partial, names)
+
+def transcribe(samples, sr, on_partial=None, names=None, timeout=None):
+    """Transcribe on the STT pool and wait; returns (transcript, backend name)"""
+    return submit_transcription(samples, sr, on_partial, names).result(timeout)
+
+def backend_version():
+    """Backend list as it appears in cache keys"""
+    return ','.join(TRANSCRIBE_BACKENDS)
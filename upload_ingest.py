@@ -0,0 +1,90 @@
+"""
+Upload Ingest Module
+Takes an uploaded recording off the request stream once: small uploads stay
+in memory and are decoded from a BytesIO, larger ones are spilled to a
+uniquely named temp file that is removed when the upload is closed.
+Concurrent requests never share a file and most never touch disk.
+"""
+
+import io
+import os
+import tempfile
+
+# Uploads up to this size are kept in memory (a minute of 16 kHz WAV is ~2 MB)
+UPLOAD_SPOOL_MAX_BYTES = int(os.environ.get('UPLOAD_SPOOL_MAX_BYTES', 8 * 1024 * 1024))
+
+UPLOAD_CHUNK_BYTES = 256 * 1024
+
+class Upload:
+    """
+    One ingested recording, either bytes in memory or a spill file. Use as
+    a context manager (or call close()) so the spill file is always removed.
+    """
+
+    def __init__(self, filename, size, data=None, path=None):
+        self.filename = filename
+        self.size = size
+        self.data = data
+        self.path = path
+
+    @property
+    def in_memory(self):
+        return self.data is not None
+
+    def source(self):
+        """
+        What decode_audio/extract_all_features take: a fresh named BytesIO
+        over the bytes (the name keeps the format hint), or the spill path
+        """
+        if self.data is None:
+            return self.path
+        buffer = io.BytesIO(self.data)
+        buffer.name = self.filename
+        return buffer
+
+    def close(self):
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        where = 'memory' if self.in_memory else self.path
+        return f"Upload({self.filename!r}, {self.size} bytes, {where})"
+
+def ingest_upload(stream, filename='recording.wav', spool_max=UPLOAD_SPOOL_MAX_BYTES, spill_dir=None):
+    """
+    Read an upload (a werkzeug FileStorage or any readable) into an Upload,
+    spilling to a mkstemp file in spill_dir once it exceeds spool_max bytes
+    """
+    reader = getattr(stream, 'stream', stream)
+    filename = os.path.basename(getattr(stream, 'filename', None) or filename)
+    buffer = io.BytesIO()
+    spill, path, size = None, None, 0
+    try:
+        for chunk in iter(lambda: reader.read(UPLOAD_CHUNK_BYTES), b''):
+            size += len(chunk)
+            if spill is None and size > spool_max:
+                suffix = os.path.splitext(filename)[1] or '.wav'
+                fd, path = tempfile.mkstemp(prefix='recording_', suffix=suffix, dir=spill_dir)
+                spill = os.fdopen(fd, 'wb')
+                spill.write(buffer.getbuffer())
+                buffer = None
+            (spill or buffer).write(chunk)
+    except BaseException:
+        if spill is not None:
+            spill.close()
+            os.remove(path)
+        raise
+    if spill is not None:
+        spill.close()
+        return Upload(filename, size, path=path)
+    return Upload(filename, size, data=buffer.getvalue())
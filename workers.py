@@ -0,0 +1,202 @@
+"""
+Worker Process Module
+Loads the joblib bundle, BERT and Wav2Vec2 once, then forks a pool of
+worker processes that share the weights copy-on-write. Each worker warms
+its models up with a dummy inference before the server reports ready.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+import feature_cache
+import metrics
+
+# Number of worker processes; AUDIO_WORKERS=0 runs everything in the
+# server process. Each worker holds its own activations, so the default
+# stops at a few even on large machines
+WORKER_PROCESSES = int(os.environ.get('AUDIO_WORKERS', min(os.cpu_count() or 1, 4)))
+
+# Seconds to wait for a dispatched request / for all workers to warm up
+WORKER_TIMEOUT = 300
+WARMUP_TIMEOUT = 600
+
+_pool = None
+_pool_size = 0
+_pool_args = None
+_pool_lock = threading.Lock()
+_ready = threading.Event()
+_ready_barrier = None
+_torch_threads = None
+
+def preload_models(model_loader):
+    """
+    Load every model into this process. Called before forking so the
+    weights are shared copy-on-write. No inference is run here: running
+    torch before fork initialises its thread pools, which do not survive
+    fork.
+    """
+    from audio_features import load_bert_model, load_emotion_model
+    model_loader()
+    load_bert_model()
+    load_emotion_model()
+
+def warmup_models(model_loader, predictor):
+    """Run one dummy inference per model so the first real request is not slow"""
+    from audio_features import get_embedding_service, load_emotion_model
+    print(f"[Worker {os.getpid()}] Warming up models...")
+    try:
+        get_embedding_service().embed("warmup")
+    except Exception as e:
+        print(f"  BERT warmup failed: {e}")
+    classifier = load_emotion_model()
+    if classifier is not None:
+        try:
+            classifier({'raw': np.zeros(16000, dtype=np.float32), 'sampling_rate': 16000}, top_k=1)
+        except Exception as e:
+            print(f"  Emotion warmup failed: {e}")
+    try:
+        predictor({}, model_loader())
+    except Exception as e:
+        print(f"  Prediction warmup failed: {e}")
+    print(f"[Worker {os.getpid()}] Ready")
+
+def _init_worker(model_loader, predictor):
+    feature_cache.reset_after_fork()
+    if _torch_threads:
+        try:
+            import torch
+            torch.set_num_threads(_torch_threads)
+        except ImportError:
+            pass
+    warmup_models(model_loader, predictor)
+    # Drop the server's pre-fork metrics and the warm-up runs; from here on
+    # every call ships what it recorded back to the server
+    metrics.drain()
+
+def _call_with_metrics(fn, args, kwargs):
+    return fn(*args, **kwargs), metrics.drain()
+
+def _wait_until_all_warm():
+    # Every worker must take one of these before any returns, so each
+    # worker has finished its initializer
+    _ready_barrier.wait(WARMUP_TIMEOUT)
+    return os.getpid()
+
+def start_workers(model_loader, predictor, processes=WORKER_PROCESSES):
+    """
+    Preload models, fork the worker pool and block until every worker is
+    warm. With processes=0 the models are warmed up in this process instead.
+    """
+    global _pool, _pool_size, _pool_args, _torch_threads
+    preload_models(model_loader)
+
+    if processes <= 0:
+        warmup_models(model_loader, predictor)
+        _ready.set()
+        return None
+
+    # Split CPU threads between workers instead of oversubscribing
+    _torch_threads = max(1, (os.cpu_count() or 1) // processes)
+    _pool_args = (model_loader, predictor, processes)
+    _pool = _fork_pool(*_pool_args)
+    _pool_size = processes
+    _ready.set()
+    return _pool
+
+def _fork_pool(model_loader, predictor, processes):
+    global _ready_barrier
+    ctx = multiprocessing.get_context('fork')
+    _ready_barrier = ctx.Barrier(processes)
+    print(f"Forking {processes} worker processes ({_torch_threads} torch threads each)...")
+    pool = ProcessPoolExecutor(max_workers=processes, mp_context=ctx,
+                               initializer=_init_worker, initargs=(model_loader, predictor))
+    pids = [f.result(WARMUP_TIMEOUT) for f in [pool.submit(_wait_until_all_warm) for _ in range(processes)]]
+    print(f"Workers ready: {sorted(pids)}")
+    return pool
+
+def _recycle_pool(stuck):
+    """
+    Replace a pool with a worker stuck on a timed-out call. A running call
+    cannot be cancelled, so a fresh pool is forked and the old one's
+    processes are killed; calls still running there fail with
+    BrokenProcessPool and dispatch() runs them again on the new pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not stuck:
+            # Another timed-out caller already replaced it
+            return
+        print("Worker call timed out, recycling the worker pool")
+        _pool = _fork_pool(*_pool_args)
+    for process in list((stuck._processes or {}).values()):
+        process.kill()
+    stuck.shutdown(wait=False, cancel_futures=True)
+
+def is_ready():
+    """True once models are loaded and warmed up"""
+    return _ready.is_set()
+
+def worker_count():
+    return _pool_size
+
+def dispatch(fn, *args, **kwargs):
+    """
+    Run fn in a worker process if the pool is running, else inline.
+    fn and its arguments must be picklable (module-level functions).
+    """
+    if _pool is None:
+        return fn(*args, **kwargs)
+    for attempt in range(2):
+        pool = _pool
+        try:
+            future = pool.submit(_call_with_metrics, fn, args, kwargs)
+        except RuntimeError:
+            # Submitted just as a recycle shut this pool down
+            if attempt or _pool is pool:
+                raise
+            continue
+        try:
+            result, recorded = future.result(WORKER_TIMEOUT)
+        except TimeoutError:
+            # Still queued: just drop it. Running: its worker stays stuck
+            # until the pool is recycled
+            if not future.cancel():
+                _recycle_pool(pool)
+            raise
+        except BrokenProcessPool:
+            # Killed by another call's recycle; run once more on the new pool
+            if attempt or _pool is pool:
+                raise
+            continue
+        metrics.merge(recorded)
+        return result
+
+def submit(fn, *args, **kwargs):
+    """
+    Like dispatch() but returns a Future straight away, so callers can fan
+    several requests out across the pool. Runs inline if there is no pool.
+    """
+    if _pool is not None:
+        outer = Future()
+        def relay(inner):
+            # Hand back the result; the worker's metrics merge into this process
+            try:
+                result, recorded = inner.result()
+            except Exception as e:
+                outer.set_exception(e)
+                return
+            metrics.merge(recorded)
+            outer.set_result(result)
+        _pool.submit(_call_with_metrics, fn, args, kwargs).add_done_callback(relay)
+        return outer
+    future = Future()
+    try:
+        future.set_result(fn(*args, **kwargs))
+    except Exception as e:
+        future.set_exception(e)
+    return future